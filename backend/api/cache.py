@@ -0,0 +1,142 @@
+"""
+Кэш общих для всех пользователей фрагментов рецептов.
+
+Фрагмент - это ответ RecipeGetSerializer без персональных полей
+(is_favorited, is_in_shopping_cart, author.is_subscribed). Ключ
+фрагмента содержит версии рецепта, его автора и справочников
+(теги, ингредиенты). Версии хранятся в том же кэше и увеличиваются
+сигналами при изменении данных, поэтому устаревшие фрагменты просто
+перестают запрашиваться и вытесняются по таймауту.
+"""
+
+from time import time_ns
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.request import Request
+
+from api.sparse_fields import SparseFields
+
+RECIPE_VERSION_KEY = 'recipe_version:{id}'
+AUTHOR_VERSION_KEY = 'author_version:{id}'
+CATALOG_VERSION_KEY = 'catalog_version'
+RECIPE_FRAGMENT_KEY = 'recipe_fragment:{id}:{version}:{prefix}'
+
+
+def initial_version() -> int:
+    """
+    Начальное значение версии.
+
+    Берётся от текущего времени, чтобы после вытеснения счётчика из кэша
+    он не вернулся к значению, под которым лежат старые фрагменты.
+    """
+
+    return time_ns()
+
+
+def bump_version(key: str) -> None:
+    """Увеличивает версию после фиксации текущей транзакции."""
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def bump_recipe_version(recipe_id: int) -> None:
+    bump_version(RECIPE_VERSION_KEY.format(id=recipe_id))
+
+
+def bump_author_version(author_id: int) -> None:
+    bump_version(AUTHOR_VERSION_KEY.format(id=author_id))
+
+
+def bump_catalog_version() -> None:
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def get_versions(keys: Iterable[str]) -> dict[str, int]:
+    """Возвращает версии по ключам, заводя отсутствующие."""
+
+    keys = set(keys)
+    versions: dict = cache.get_many(keys)
+    missing = {
+        key: initial_version() for key in keys if key not in versions
+    }
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return versions
+
+
+def get_recipes_versions(recipes: Iterable) -> dict[int, str]:
+    """
+    Возвращает составные версии рецептов: {id рецепта: версия}.
+
+    Версия включает версию самого рецепта, его автора и справочников.
+    Все счётчики читаются одним обращением к кэшу.
+    """
+
+    recipes = list(recipes)
+    keys = {CATALOG_VERSION_KEY}
+    for recipe in recipes:
+        keys.add(RECIPE_VERSION_KEY.format(id=recipe.id))
+        keys.add(AUTHOR_VERSION_KEY.format(id=recipe.author_id))
+    versions = get_versions(keys)
+    catalog_version = versions[CATALOG_VERSION_KEY]
+    return {
+        recipe.id: '{}.{}.{}'.format(
+            versions[RECIPE_VERSION_KEY.format(id=recipe.id)],
+            versions[AUTHOR_VERSION_KEY.format(id=recipe.author_id)],
+            catalog_version
+        ) for recipe in recipes
+    }
+
+
+def get_fragment_prefix(
+    request: Optional[Request], field_paths: Iterable[str]
+) -> str:
+    """
+    Часть ключа фрагмента, зависящая от запроса.
+
+    Ссылки на картинки абсолютные - зависят от схемы и хоста,
+    состав фрагмента - от выбранных полей (?fields= / ?omit=) среди
+    field_paths, всех полей фрагмента.
+    """
+
+    if not request:
+        return ''
+    return '{}|{}'.format(
+        request.build_absolute_uri('/'),
+        SparseFields.from_request(request).get_key(field_paths)
+    )
+
+
+def get_fragment_keys(recipes: Iterable, prefix: str = '') -> dict[int, str]:
+    """
+    Ключи фрагментов рецептов: {id рецепта: ключ}.
+
+    prefix - часть ключа, от которой зависит содержимое фрагмента помимо
+    данных рецепта (например, схема и хост в абсолютных ссылках).
+    """
+
+    return {
+        recipe_id: RECIPE_FRAGMENT_KEY.format(
+            id=recipe_id, version=version, prefix=prefix
+        )
+        for recipe_id, version in get_recipes_versions(recipes).items()
+    }
+
+
+def get_fragments(keys: Iterable[str]) -> dict[str, dict]:
+    return cache.get_many(keys)
+
+
+def set_fragments(fragments: dict[str, dict]) -> None:
+    if fragments:
+        cache.set_many(fragments, timeout=settings.RECIPE_CACHE_TIMEOUT)
@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django.db.models.query import QuerySet
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from api.tag_index import tag_index
+from recipes.models import Ingredient, Recipe, RecipeTags, Tag
 
 User = get_user_model()
 
@@ -25,7 +28,9 @@ class RecipeFilter(filters.FilterSet):
     * Фильтрация наличия в избранном по полю is_favorited
     * Фильтрация наличия в корзине по полю is_in_shopping_cart
     * Фильтрация принадлежности автору по полю author
-    * Фильтрация по тегам (tags)
+    * Фильтрация по тегам (tags): рецепты с любым из тегов (match=any,
+      по умолчанию) или со всеми сразу (match=all)
+    * Полнотекстовый поиск по названию и описанию (search)
     """
     is_favorited = filters.BooleanFilter(
         field_name='is_favorited',
@@ -40,7 +45,14 @@ class RecipeFilter(filters.FilterSet):
         field_name='tags__slug',
         queryset=Tag.objects.all(),
         to_field_name='slug',
+        method='filter_tags'
     )
+    match = filters.ChoiceFilter(
+        choices=(('any', 'any'), ('all', 'all')),
+        method='filter_match'
+    )
+
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -51,7 +63,8 @@ class RecipeFilter(filters.FilterSet):
     ) -> QuerySet:
         author = self.request.user
         if value and author.is_authenticated:
-            return queryset.filter(**{filter_field: author}).distinct()
+            # Пара (автор, рецепт) уникальна - дублей нет и без DISTINCT
+            return queryset.filter(**{filter_field: author})
         elif not value and author.is_authenticated:
             return queryset.exclude(**{filter_field: author})
         elif not value and author.is_anonymous:
@@ -71,3 +84,48 @@ class RecipeFilter(filters.FilterSet):
         return self.filter_or_exclude_author(
             queryset, name, value, filter_field='shopping_cart__author'
         )
+
+    def filter_tags(
+        self, queryset: QuerySet, name: str, value: QuerySet
+    ) -> QuerySet:
+        """
+        Фильтрация по тегам через EXISTS по связям рецепт-тег.
+
+        В отличие от соединения с тегами, не размножает рецепты с
+        несколькими подходящими тегами и не требует DISTINCT. Подзапросы
+        проходят по индексу (tag_id, recipe_id).
+
+        С RECIPE_TAG_INDEX id рецептов берутся из индекса тегов в памяти,
+        если их не больше RECIPE_TAG_INDEX_MAX_IDS.
+        """
+        tags_ids = [tag.id for tag in value]
+        if not tags_ids:
+            return queryset
+        match_all = self.form.cleaned_data.get('match') == 'all'
+        if settings.RECIPE_TAG_INDEX:
+            recipes_ids = tag_index.get_recipes_ids(
+                tags_ids, match_all, limit=settings.RECIPE_TAG_INDEX_MAX_IDS
+            )
+            if recipes_ids is not None:
+                return queryset.filter(id__in=recipes_ids)
+        recipe_tags = RecipeTags.objects.filter(recipe_id=OuterRef('pk'))
+        if match_all:
+            for tag_id in tags_ids:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag_id=tag_id))
+                )
+            return queryset
+        return queryset.filter(
+            Exists(recipe_tags.filter(tag_id__in=tags_ids))
+        )
+
+    def filter_match(
+        self, queryset: QuerySet, name: str, value: str
+    ) -> QuerySet:
+        # Режим читает filter_tags, сам по себе ничего не фильтрует
+        return queryset
+
+    def filter_search(
+        self, queryset: QuerySet, name: str, value: str
+    ) -> QuerySet:
+        return queryset.search(value)
@@ -0,0 +1,204 @@
+"""
+Производные картинок: уменьшенные копии рецептов и квадратные аватары
+в WebP и JPEG.
+
+Файлы лежат рядом с оригиналом в том же хранилище:
+recipes/images/cake.png -> recipes/images/cake_400w.webp,
+users/me.png -> users/me_64s.jpeg. Имена выводятся из имени оригинала,
+поэтому ссылки в ответах API строятся без обращения к хранилищу.
+Создаются в фоне после сохранения модели (api.image_tasks), для уже
+загруженных файлов - командой generate_image_derivatives.
+"""
+
+import os
+from io import BytesIO
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.db.models import Model
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps
+from rest_framework.request import Request
+
+from core.constants import (
+    IMAGE_DERIVATIVE_FORMATS,
+    IMAGE_DERIVATIVE_QUALITY,
+    RECIPE_IMAGE_WIDTHS,
+    USER_AVATAR_SIZES
+)
+from recipes.models import Recipe
+from users.models import User
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+class ImageDerivatives:
+    """
+    Производные одного поля-картинки.
+
+    crop=False - уменьшение до ширины size с сохранением пропорций (без
+    увеличения), crop=True - квадрат со стороной size из центра.
+    """
+
+    def __init__(self, sizes: tuple[int, ...], crop: bool = False) -> None:
+        self.sizes = sizes
+        self.crop = crop
+        self.suffix = 's' if crop else 'w'
+
+    def get_name(self, name: str, size: int, image_format: str) -> str:
+        root, _ = os.path.splitext(name)
+        return f'{root}_{size}{self.suffix}.{image_format}'
+
+    def get_names(self, name: str) -> dict[tuple[int, str], str]:
+        return {
+            (size, image_format): self.get_name(name, size, image_format)
+            for size in self.sizes
+            for image_format in IMAGE_DERIVATIVE_FORMATS
+        }
+
+    def get_urls(
+        self, storage: Storage, name: Optional[str],
+        request: Optional[Request] = None
+    ) -> Optional[dict[str, dict[str, str]]]:
+        """Ссылки для ответа API: {размер: {формат: ссылка}}."""
+
+        if not name:
+            return None
+        urls = {}
+        for (size, image_format), derivative in self.get_names(name).items():
+            url = storage.url(derivative)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls.setdefault(str(size), {})[image_format] = url
+        return urls
+
+    def generate(
+        self, storage: Storage, name: str, force: bool = False
+    ) -> int:
+        """
+        Создаёт недостающие производные картинки name (с force - все
+        заново).
+
+        Возвращает число записанных файлов.
+        """
+
+        names = {
+            key: derivative
+            for key, derivative in self.get_names(name).items()
+            if force or not storage.exists(derivative)
+        }
+        if not names:
+            return 0
+        with storage.open(name, 'rb') as file:
+            with Image.open(file) as image:
+                # Старые файлы не проходили проверку при загрузке
+                if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+                    raise ValueError(
+                        f'{name}: больше {settings.IMAGE_MAX_PIXELS} '
+                        'пикселей'
+                    )
+                # JPEG сразу читается в уменьшенном масштабе
+                image.draft('RGB', (max(self.sizes), max(self.sizes)))
+                image = self.prepare(image)
+                for size in self.sizes:
+                    resized = self.resize(image, size)
+                    for image_format in IMAGE_DERIVATIVE_FORMATS:
+                        derivative = names.get((size, image_format))
+                        if derivative is not None:
+                            self.save(
+                                storage, derivative, resized, image_format
+                            )
+        return len(names)
+
+    def delete(self, storage: Storage, name: Optional[str]) -> None:
+        if not name:
+            return
+        for derivative in self.get_names(name).values():
+            storage.delete(derivative)
+
+    @staticmethod
+    def prepare(image: Image.Image) -> Image.Image:
+        """Поворот по EXIF и перевод в RGB или RGBA."""
+
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info
+        )
+        return image.convert('RGBA' if has_alpha else 'RGB')
+
+    def resize(self, image: Image.Image, size: int) -> Image.Image:
+        if self.crop:
+            return ImageOps.fit(image, (size, size), Image.LANCZOS)
+        if image.width <= size:
+            return image
+        height = max(1, round(image.height * size / image.width))
+        return image.resize((size, height), Image.LANCZOS)
+
+    @staticmethod
+    def save(
+        storage: Storage, name: str, image: Image.Image, image_format: str
+    ) -> None:
+        if image_format == 'jpeg' and image.mode == 'RGBA':
+            # В JPEG нет прозрачности: кладём на белый фон
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        buffer = BytesIO()
+        image.save(
+            buffer, format=PIL_FORMATS[image_format],
+            quality=IMAGE_DERIVATIVE_QUALITY
+        )
+        # Иначе хранилище сохранит файл под другим именем
+        storage.delete(name)
+        storage.save(name, ContentFile(buffer.getvalue()))
+
+
+RECIPE_IMAGE_DERIVATIVES = ImageDerivatives(RECIPE_IMAGE_WIDTHS)
+USER_AVATAR_DERIVATIVES = ImageDerivatives(USER_AVATAR_SIZES, crop=True)
+
+# Модель -> (поле-картинка, её производные)
+MODEL_DERIVATIVES: dict[type[Model], tuple[str, ImageDerivatives]] = {
+    Recipe: ('image', RECIPE_IMAGE_DERIVATIVES),
+    User: ('avatar', USER_AVATAR_DERIVATIVES),
+}
+
+
+def generate_derivatives(instance: Model, force: bool = False) -> int:
+    field_name, derivatives = MODEL_DERIVATIVES[type(instance)]
+    file: FieldFile = getattr(instance, field_name)
+    if not file:
+        return 0
+    return derivatives.generate(file.storage, file.name, force=force)
+
+
+def is_file_shared(instance: Model, name: str) -> bool:
+    """Ссылается ли на файл ещё какая-то запись, кроме instance."""
+
+    for model, (field_name, _) in MODEL_DERIVATIVES.items():
+        queryset = model.objects.filter(**{field_name: name})
+        if isinstance(instance, model):
+            queryset = queryset.exclude(pk=instance.pk)
+        if queryset.exists():
+            return True
+    return False
+
+
+def delete_image(instance: Model) -> None:
+    """
+    Отвязывает картинку от записи (без сохранения записи).
+
+    Одинаковые картинки хранятся одним файлом, поэтому файл и его
+    производные удаляются, только если на него больше никто не ссылается.
+    """
+
+    field_name, derivatives = MODEL_DERIVATIVES[type(instance)]
+    file: FieldFile = getattr(instance, field_name)
+    if not file:
+        return
+    if is_file_shared(instance, file.name):
+        setattr(instance, field_name, None)
+        return
+    derivatives.delete(file.storage, file.name)
+    file.delete(save=False)
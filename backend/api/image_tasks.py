@@ -0,0 +1,214 @@
+"""
+Очередь фоновой обработки картинок в базе данных.
+
+Запрос сохраняет оригинал и ставит задачу (enqueue_images), ответ
+уходит сразу: пока у картинки есть задача (в очереди, в обработке или
+с ошибкой), поле images равно null (is_image_unprocessed), после её
+выполнения - ссылки строятся по имени оригинала.
+Команда process_image_tasks забирает задачи (claim_tasks), полностью
+проверяет картинку и создаёт производные в пуле процессов
+(process_image_file), а результат записывает в очередь (complete_task).
+
+Картинка, не прошедшая проверку, отвязывается от всех записей и
+удаляется вместе с производными. Задачи с ошибкой остаются в очереди,
+пока картинку не обработают заново (повторная загрузка или
+generate_image_derivatives).
+"""
+
+import traceback
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Model, Q
+from django.utils import timezone
+
+from api.image_derivatives import MODEL_DERIVATIVES
+from api.images import InvalidImageError, verify_image
+from recipes.models import ImageTask
+
+
+def enqueue_images(instances: Iterable[Model]) -> None:
+    """Ставит в очередь картинки записей; уже стоящие пропускаются."""
+
+    tasks = []
+    for instance in instances:
+        field_name, _ = MODEL_DERIVATIVES[type(instance)]
+        name = getattr(instance, field_name).name
+        if name:
+            tasks.append(ImageTask(
+                content_type=ContentType.objects.get_for_model(instance),
+                name=name
+            ))
+    # Повтор пропускается ограничением unique_active_image_task
+    ImageTask.objects.bulk_create(tasks, ignore_conflicts=True)
+
+
+def check_images(
+    context: dict, images: Iterable[tuple[type[Model], str]]
+) -> None:
+    """
+    Проверяет одним запросом, созданы ли производные картинок images
+    (пары модель - имя картинки): у картинки без производных есть
+    задача - ожидающая или с ошибкой.
+
+    Ответ запоминается в контексте сериалайзера: страница проверяется
+    заранее, а is_image_unprocessed обходится без запросов.
+    """
+
+    checked: dict = context.setdefault('unprocessed_images', {})
+    unchecked = {
+        (model, name) for model, name in images
+        if name and (model, name) not in checked
+    }
+    if not unchecked:
+        return
+    content_types = ContentType.objects.get_for_models(
+        *{model for model, _ in unchecked}
+    )
+    unprocessed = set(ImageTask.objects.filter(
+        content_type__in=content_types.values(),
+        name__in={name for _, name in unchecked}
+    ).values_list('content_type_id', 'name'))
+    for model, name in unchecked:
+        checked[model, name] = (content_types[model].id, name) in unprocessed
+
+
+def is_image_unprocessed(
+    context: dict, model: type[Model], name: str
+) -> bool:
+    """Нет ли у картинки производных: задача ждёт или упала."""
+
+    check_images(context, [(model, name)])
+    return context['unprocessed_images'].get((model, name), False)
+
+
+def get_images_urls(
+    context: dict, model: type[Model], name: Optional[str]
+) -> Optional[dict]:
+    """
+    Поле images для ответа API (см. ImageDerivatives.get_urls): null,
+    пока производные не созданы.
+    """
+
+    if not name or is_image_unprocessed(context, model, name):
+        return None
+    field_name, derivatives = MODEL_DERIVATIVES[model]
+    return derivatives.get_urls(
+        model._meta.get_field(field_name).storage, name,
+        context.get('request')
+    )
+
+
+def claim_tasks(limit: int, stale_after: int) -> list[ImageTask]:
+    """
+    Забирает до limit задач в обработку.
+
+    Задача, которая обрабатывается дольше stale_after секунд, считается
+    брошенной (воркер упал) и выдаётся снова. Несколько воркеров не
+    получают одну задачу: строки блокируются с пропуском занятых.
+    """
+
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            ImageTask.objects.select_for_update(skip_locked=True).filter(
+                Q(status=ImageTask.Status.PENDING)
+                | Q(
+                    status=ImageTask.Status.PROCESSING,
+                    updated_at__lt=now - timedelta(seconds=stale_after)
+                )
+            ).select_related('content_type').order_by('id')[:limit]
+        )
+        ImageTask.objects.filter(id__in=[task.id for task in tasks]).update(
+            status=ImageTask.Status.PROCESSING, attempts=F('attempts') + 1,
+            updated_at=now
+        )
+    for task in tasks:
+        task.status = ImageTask.Status.PROCESSING
+        task.attempts += 1
+    return tasks
+
+
+def process_image_file(model_label: str, name: str) -> int:
+    """
+    Проверяет картинку и создаёт недостающие производные.
+
+    Выполняется в процессе пула: к базе не обращается, аргументы и
+    результат передаются между процессами. Возвращает число созданных
+    файлов.
+    """
+
+    model = apps.get_model(model_label)
+    field_name, derivatives = MODEL_DERIVATIVES[model]
+    storage = model._meta.get_field(field_name).storage
+    # Запись успели удалить или сменить картинку
+    if not storage.exists(name):
+        return 0
+    verify_image(storage.path(name))
+    return derivatives.generate(storage, name)
+
+
+def clear_tasks(model: type[Model], names: Iterable[str]) -> None:
+    """Удаляет задачи картинок, производные которых созданы."""
+
+    names = set(names)
+    if not names:
+        return
+    # По одной, с сигналами: сбрасывается кэш записей с картинкой
+    ImageTask.objects.filter(
+        content_type=ContentType.objects.get_for_model(model),
+        name__in=names
+    ).delete()
+
+
+def get_failed_names(model: type[Model]) -> set[str]:
+    """Картинки model, обработка которых завершилась ошибкой."""
+
+    return set(ImageTask.objects.filter(
+        content_type=ContentType.objects.get_for_model(model),
+        status=ImageTask.Status.FAILED
+    ).values_list('name', flat=True))
+
+
+def reject_image(task: ImageTask) -> None:
+    """Отвязывает непрошедшую проверку картинку и удаляет её файлы."""
+
+    model = task.content_type.model_class()
+    field_name, derivatives = MODEL_DERIVATIVES[model]
+    storage = model._meta.get_field(field_name).storage
+    # Сохраняем по одной, чтобы сработали сигналы (сброс кеша)
+    for instance in model.objects.filter(**{field_name: task.name}):
+        setattr(instance, field_name, None)
+        instance.save(update_fields=[field_name])
+    derivatives.delete(storage, task.name)
+    storage.delete(task.name)
+
+
+def complete_task(
+    task: ImageTask, error: Optional[BaseException], max_attempts: int
+) -> None:
+    """
+    Записывает результат обработки.
+
+    Выполненная задача удаляется вместе с прежними ошибками той же
+    картинки. Непрошедшая проверку картинка отклоняется сразу,
+    остальные ошибки повторяются до max_attempts попыток.
+    """
+
+    if error is None:
+        clear_tasks(task.content_type.model_class(), [task.name])
+        return
+    if isinstance(error, InvalidImageError):
+        reject_image(task)
+        task.status = ImageTask.Status.FAILED
+    elif task.attempts >= max_attempts:
+        task.status = ImageTask.Status.FAILED
+    else:
+        task.status = ImageTask.Status.PENDING
+    task.error = ''.join(
+        traceback.format_exception_only(type(error), error)
+    ).strip()
+    task.save(update_fields=['status', 'error', 'updated_at'])
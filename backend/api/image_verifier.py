@@ -0,0 +1,34 @@
+"""
+Проверка картинки в отдельном процессе.
+
+Запуск: python -I image_verifier.py <путь> <пикселей> <байт памяти>.
+Печатает формат картинки. Ненулевой код возврата - файл не картинка,
+в нём больше пикселей, чем разрешено, или процесс упёрся в лимит памяти.
+Django здесь не загружается: скрипт запускается без пути проекта.
+"""
+
+import resource
+import sys
+import warnings
+
+from PIL import Image
+
+
+def main(path: str, max_pixels: int, memory_limit: int) -> None:
+    # Бомба сжатия, пропущенная проверками, упадёт здесь, а не в воркере
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    warnings.simplefilter('error', Image.DecompressionBombWarning)
+
+    with Image.open(path) as image:
+        image.verify()
+    # После verify() картинку нужно открыть заново
+    with Image.open(path) as image:
+        if image.width * image.height > max_pixels:
+            sys.exit(f'Больше {max_pixels} пикселей')
+        image.load()
+        print(image.format)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
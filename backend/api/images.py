@@ -0,0 +1,164 @@
+"""
+Приём картинок в Base64 (data:image/<формат>;base64,<данные>).
+
+Размер проверяется по длине строки ещё до декодирования. Данные
+декодируются кусками во временный файл, так что в памяти воркера нет
+второй копии картинки. В запросе Pillow читает только заголовок файла
+(формат и размеры) - время не зависит от размера картинки. Полная
+проверка в отдельном процессе (api/image_verifier.py) с таймаутом,
+лимитом памяти и числа пикселей выполняется в фоне (api.image_tasks).
+
+Имя файла - хеш содержимого: одинаковые картинки хранятся одним файлом
+(см. core.storage), а ссылка на картинку никогда не меняет содержимое.
+"""
+
+import binascii
+import hashlib
+import subprocess
+import sys
+import warnings
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+DATA_URI_PREFIX = 'data:image/'
+BASE64_MARKER = ';base64,'
+# Кратно 4: каждый кусок декодируется отдельно
+CHUNK_SIZE = 64 * 1024
+# 128 бит хеша: совпадение разных картинок практически исключено
+CONTENT_HASH_LENGTH = 32
+VERIFIER_PATH = Path(__file__).resolve().parent / 'image_verifier.py'
+INVALID_IMAGE_ERROR = (
+    'Загрузите правильное изображение. Файл, который вы загрузили, '
+    'поврежден или не является изображением.'
+)
+
+
+class InvalidImageError(ValueError):
+    """Картинка не прошла полную проверку."""
+
+
+class Base64UploadedFile(TemporaryUploadedFile):
+    """
+    Временный файл декодированной картинки.
+
+    FileSystemStorage переносит такой файл на место, а не копирует.
+    Закрываем его сами: Django закрывает только файлы из request.FILES,
+    а сборщик мусора иначе пытается удалить уже перенесённый файл.
+    """
+
+    # Хеш содержимого, по нему хранилище находит уже сохранённый файл
+    content_hash: str
+
+    def __del__(self):
+        self.close()
+
+
+def is_base64_image(data) -> bool:
+    return isinstance(data, str) and data.startswith(DATA_URI_PREFIX)
+
+
+def get_decoded_size(data: str, start: int) -> int:
+    """Размер данных после декодирования, без самого декодирования."""
+
+    length = len(data) - start
+    if length % 4:
+        raise ValidationError('Некорректные данные Base64.')
+    padding = data[-2:].count('=') if length else 0
+    return length // 4 * 3 - padding
+
+
+def decode_base64_image(data: str) -> Base64UploadedFile:
+    """Декодирует картинку из data URI во временный файл."""
+
+    # Ищем маркер только в начале строки: вся строка не копируется
+    start = data.find(BASE64_MARKER, 0, 64)
+    if start == -1:
+        raise ValidationError('Ожидается картинка в формате data URI Base64.')
+    content_type = data[len('data:'):start]
+    start += len(BASE64_MARKER)
+
+    size = get_decoded_size(data, start)
+    max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+    if size > max_size:
+        raise ValidationError(
+            f'Картинка больше {max_size // (1024 * 1024)} МБ.'
+        )
+
+    file = Base64UploadedFile('temp', content_type, size, None)
+    content_hash = hashlib.sha256()
+    try:
+        for position in range(start, len(data), CHUNK_SIZE):
+            try:
+                chunk = binascii.a2b_base64(
+                    data[position:position + CHUNK_SIZE]
+                )
+            except binascii.Error:
+                raise ValidationError('Некорректные данные Base64.')
+            content_hash.update(chunk)
+            file.write(chunk)
+        file.flush()
+        image_format = read_image_format(file)
+    except BaseException:
+        file.close()
+        raise
+    file.content_hash = content_hash.hexdigest()[:CONTENT_HASH_LENGTH]
+    file.name = f'{file.content_hash}.{image_format.lower()}'
+    return file
+
+
+def read_image_format(file: Base64UploadedFile) -> str:
+    """
+    Проверяет заголовок картинки и её размеры, возвращает формат.
+
+    Image.open не декодирует пиксели, поэтому битые данные внутри файла
+    здесь не видны - их находит verify_image.
+    """
+
+    file.seek(0)
+    try:
+        with warnings.catch_warnings():
+            # Число пикселей проверяем сами, по настройкам проекта
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            with Image.open(file) as image:
+                image_format = image.format
+                pixels = image.width * image.height
+    except Exception:
+        raise ValidationError(INVALID_IMAGE_ERROR)
+    finally:
+        file.seek(0)
+    if pixels > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Картинка больше {settings.IMAGE_MAX_PIXELS} пикселей.'
+        )
+    return image_format
+
+
+def verify_image(path: str) -> str:
+    """
+    Полностью проверяет картинку в отдельном процессе, возвращает формат.
+
+    Вызывается фоновым обработчиком, а не в запросе.
+    """
+
+    try:
+        result = subprocess.run(
+            [
+                sys.executable, '-I', str(VERIFIER_PATH), path,
+                str(settings.IMAGE_MAX_PIXELS),
+                str(settings.IMAGE_VERIFY_MEMORY_LIMIT)
+            ],
+            capture_output=True, text=True,
+            timeout=settings.IMAGE_VERIFY_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        raise InvalidImageError('Картинка слишком долго обрабатывается.')
+    if result.returncode != 0 or not result.stdout.strip():
+        raise InvalidImageError(
+            result.stderr.strip().splitlines()[-1] if result.stderr.strip()
+            else INVALID_IMAGE_ERROR
+        )
+    return result.stdout.strip()
@@ -0,0 +1,343 @@
+from itertools import product
+from random import Random
+from statistics import mean
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.utils import termcolors
+from rest_framework import status
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.pagination import RecipeCursorPagination
+from api.tag_index import tag_index
+from api.views import RecipeViewSet
+from recipes.models import Ingredient, Recipe, RecipeTags, Tag
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер производительности эндпоинтов рецептов на синтетических '
+        'данных. Данные создаются в транзакции и откатываются после замера.'
+    )
+    scenarios = ('pagination', 'serialization', 'search', 'tags', 'batch')
+    batch_size = 10_000
+    # Синтетические названия: блюдо и два слова из словаря, описание -
+    # двадцать слов из словаря. Словарь - все сочетания трёх слогов
+    dishes = (
+        'борщ', 'суп', 'салат', 'пирог', 'каша', 'омлет', 'рагу', 'плов',
+        'запеканка', 'жаркое', 'пюре', 'котлеты', 'блины', 'оладьи',
+        'шашлык', 'гуляш', 'солянка', 'окрошка', 'щи', 'уха', 'лазанья',
+        'паста', 'пицца', 'ризотто', 'рулет', 'кекс', 'торт', 'сырники',
+        'вареники', 'пельмени', 'манты', 'хинкали', 'чебуреки'
+    )
+    syllables = (
+        'ба', 'ве', 'ги', 'до', 'ку', 'ла', 'ме', 'ни', 'по', 'ру', 'со',
+        'та', 'фе', 'хо', 'цу', 'ча', 'ши'
+    )
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.style.NOTICE = termcolors.make_style(fg='cyan', opts=('bold',))
+        self.factory = APIRequestFactory()
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenario',
+            type=str,
+            choices=self.scenarios,
+            help='Сценарий замера'
+        )
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100_000,
+            help='Количество синтетических рецептов (по умолчанию 100 000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Количество повторов каждого замера (по умолчанию 5)'
+        )
+
+    def handle(self, *args, **options):
+        self.repeat: int = options['repeat']
+        with transaction.atomic():
+            self.stdout.write(self.style.NOTICE(
+                f'Создание {options["recipes"]} синтетических рецептов...'
+            ))
+            self.author = self.create_recipes(options['recipes'])
+            getattr(self, f'benchmark_{options["scenario"]}')(**options)
+            transaction.set_rollback(True)
+
+    def create_recipes(self, count: int) -> User:
+        """Создаёт автора и count рецептов пачками по batch_size."""
+
+        author = User.objects.create_user(
+            email='benchmark@foodgram.local', username='benchmark',
+            first_name='Benchmark', last_name='Benchmark'
+        )
+        rng = Random(count)
+        vocabulary = self.get_vocabulary()
+        for start in range(0, count, self.batch_size):
+            Recipe.objects.bulk_create(
+                Recipe(
+                    author=author,
+                    name='{} {} №{}'.format(
+                        rng.choice(self.dishes).capitalize(),
+                        ' '.join(rng.sample(vocabulary, 2)),
+                        number
+                    ),
+                    text=' '.join(rng.choices(vocabulary, k=20)),
+                    cooking_time=number % 120 + 1
+                )
+                for number in range(start, min(start + self.batch_size, count))
+            )
+        return author
+
+    def get_vocabulary(self) -> list[str]:
+        return [''.join(word) for word in product(self.syllables, repeat=3)]
+
+    def measure(self, func: Callable) -> float:
+        """Возвращает среднее время выполнения func в миллисекундах."""
+
+        timings = []
+        for _ in range(self.repeat):
+            started = perf_counter()
+            func()
+            timings.append((perf_counter() - started) * 1000)
+        return mean(timings)
+
+    def get_recipes(self, params: dict) -> Callable:
+        """Готовит вызов списка рецептов с заданными query-параметрами."""
+
+        view = RecipeViewSet.as_view({'get': 'list'})
+
+        def call():
+            request = self.factory.get(
+                '/api/recipes/', params, HTTP_HOST=settings.ALLOWED_HOSTS[0]
+            )
+            response = view(request)
+            response.render()
+            return response
+
+        return call
+
+    def report(self, title: str, value: float, unit: str = 'мс') -> None:
+        self.stdout.write(f'{title:<45}{value:>10.2f} {unit}')
+
+    def benchmark_pagination(self, **options) -> None:
+        """Сравнение постраничной и курсорной пагинации."""
+
+        page_size = RecipeCursorPagination.page_size
+        pages = (1, 10_000)
+        for page in pages:
+            if (page - 1) * page_size >= options['recipes']:
+                self.stderr.write(self.style.WARNING(
+                    f'Страница {page} недоступна: мало рецептов.'
+                ))
+                continue
+            self.report(
+                f'page-number, страница {page}',
+                self.measure(self.get_recipes({'page': page}))
+            )
+            params = {'pagination': 'cursor'}
+            if page > 1:
+                params['cursor'] = self.get_cursor(page, page_size)
+            self.report(
+                f'cursor, страница {page}',
+                self.measure(self.get_recipes(params))
+            )
+
+    def benchmark_serialization(self, **options) -> None:
+        """Сравнение RecipeGetSerializer и RecipeValuesSerializer."""
+
+        call = self.get_recipes({'limit': 100})
+
+        def cold_call():
+            # Без кэша фрагментов, иначе сравнивается только кэш
+            cache.clear()
+            call()
+
+        for values_serializer in (False, True):
+            with override_settings(
+                RECIPE_LIST_VALUES_SERIALIZER=values_serializer
+            ):
+                title = (
+                    'RecipeValuesSerializer' if values_serializer
+                    else 'RecipeGetSerializer'
+                )
+                self.report(
+                    f'{title}, 100 рецептов', self.measure(cold_call)
+                )
+
+    def benchmark_search(self, **options) -> None:
+        """Полнотекстовый поиск (?search=) по названию и описанию."""
+
+        vocabulary = self.get_vocabulary()
+        queries = (
+            self.dishes[0],
+            vocabulary[0],
+            f'{self.dishes[1]} {vocabulary[1]}',
+            f'{vocabulary[2]} {vocabulary[3]}'
+        )
+        for query in queries:
+            self.report(
+                f'search="{query}"',
+                self.measure(self.get_recipes({'search': query}))
+            )
+
+    def benchmark_tags(self, **options) -> None:
+        """
+        Фильтрация по 1, 3 и 6 тегам: match=any и match=all через SQL
+        (EXISTS) и через индекс тегов в памяти, а также прежний JOIN.
+        """
+
+        tags = self.create_tags(options['recipes'])
+        # Связи созданы bulk_create, без сигналов
+        tag_index.invalidate()
+        self.report('Построение индекса тегов', self.measure(tag_index.build))
+        page_size = RecipeCursorPagination.page_size
+        for count in (1, 3, 6):
+            slugs = [tag.slug for tag in tags[:count]]
+            for match in ('any', 'all'):
+                call = self.get_recipes({'tags': slugs, 'match': match})
+                self.report(
+                    f'tags x{count}, match={match}', self.measure(call)
+                )
+                with override_settings(RECIPE_TAG_INDEX=True):
+                    found = tag_index.get_recipes_ids(
+                        [tag.id for tag in tags[:count]], match == 'all'
+                    )
+                    self.report(
+                        f'tags x{count}, match={match}, индекс '
+                        f'({len(found)} рецептов)',
+                        self.measure(call)
+                    )
+
+            def join_distinct():
+                # Прежний вариант фильтра: соединение с тегами и DISTINCT
+                queryset = Recipe.objects.filter(tags__slug__in=slugs)
+                list(queryset.distinct()[:page_size])
+                queryset.distinct().count()
+
+            self.report(
+                f'tags x{count}, JOIN + DISTINCT (ORM)',
+                self.measure(join_distinct)
+            )
+
+    def create_tags(self, count: int) -> list[Tag]:
+        """Создаёт 12 тегов и выдаёт каждому рецепту от 1 до 4 из них."""
+
+        Tag.objects.bulk_create(
+            Tag(name=f'Бенчмарк {number}', slug=f'benchmark-{number}')
+            for number in range(12)
+        )
+        tags = list(
+            Tag.objects.filter(slug__startswith='benchmark-').order_by('id')
+        )
+        rng = Random(count)
+        recipes_ids = Recipe.objects.filter(
+            author=self.author
+        ).values_list('id', flat=True).iterator()
+        batch = []
+        for recipe_id in recipes_ids:
+            batch.extend(
+                RecipeTags(recipe_id=recipe_id, tag=tag)
+                for tag in rng.sample(tags, rng.randint(1, 4))
+            )
+            if len(batch) >= self.batch_size:
+                RecipeTags.objects.bulk_create(batch)
+                batch = []
+        RecipeTags.objects.bulk_create(batch)
+        return tags
+
+    def benchmark_batch(self, **options) -> None:
+        """100 последовательных POST /api/recipes/ против одного пакета."""
+
+        count = 100
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Бенчмарк {number}', measurement_unit='г')
+            for number in range(10)
+        )
+        ingredients_ids = list(
+            Ingredient.objects.filter(
+                name__startswith='Бенчмарк'
+            ).values_list('id', flat=True)
+        )
+        Tag.objects.bulk_create(
+            Tag(name=f'Импорт {number}', slug=f'import-{number}')
+            for number in range(6)
+        )
+        tags_ids = list(
+            Tag.objects.filter(slug__startswith='import-').values_list(
+                'id', flat=True
+            )
+        )
+        image = (
+            'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABi'
+            'eywaAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAA'
+            'AACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg=='
+        )
+        recipes = [
+            {
+                'ingredients': [
+                    {'id': ingredients_ids[(number + i) % 10], 'amount': 10}
+                    for i in range(5)
+                ],
+                'tags': tags_ids[number % 4:number % 4 + 3],
+                'image': image,
+                'name': f'Импортированный рецепт №{number}',
+                'text': 'Рецепт из партнёрского фида.',
+                'cooking_time': 30
+            } for number in range(count)
+        ]
+        create = RecipeViewSet.as_view({'post': 'create'})
+        batch = RecipeViewSet.as_view({'post': 'batch'})
+
+        def post(view: Callable, data: dict) -> None:
+            request = self.factory.post(
+                '/api/recipes/', data, format='json',
+                HTTP_HOST=settings.ALLOWED_HOSTS[0]
+            )
+            force_authenticate(request, user=self.author)
+            response = view(request)
+            response.render()
+            if response.status_code != status.HTTP_201_CREATED:
+                raise CommandError(response.data)
+
+        with TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                sequential = self.measure(
+                    lambda: [post(create, recipe) for recipe in recipes]
+                )
+                batched = self.measure(
+                    lambda: post(batch, {'recipes': recipes})
+                )
+        self.report(f'POST /api/recipes/ x{count}', sequential)
+        self.report(f'POST /api/recipes/batch/ ({count} рецептов)', batched)
+        self.report('Ускорение', sequential / batched, unit='раз')
+
+    def get_cursor(self, page: int, page_size: int) -> str:
+        """Курсор, указывающий на начало страницы page (сортировка -id)."""
+
+        position = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True
+        )[(page - 1) * page_size - 1]
+        paginator = RecipeCursorPagination()
+        paginator.base_url = '/api/recipes/'
+        url = paginator.encode_cursor(
+            Cursor(offset=0, reverse=False, position=str(position))
+        )
+        return parse_qs(urlparse(url).query)[paginator.cursor_query_param][0]
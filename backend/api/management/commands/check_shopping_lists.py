@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import termcolors
+
+from recipes.shopping_list import find_differences, rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверка готовых списков покупок с суммой ингредиентов по корзинам. '
+        'При расхождении команда завершается с ошибкой.'
+    )
+    shown_limit = 20
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.style.NOTICE = termcolors.make_style(fg='cyan', opts=('bold',))
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Пересобрать разошедшиеся списки'
+        )
+
+    def handle(self, *args, **options):
+        users_ids = set()
+        rows = 0
+        for user_id, ingredient_id, expected, actual in find_differences():
+            users_ids.add(user_id)
+            rows += 1
+            if rows <= self.shown_limit:
+                self.stdout.write(
+                    f'Пользователь #{user_id}, ингредиент #{ingredient_id}: '
+                    f'по корзине {expected}, в списке {actual}'
+                )
+        self.stdout.write(self.style.NOTICE(
+            f'Строк с расхождениями: {rows}, '
+            f'пользователей: {len(users_ids)}'
+        ))
+        if options['rebuild']:
+            created = rebuild_shopping_lists(sorted(users_ids))
+            self.stdout.write(self.style.SUCCESS(
+                f'Списки пересобраны, строк: {created}.'
+            ))
+        elif rows:
+            raise CommandError('Списки покупок расходятся с корзинами.')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                'Списки покупок совпадают с корзинами.'
+            ))
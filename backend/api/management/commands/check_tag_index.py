@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import termcolors
+
+from api.tag_index import tag_index
+from recipes.models import Tag
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверка индекса тегов в памяти (RECIPE_TAG_INDEX) с таблицей связей '
+        'рецептов и тегов. Индекс строится или обновляется так же, как в '
+        'приложении; при расхождении команда завершается с ошибкой.'
+    )
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.style.NOTICE = termcolors.make_style(fg='cyan', opts=('bold',))
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Пометить индекс устаревшим во всех процессах'
+        )
+
+    def handle(self, *args, **options):
+        differences = tag_index.check()
+        self.stdout.write(self.style.NOTICE(
+            f'Тегов в индексе: {len(tag_index.bitmaps)}, '
+            f'с расхождениями: {len(differences)}'
+        ))
+        slugs = dict(
+            Tag.objects.filter(id__in=differences).values_list('id', 'slug')
+        )
+        for tag_id, (missing, extra) in sorted(differences.items()):
+            self.stdout.write(
+                f'Тег {slugs.get(tag_id, f"#{tag_id}")}: '
+                f'нет в индексе {missing}, лишних {extra}'
+            )
+        if options['rebuild']:
+            tag_index.invalidate()
+            self.stdout.write(self.style.SUCCESS(
+                'Индекс будет перестроен при следующем запросе.'
+            ))
+        elif differences:
+            raise CommandError('Индекс тегов расходится с БД.')
+        else:
+            self.stdout.write(self.style.SUCCESS('Индекс совпадает с БД.'))
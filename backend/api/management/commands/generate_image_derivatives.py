@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.utils import termcolors
+
+from api.image_derivatives import MODEL_DERIVATIVES, generate_derivatives
+from api.image_tasks import clear_tasks, get_failed_names
+
+
+class Command(BaseCommand):
+    help = (
+        'Создание производных картинок (уменьшенные копии рецептов, '
+        'квадратные аватары) для уже загруженных файлов. Существующие '
+        'производные пропускаются, если не указан --force. Ошибки '
+        'фоновой обработки обработанных картинок снимаются.'
+    )
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.style.NOTICE = termcolors.make_style(fg='cyan', opts=('bold',))
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать и уже существующие производные'
+        )
+
+    def handle(self, *args, **options):
+        failed = 0
+        for model, (field_name, _) in MODEL_DERIVATIVES.items():
+            instances = model.objects.exclude(
+                **{field_name: ''}
+            ).exclude(**{f'{field_name}__isnull': True}).only(
+                'id', field_name
+            ).order_by('id')
+            created = 0
+            failed_names = get_failed_names(model)
+            fixed_names = set()
+            for instance in instances.iterator():
+                try:
+                    created += generate_derivatives(
+                        instance, force=options['force']
+                    )
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{instance!r}: {error}')
+                    continue
+                name = getattr(instance, field_name).name
+                if name in failed_names:
+                    fixed_names.add(name)
+            # Производные есть - поле images больше не null
+            clear_tasks(model, fixed_names)
+            self.stdout.write(self.style.NOTICE(
+                f'{model._meta.verbose_name_plural}: создано файлов '
+                f'{created}'
+            ))
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'Не удалось обработать картинок: {failed}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,129 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Optional
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import termcolors
+
+from api.image_tasks import claim_tasks, complete_task, process_image_file
+from recipes.models import ImageTask
+
+
+class Command(BaseCommand):
+    help = (
+        'Фоновая обработка загруженных картинок: полная проверка и '
+        'создание производных в пуле процессов. Работает, пока не '
+        'остановят; с --once - пока в очереди есть задачи.'
+    )
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.style.NOTICE = termcolors.make_style(fg='cyan', opts=('bold',))
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help=(
+                'Количество процессов обработки (по умолчанию - по числу '
+                'ядер, 0 - в текущем процессе)'
+            )
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь и завершиться'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустой очереди, с (по умолчанию 1)'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=3,
+            help='Попыток обработки до ошибки (по умолчанию 3)'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=600,
+            help=(
+                'Через сколько секунд задача упавшего воркера выдаётся '
+                'снова (по умолчанию 600)'
+            )
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.pool: Optional[ProcessPoolExecutor] = None
+        processed = failed = 0
+        try:
+            while True:
+                close_old_connections()
+                tasks = claim_tasks(
+                    max(options['workers'], 1) * 2, options['stale_after']
+                )
+                if not tasks:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                for task, error in zip(tasks, self.run(tasks)):
+                    complete_task(task, error, options['max_attempts'])
+                    if error is None:
+                        processed += 1
+                    else:
+                        failed += task.status == ImageTask.Status.FAILED
+                        self.stderr.write(f'{task.name}: {error}')
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+        self.stdout.write(self.style.NOTICE(
+            f'Обработано картинок: {processed}'
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'Не удалось обработать картинок: {failed}'
+            ))
+
+    def run(self, tasks: list[ImageTask]) -> list[Optional[BaseException]]:
+        """Обрабатывает картинки задач, возвращает ошибки (None - успех)."""
+
+        arguments = [
+            (task.content_type.model_class()._meta.label, task.name)
+            for task in tasks
+        ]
+        if not self.options['workers']:
+            return [self.call(*item) for item in arguments]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                self.options['workers'], mp_context=get_context('spawn'),
+                initializer=django.setup
+            )
+        futures: list[Future] = [
+            self.pool.submit(process_image_file, *item) for item in arguments
+        ]
+        errors = [future.exception() for future in futures]
+        if any(isinstance(error, BrokenProcessPool) for error in errors):
+            # Процесс пула убит (например, по памяти): задачи пойдут на
+            # повтор, пул создаём заново
+            self.pool.shutdown()
+            self.pool = None
+        return errors
+
+    @staticmethod
+    def call(model_label: str, name: str) -> Optional[BaseException]:
+        try:
+            process_image_file(model_label, name)
+        except Exception as error:
+            return error
+        return None
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересборка готовых списков покупок по корзинам: всех или только '
+        'указанных пользователей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            nargs='+',
+            dest='users_ids',
+            help='id пользователей (по умолчанию - все)'
+        )
+
+    def handle(self, *args, **options):
+        created = rebuild_shopping_lists(options['users_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны, строк: {created}.'
+        ))
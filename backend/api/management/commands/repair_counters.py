@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import termcolors
+
+from recipes.models import Recipe, RecipeFavorite, ShoppingCart
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт счётчиков избранного и корзины у рецептов '
+        '(favorites_count, shopping_cart_count).'
+    )
+    counters = {
+        'favorites_count': RecipeFavorite,
+        'shopping_cart_count': ShoppingCart,
+    }
+    batch_size = 1000
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.style.NOTICE = termcolors.make_style(fg='cyan', opts=('bold',))
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать количество рецептов с неверными счётчиками'
+        )
+
+    def get_actual_counts(self) -> dict:
+        """Выражения с фактическим количеством записей для каждого счётчика."""
+
+        return {
+            field: Coalesce(
+                Subquery(
+                    model.objects.filter(recipe=OuterRef('pk')).order_by()
+                    .values('recipe').annotate(count=Count('pk'))
+                    .values('count')
+                ),
+                Value(0)
+            ) for field, model in self.counters.items()
+        }
+
+    def handle(self, *args, **options):
+        actual_counts = self.get_actual_counts()
+        broken_ids = list(
+            Recipe.objects.annotate(**{
+                f'actual_{field}': expression
+                for field, expression in actual_counts.items()
+            }).filter(Q(*(
+                ~Q(**{field: F(f'actual_{field}')})
+                for field in self.counters
+            ), _connector=Q.OR)).values_list('id', flat=True)
+        )
+        self.stdout.write(self.style.NOTICE(
+            f'Рецептов с неверными счётчиками: {len(broken_ids)}'
+        ))
+        if options['dry_run'] or not broken_ids:
+            return
+
+        with transaction.atomic():
+            for start in range(0, len(broken_ids), self.batch_size):
+                Recipe.objects.filter(
+                    id__in=broken_ids[start:start + self.batch_size]
+                ).update(**actual_counts)
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
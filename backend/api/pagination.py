@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+    _positive_int
+)
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+
+from recipes.feed import get_feed_recipes_ids
+
+User = get_user_model()
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация рецептов.
+
+    Не выполняет COUNT(*) и OFFSET: следующая страница ищется по значению
+    ключа сортировки последней записи, поэтому глубокие страницы отдаются
+    так же быстро, как первая. Ключи сортировки:
+    * -id - по умолчанию
+    * pub_date / -pub_date - если передан параметр ordering
+    """
+
+    page_size_query_param = 'limit'
+    max_page_size = settings.PAGE_SIZE_MAX
+    ordering_query_param = 'ordering'
+    ordering = '-id'
+    orderings = {
+        '-id': ('-id',),
+        'pub_date': ('pub_date', 'id'),
+        '-pub_date': ('-pub_date', '-id'),
+    }
+
+    def get_ordering(
+        self, request: Request, queryset: QuerySet, view: APIView
+    ) -> tuple:
+        ordering = request.query_params.get(self.ordering_query_param)
+        return self.orderings.get(ordering, self.orderings[self.ordering])
+
+
+class RecipePagination(PageNumberPagination):
+    """
+    Пагинация ленты рецептов.
+
+    По умолчанию постраничная, с прежней структурой ответа
+    (count, next, previous, results). Курсорный режим включается
+    параметром ?pagination=cursor либо наличием ?cursor= - тогда
+    в ответе next/previous содержат непрозрачные курсоры, а count
+    отсутствует.
+    """
+
+    page_size_query_param = 'limit'
+    max_page_size = settings.PAGE_SIZE_MAX
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_pagination_class = RecipeCursorPagination
+
+    def is_cursor_mode(self, request: Request) -> bool:
+        return (
+            request.query_params.get(self.mode_query_param)
+            == self.cursor_mode
+            or self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request,
+        view: Optional[APIView] = None
+    ) -> Optional[list]:
+        self.cursor_paginator = None
+        if self.is_cursor_mode(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: list) -> Response:
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class FeedPagination(BasePagination):
+    """
+    Keyset-пагинация ленты подписок по id рецепта.
+
+    Следующая страница запрашивается с ?before=<id последнего рецепта>,
+    поэтому каждая страница - один проход по индексу ленты, без COUNT(*)
+    и OFFSET. В ответе next и results. Размер страницы (?limit=)
+    ограничен max_page_size.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = settings.PAGE_SIZE_MAX
+    before_query_param = 'before'
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            return min(_positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True
+            ), self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_before(self, request: Request) -> Optional[int]:
+        try:
+            return _positive_int(
+                request.query_params[self.before_query_param], strict=True
+            )
+        except (KeyError, ValueError):
+            return None
+
+    def paginate_feed(self, user: User, request: Request) -> list[int]:
+        """id рецептов страницы ленты пользователя."""
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        recipes_ids = get_feed_recipes_ids(
+            user.id, page_size + 1, before=self.get_before(request)
+        )
+        self.has_next = len(recipes_ids) > page_size
+        self.recipes_ids = recipes_ids[:page_size]
+        return self.recipes_ids
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.before_query_param,
+            self.recipes_ids[-1]
+        )
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
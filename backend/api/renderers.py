@@ -0,0 +1,191 @@
+"""
+Форматы скачивания списка покупок.
+
+Формат выбирает стандартное согласование DRF: ?format=<формат> или
+заголовок Accept, по умолчанию - первый в SHOPPING_LIST_RENDERERS.
+Каждый рендерер отдаёт файл потоком (stream) из итератора строк
+(название, единица измерения, количество): список не собирается в
+памяти целиком. PDF собирается в отдельном процессе
+(api/shopping_list_pdf.py), чтобы не занимать воркер.
+
+Через render проходят только ответы с ошибками.
+"""
+
+import csv
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from api.utils import EchoBuffer
+
+logger = logging.getLogger(__name__)
+
+ShoppingListRow = tuple[str, str, int]
+
+SHOPPING_LIST_TITLE = 'Список покупок'
+SHOPPING_LIST_HEADER = ['Ингредиент', 'Единица измерения', 'Количество']
+PDF_SCRIPT_PATH = Path(__file__).resolve().parent / 'shopping_list_pdf.py'
+CHUNK_SIZE = 64 * 1024
+
+
+def get_error_messages(data) -> list[str]:
+    """Тексты ошибок из ответа DRF ({'detail': ...} или {поле: [...]})."""
+
+    if isinstance(data, dict):
+        return [
+            message for value in data.values()
+            for message in get_error_messages(value)
+        ]
+    if isinstance(data, list):
+        return [
+            message for value in data for message in get_error_messages(value)
+        ]
+    return [str(data)]
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Заготовка потокового рендерера списка покупок."""
+
+    charset = 'utf-8'
+    extension: str = None
+
+    @property
+    def content_type(self) -> str:
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    def stream(self, rows: Iterable[ShoppingListRow]) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return '\n'.join(get_error_messages(data)).encode(
+            self.charset, errors='replace'
+        )
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    """CSV в cp1251 - его без настроек открывает Excel."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'cp1251'
+    extension = 'csv'
+
+    def stream(self, rows: Iterable[ShoppingListRow]) -> Iterator[bytes]:
+        # Символы, которых нет в кодировке, заменяются на «?»: ошибку
+        # посреди уже отправляемого файла клиенту не показать
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(SHOPPING_LIST_HEADER).encode(
+            self.charset, errors='replace'
+        )
+        for row in rows:
+            yield writer.writerow(row).encode(self.charset, errors='replace')
+
+
+class ShoppingListUTF8CSVRenderer(ShoppingListCSVRenderer):
+    format = 'csv-utf8'
+    charset = 'utf-8'
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    extension = 'txt'
+
+    def stream(self, rows: Iterable[ShoppingListRow]) -> Iterator[bytes]:
+        yield f'{SHOPPING_LIST_TITLE}\n\n'.encode(self.charset)
+        for name, measurement_unit, amount in rows:
+            yield f'{name} ({measurement_unit}) — {amount}\n'.encode(
+                self.charset
+            )
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    extension = 'json'
+
+    def stream(self, rows: Iterable[ShoppingListRow]) -> Iterator[bytes]:
+        separator = '['
+        for name, measurement_unit, amount in rows:
+            item = json.dumps({
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'total_amount': amount
+            }, ensure_ascii=False)
+            yield f'{separator}{item}'.encode(self.charset)
+            separator = ','
+        yield b'[]' if separator == '[' else b']'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    extension = 'pdf'
+
+    def stream(self, rows: Iterable[ShoppingListRow]) -> Iterator[bytes]:
+        return self.run(SHOPPING_LIST_TITLE, rows)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return b''.join(self.run(' '.join(get_error_messages(data)), []))
+
+    @staticmethod
+    def run(title: str, rows: Iterable[ShoppingListRow]) -> Iterator[bytes]:
+        process = subprocess.Popen(
+            [
+                sys.executable, '-I', str(PDF_SCRIPT_PATH),
+                settings.SHOPPING_LIST_PDF_FONT, title
+            ],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        try:
+            # Процесс пишет PDF только после конца ввода, поэтому сначала
+            # передаём все строки, потом читаем результат
+            for row in rows:
+                process.stdin.write(
+                    json.dumps(row, ensure_ascii=False).encode() + b'\n'
+                )
+            process.stdin.close()
+            while True:
+                chunk = process.stdout.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+            errors = process.stderr.read().decode(errors='replace').strip()
+            if process.wait():
+                raise RuntimeError(f'Не удалось создать PDF: {errors}')
+            if errors:
+                logger.warning(errors)
+        finally:
+            # Клиент мог не дочитать ответ
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+
+# Порядок - приоритет при согласовании, первый - формат по умолчанию
+SHOPPING_LIST_RENDERERS = [
+    ShoppingListCSVRenderer,
+    ShoppingListUTF8CSVRenderer,
+    ShoppingListTextRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListPDFRenderer,
+]
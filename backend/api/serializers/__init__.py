@@ -5,15 +5,14 @@ from api.serializers.recipe import (
     RecipeChangeSerializer,
     RecipeGetSerializer
 )
+from api.serializers.recipe_batch import RecipeBatchSerializer
 from api.serializers.recipe_favorite import RecipeFavoriteSerializer
 from api.serializers.recipe_ingredients import (
     RecipeIngredientsGetSerializer,
     RecipeIngredientsSetSerializer
 )
-from api.serializers.shopping_cart import (
-    DownloadShoppingCartSerializer,
-    ShoppingCartSerializer
-)
+from api.serializers.recipe_values import RecipeValuesSerializer
+from api.serializers.shopping_cart import ShoppingCartSerializer
 from api.serializers.subscription import (
     SubscriptionChangedSerializer,
     SubscriptionGetSerializer
@@ -25,12 +24,13 @@ __all__ = [
     'AvatarSerializer',
     'BaseRecipeSerializer',
     'CurrentUserSerializer',
-    'DownloadShoppingCartSerializer',
     'IngredientSerializer',
+    'RecipeBatchSerializer',
     'RecipeChangeSerializer',
     'RecipeGetSerializer',
     'RecipeIngredientsGetSerializer',
     'RecipeIngredientsSetSerializer',
+    'RecipeValuesSerializer',
     'RecipeFavoriteSerializer',
     'ShoppingCartSerializer',
     'SubscriptionChangedSerializer',
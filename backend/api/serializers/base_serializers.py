@@ -4,28 +4,156 @@
 несёт поясняющий характер, не более.
 """
 
-import base64
+from typing import Any, Iterable, Optional
 
-from django.core.files.base import ContentFile
+from django.db.models import Model, QuerySet
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.image_tasks import get_images_urls
+from api.images import decode_base64_image, is_base64_image
+from api.serializers.images import ImagesListSerializer
 from api.serializers.user import UserSerializer
 from recipes.models.abstract_models import BaseActionRecipeModel
 from recipes.models.recipe import Recipe
 
 
 class Base64ImageField(serializers.ImageField):
-    """Сериалайзер под картинки. Преобразует входные данные в Base64."""
+    """
+    Сериалайзер под картинки в Base64.
+
+    Картинка декодируется во временный файл и проверяется в отдельном
+    процессе (см. api.images), поэтому Pillow в воркере её не открывает.
+    """
+
+    def to_internal_value(self, data):
+        if not is_base64_image(data):
+            return super().to_internal_value(data)
+        # Проверки имени и размера файла из FileField, без Pillow
+        return serializers.FileField.to_internal_value(
+            self, decode_base64_image(data)
+        )
+
+
+def get_pk_values(values: Any) -> list[int]:
+    """
+    Целые id из непроверенных данных без повторов, мусор пропускается.
 
-    def to_internal_value(self, data: str):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+    У элементов-словарей берётся ключ id (ингредиенты рецепта).
+    """
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    if not isinstance(values, list):
+        return []
+    pk_values = {}
+    for value in values:
+        if isinstance(value, dict):
+            value = value.get('id')
+        if isinstance(value, bool):
+            continue
+        try:
+            pk_values[int(value)] = None
+        except (TypeError, ValueError):
+            continue
+    return list(pk_values)
+
+
+def preload_objects(
+    context: dict, queryset: QuerySet, pk_values: Iterable[int]
+) -> dict[int, Optional[Model]]:
+    """
+    Догружает в context['preloaded'] объекты queryset одним запросом IN.
 
-        return super().to_internal_value(data)
+    context['preloaded'] - {модель: {pk: объект}}. Ненайденные id
+    запоминаются как None, чтобы не искать их повторно.
+    """
+
+    preloaded = context.setdefault('preloaded', {}).setdefault(
+        queryset.model, {}
+    )
+    missing = set(pk_values) - preloaded.keys()
+    if missing:
+        found = queryset.in_bulk(missing)
+        preloaded.update((pk, found.get(pk)) for pk in missing)
+    return preloaded
+
+
+class PreloadedManyRelatedField(serializers.ManyRelatedField):
+    """
+    Список связей: все id загружаются одним запросом, а все
+    несуществующие id попадают в одну ошибку.
+    """
+
+    child_relation: 'PreloadedPrimaryKeyRelatedField'
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        pk_values = [child.to_pk(item) for item in data]
+        preloaded = child.get_preloaded(pk_values)
+        child.check_missing(pk_values, preloaded)
+        return [preloaded[pk] for pk in pk_values]
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, который ищет объекты пачкой.
+
+    Объекты берутся из context['preloaded'], недостающие догружаются
+    одним запросом (preload_objects). Пакетная загрузка рецептов кладёт
+    туда объекты всего пакета заранее, а с many=True весь список id
+    проверяется одним запросом.
+    """
+
+    default_error_messages = {
+        'does_not_exist_many': (
+            'Недопустимые первичные ключи {pk_values} - '
+            'объектов не существует.'
+        ),
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        list_kwargs.update(
+            (key, value) for key, value in kwargs.items()
+            if key in MANY_RELATION_KWARGS
+        )
+        return PreloadedManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data) -> int:
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def get_preloaded(
+        self, pk_values: Iterable[int]
+    ) -> dict[int, Optional[Model]]:
+        return preload_objects(self.context, self.get_queryset(), pk_values)
+
+    def check_missing(
+        self, pk_values: Iterable[int], preloaded: dict
+    ) -> None:
+        """Одна ошибка на все id, которых нет в БД."""
+
+        missing = [pk for pk in pk_values if preloaded.get(pk) is None]
+        if missing:
+            self.fail('does_not_exist_many', pk_values=', '.join(
+                str(pk) for pk in dict.fromkeys(missing)
+            ))
+
+    def to_internal_value(self, data):
+        pk = self.to_pk(data)
+        instance = self.get_preloaded([pk]).get(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
 
 
 class AvatarSerializer(serializers.Serializer):
@@ -43,14 +171,21 @@ class BaseRecipeSerializer(serializers.ModelSerializer):
     - id
     - name
     - image
+    - images (производные картинки, null до их создания, см.
+      api.image_tasks)
     - cooking_time
     """
 
     image = Base64ImageField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
+        list_serializer_class = ImagesListSerializer
+
+    def get_images(self, obj: Recipe):
+        return get_images_urls(self.context, Recipe, obj.image.name)
 
 
 class BaseRecipeActionSerializer(serializers.ModelSerializer):
@@ -85,4 +220,6 @@ class BaseRecipeActionSerializer(serializers.ModelSerializer):
         self.Meta.validators = self.get_validators()
 
     def to_representation(self, instance: BaseActionRecipeModel):
-        return BaseRecipeSerializer(instance.recipe).data
+        return BaseRecipeSerializer(
+            instance.recipe, context=self.context
+        ).data
@@ -0,0 +1,33 @@
+from typing import Iterator
+
+from django.db.models import Manager, Model
+from rest_framework import serializers
+
+from api.image_derivatives import MODEL_DERIVATIVES
+from api.image_tasks import check_images
+
+
+class ImagesListSerializer(serializers.ListSerializer):
+    """
+    List-сериалайзер моделей с полем images.
+
+    Готовность производных картинок всей страницы проверяется одним
+    запросом до сериализации объектов (см. api.image_tasks).
+    """
+
+    def get_images(
+        self, instances: list[Model]
+    ) -> Iterator[tuple[type[Model], str]]:
+        """Картинки страницы для проверки: (модель, имя картинки)."""
+
+        if 'images' not in self.child.fields:
+            return
+        model = self.child.Meta.model
+        field_name, _ = MODEL_DERIVATIVES[model]
+        for instance in instances:
+            yield model, getattr(instance, field_name).name
+
+    def to_representation(self, data):
+        iterable = list(data.all() if isinstance(data, Manager) else data)
+        check_images(self.context, self.get_images(iterable))
+        return super().to_representation(iterable)
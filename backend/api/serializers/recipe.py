@@ -1,27 +1,50 @@
-from collections import OrderedDict
-from functools import wraps
-from typing import Optional
+from collections import Counter, OrderedDict
+from functools import lru_cache, wraps
+from typing import Iterable, Iterator, Optional
 
-from django.db.models import Model
+from django.db import transaction
+from django.db.models import (
+    Manager,
+    Model,
+    Prefetch,
+    QuerySet,
+    prefetch_related_objects
+)
 from rest_framework import serializers
 from rest_framework.request import Request
 
-from api.serializers.base_serializers import BaseRecipeSerializer
+from api.cache import (
+    bump_recipe_version,
+    get_fragment_keys,
+    get_fragment_prefix,
+    get_fragments,
+    set_fragments
+)
+from api.image_tasks import check_images
+from api.serializers.base_serializers import (
+    BaseRecipeSerializer,
+    PreloadedPrimaryKeyRelatedField
+)
 from api.serializers.recipe_ingredients import (
     RecipeIngredientsGetSerializer,
     RecipeIngredientsSetSerializer
 )
 from api.serializers.tag import TagSerializer
 from api.serializers.user import UserSerializer
+from api.sparse_fields import SparseFields, SparseFieldsMixin
+from api.tag_index import update_tag_index
 from api.utils import many_unique_with_minimum_one_validate
 from core.constants import MAX_INTEGER_VALUE, MIN_INTEGER_VALUE
 from recipes.models import (
     Recipe,
     RecipeFavorite,
     RecipeIngredients,
+    RecipeTags,
     ShoppingCart,
     Tag
 )
+from recipes.shopping_list import change_recipe_amounts, get_amounts_difference
+from users.models import User
 
 
 class RecipeSerializer(BaseRecipeSerializer):
@@ -47,19 +70,202 @@ class RecipeSerializer(BaseRecipeSerializer):
         )
 
 
-class RecipeGetSerializer(RecipeSerializer):
-    """Сериалайзер рецептов для GET-методов и для ответов."""
+def get_field_paths(
+    fields: dict[str, serializers.Field], prefix: str = ''
+) -> Iterator[str]:
+    """Пути полей сериалайзера с вложенными: 'author.email'."""
+
+    for name, field in fields.items():
+        path = f'{prefix}{name}'
+        yield path
+        child = getattr(field, 'child', field)
+        if isinstance(child, serializers.Serializer):
+            yield from get_field_paths(child.fields, f'{path}.')
+
+
+@lru_cache(maxsize=None)
+def get_recipe_field_paths() -> tuple[str, ...]:
+    """Все поля ответа RecipeGetSerializer - для ключа фрагментов."""
+
+    return tuple(get_field_paths(RecipeGetSerializer().fields))
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """
+    List-сериалайзер рецептов.
+
+    Передаёт всю страницу дочернему сериалайзеру, чтобы фрагменты
+    рецептов запрашивались из кэша одним обращением.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, Manager) else data
+        return self.child.to_representation_many(iterable)
+
+
+class RecipeGetSerializer(SparseFieldsMixin, RecipeSerializer):
+    """
+    Сериалайзер рецептов для GET-методов и для ответов.
+
+    Общая для всех пользователей часть ответа кэшируется (см. api.cache),
+    персональные флаги вычисляются на каждый запрос.
+    """
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
+    personal_fields = ('is_favorited', 'is_in_shopping_cart')
+    personal_author_fields = ('is_subscribed',)
+
     class Meta(RecipeSerializer.Meta):
         fields = (
             *RecipeSerializer.Meta.fields,
             'is_favorited', 'is_in_shopping_cart'
         )
         read_only_fields = fields
+        list_serializer_class = RecipeListSerializer
+
+    @classmethod
+    def setup_queryset(
+        cls, queryset: QuerySet, sparse_fields: SparseFields
+    ) -> QuerySet:
+        """
+        Всё, что нужно сериалайзеру, грузим заранее: иначе автор, теги и
+        ингредиенты тянутся отдельно на каждый рецепт страницы.
+        """
+
+        if sparse_fields.is_requested('author'):
+            queryset = queryset.select_related('author')
+        if sparse_fields.is_requested('tags'):
+            queryset = queryset.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.all())
+            )
+        if sparse_fields.is_requested('ingredients'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredients.objects.select_related(
+                    'ingredient'
+                )
+            ))
+        if not sparse_fields.is_requested('text'):
+            queryset = queryset.defer('text')
+        return queryset
+
+    def get_cache_prefix(self) -> str:
+        return get_fragment_prefix(
+            self.context.get('request'), get_recipe_field_paths()
+        )
+
+    def to_representation(self, instance: Recipe):
+        return self.to_representation_many([instance])[0]
 
-    def get_is_exists(self, obj: Recipe, model: Model):
+    def to_representation_many(self, instances: list[Recipe]) -> list:
+        keys = get_fragment_keys(instances, prefix=self.get_cache_prefix())
+        fragments = get_fragments(keys.values())
+        fresh = self.get_fresh_instances([
+            instance for instance in instances
+            if keys[instance.id] not in fragments
+        ])
+        self.check_images(fresh.values())
+        new_fragments = {}
+        result = []
+        for instance in instances:
+            key = keys[instance.id]
+            if key in fragments:
+                result.append(self.personalize(instance, fragments[key]))
+                continue
+            if instance.id not in fresh:
+                # Рецепт удалили: отдаём как есть, но не кэшируем
+                result.append(super().to_representation(instance))
+                continue
+            data = super().to_representation(fresh[instance.id])
+            new_fragments[key] = self.get_fragment(data)
+            result.append(data)
+        set_fragments(new_fragments)
+        return result
+
+    def get_fresh_instances(self, instances: list[Recipe]) -> dict:
+        """
+        Заново читает рецепты для фрагментов: {id: рецепт}.
+
+        Переданные рецепты прочитаны до версий, и правка, зафиксированная
+        между двумя чтениями, попала бы в кэш со старыми данными под новой
+        версией. Строки, прочитанные после версий, не старше их.
+        Автор, теги и ингредиенты грузятся только здесь, для промахов
+        кэша. Персональные флаги переносятся из переданных рецептов.
+        """
+
+        if not instances:
+            return {}
+        fresh = {
+            recipe.id: recipe for recipe in self.setup_queryset(
+                Recipe.objects.filter(id__in=[
+                    instance.id for instance in instances
+                ]),
+                SparseFields.from_request(self.context.get('request'))
+            )
+        }
+        for instance in instances:
+            if instance.id not in fresh:
+                continue
+            for field_name in self.personal_fields:
+                if hasattr(instance, field_name):
+                    setattr(
+                        fresh[instance.id], field_name,
+                        getattr(instance, field_name)
+                    )
+        return fresh
+
+    def check_images(self, instances: Iterable[Recipe]) -> None:
+        """Готовность производных картинок страницы - одним запросом."""
+
+        author_fields = getattr(self.fields.get('author'), 'fields', {})
+        images = []
+        for instance in instances:
+            if 'images' in self.fields:
+                images.append((Recipe, instance.image.name))
+            if 'images' in author_fields:
+                images.append((User, instance.author.avatar.name))
+        check_images(self.context, images)
+
+    def get_fragment(self, data: OrderedDict) -> OrderedDict:
+        """Убирает из ответа поля, зависящие от пользователя."""
+
+        fragment = OrderedDict(
+            (key, value) for key, value in data.items()
+            if key not in self.personal_fields
+        )
+        if 'author' in fragment:
+            fragment['author'] = OrderedDict(
+                (key, value) for key, value in data['author'].items()
+                if key not in self.personal_author_fields
+            )
+        return fragment
+
+    def personalize(self, instance: Recipe, fragment: OrderedDict):
+        """Дополняет фрагмент из кэша полями текущего пользователя."""
+
+        data = OrderedDict(fragment)
+        if 'author' in data:
+            author_serializer: UserSerializer = self.fields['author']
+            data['author'] = OrderedDict(fragment['author'])
+            if 'is_subscribed' in author_serializer.fields:
+                # Автор рецепта не загружается: для флага нужен только id
+                data['author']['is_subscribed'] = (
+                    author_serializer.get_is_subscribed(
+                        User(id=instance.author_id)
+                    )
+                )
+        for field_name in self.personal_fields:
+            if field_name in self.fields:
+                data[field_name] = self.fields[field_name].to_representation(
+                    instance
+                )
+        return data
+
+    def get_is_exists(self, obj: Recipe, model: Model, annotation: str):
+        # Значение уже посчитано во вьюсете через Exists()
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
         request: Optional[Request] = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
@@ -68,16 +274,18 @@ class RecipeGetSerializer(RecipeSerializer):
         ).exists()
 
     def get_is_favorited(self, obj: Recipe):
-        return self.get_is_exists(obj, RecipeFavorite)
+        return self.get_is_exists(obj, RecipeFavorite, 'is_favorited')
 
     def get_is_in_shopping_cart(self, obj: Recipe):
-        return self.get_is_exists(obj, ShoppingCart)
+        return self.get_is_exists(
+            obj, ShoppingCart, 'is_in_shopping_cart'
+        )
 
 
 class RecipeChangeSerializer(RecipeSerializer):
     """Сериалайзер для изменения рецептов"""
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PreloadedPrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all(),
         required=True
     )
@@ -125,31 +333,137 @@ class RecipeChangeSerializer(RecipeSerializer):
             validated_data: dict = args[-1]
             ingredients: list[dict] = validated_data.pop('recipe_ingredients')
             tags = validated_data.pop('tags')
-            recipe: Recipe = func(self, *args, **kwargs)
-
-            recipe.tags.set(tags)
-            ingredient_recipe = [
-                RecipeIngredients(
-                    recipe=recipe,
-                    ingredient=ingredient.get('id'),
-                    amount=ingredient.get('amount')
-                ) for ingredient in ingredients
-            ]
-            RecipeIngredients.objects.bulk_create(ingredient_recipe)
+            # Новому рецепту сравнивать не с чем
+            is_new = len(args) == 1
+            with transaction.atomic():
+                recipe: Recipe = func(self, *args, **kwargs)
+                tags_changed = self.set_tags(recipe, tags, is_new)
+                ingredients_changed = self.set_ingredients(
+                    recipe, ingredients, is_new
+                )
+            if tags_changed or ingredients_changed:
+                # bulk-операции не отправляют сигналы - сбрасываем кэш явно
+                bump_recipe_version(recipe.id)
             return recipe
         return wrapper
 
+    def set_tags(self, recipe: Recipe, tags: list[Tag], is_new: bool) -> bool:
+        """Добавляет и удаляет только изменившиеся теги рецепта."""
+
+        tags_ids = {tag.id for tag in tags}
+        current_ids = set() if is_new else set(
+            RecipeTags.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True
+            )
+        )
+        removed_ids = current_ids - tags_ids
+        added_ids = tags_ids - current_ids
+        if removed_ids:
+            RecipeTags.objects.filter(
+                recipe=recipe, tag_id__in=removed_ids
+            ).delete()
+        if added_ids:
+            # Не через tags.add(): он заново читает уже привязанные теги
+            RecipeTags.objects.bulk_create(
+                RecipeTags(recipe=recipe, tag_id=tag_id)
+                for tag_id in added_ids
+            )
+            update_tag_index(
+                (tag_id, recipe.id, True) for tag_id in added_ids
+            )
+        return bool(removed_ids or added_ids)
+
+    def set_ingredients(
+        self, recipe: Recipe, ingredients: list[dict], is_new: bool
+    ) -> bool:
+        """
+        Приводит ингредиенты рецепта к переданным минимумом запросов.
+
+        Строки с тем же ингредиентом и количеством не трогаются, у
+        изменившихся обновляется только количество, повторы ингредиента
+        (из старых данных) удаляются. Порядок ингредиентов в ответе -
+        порядок строк, поэтому новые строки добавляются в конец, а если
+        запрос переставил оставшиеся ингредиенты, строки пересоздаются в
+        его порядке. Разница количеств применяется к спискам покупок тех,
+        у кого рецепт в корзине.
+        """
+
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        rows = [] if is_new else list(
+            RecipeIngredients.objects.filter(recipe=recipe).only(
+                'id', 'ingredient_id', 'amount'
+            ).order_by('pk')
+        )
+        old_amounts = Counter()
+        current, deleted = {}, []
+        for row in rows:
+            ingredient_id = row.ingredient_id
+            old_amounts[ingredient_id] += row.amount
+            if ingredient_id in amounts and ingredient_id not in current:
+                current[ingredient_id] = row
+            else:
+                # Ингредиента больше нет в рецепте или строка - его повтор
+                deleted.append(row)
+        created_ids = [
+            ingredient_id for ingredient_id in amounts
+            if ingredient_id not in current
+        ]
+        # Оставшиеся строки переставлены или новая встала не в конец
+        if [*current, *created_ids] != list(amounts):
+            deleted.extend(current.values())
+            current = {}
+            created_ids = list(amounts)
+        updated = []
+        for ingredient_id, row in current.items():
+            if row.amount != amounts[ingredient_id]:
+                row.amount = amounts[ingredient_id]
+                updated.append(row)
+        if deleted:
+            RecipeIngredients.objects.filter(
+                id__in=[row.id for row in deleted]
+            ).delete()
+        if updated:
+            RecipeIngredients.objects.bulk_update(updated, ['amount'])
+        if created_ids:
+            RecipeIngredients.objects.bulk_create(
+                RecipeIngredients(
+                    recipe=recipe, ingredient_id=ingredient_id,
+                    amount=amounts[ingredient_id]
+                ) for ingredient_id in created_ids
+            )
+        if not is_new:
+            change_recipe_amounts(
+                recipe.id, get_amounts_difference(old_amounts, amounts)
+            )
+        return bool(deleted or updated or created_ids)
+
     @added_tags_ingredients
     def create(self, validated_data: dict):
         return Recipe.objects.create(**validated_data)
 
     @added_tags_ingredients
     def update(self, instance: Recipe, validated_data: dict):
-        super().update(instance, validated_data)
-        instance.recipe_ingredients.all().delete()
+        # Сохраняем только изменившиеся поля: правка описания не должна
+        # перезаписывать остальные колонки
+        changed_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in changed_fields:
+            setattr(instance, field, validated_data[field])
+        if changed_fields:
+            instance.save(update_fields=changed_fields)
         return instance
 
     def to_representation(self, instance):
+        # Ингредиенты ответа - одним запросом, а не по запросу на строку
+        prefetch_related_objects([instance], Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredients.objects.select_related('ingredient')
+        ))
         return RecipeGetSerializer(
             instance, context=self.context
         ).data
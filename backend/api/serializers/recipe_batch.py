@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework import serializers
+
+from api.image_tasks import enqueue_images
+from api.serializers.base_serializers import (
+    BaseRecipeSerializer,
+    get_pk_values,
+    preload_objects
+)
+from api.serializers.recipe import RecipeChangeSerializer
+from api.tag_index import update_tag_index
+from recipes.feed import fan_out_recipes
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    RecipeTags,
+    Tag
+)
+
+
+def create_recipe_rows(recipes: list[Recipe]) -> bool:
+    """
+    Записывает рецепты, заполняя их id.
+
+    Одним bulk_create, если база возвращает id вставленных строк
+    (PostgreSQL), иначе (SQLite в Django 3.2) - по одному через save().
+    Возвращает True для bulk_create: сигналы рецептов не отправлены.
+    """
+
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+        return True
+    for recipe in recipes:
+        recipe.save()
+    return False
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """
+    Пакетное создание рецептов (POST /api/recipes/batch/).
+
+    Каждый рецепт проверяется как в POST /api/recipes/, но теги и
+    ингредиенты всех рецептов загружаются двумя запросами на весь пакет.
+    Корректные рецепты, их теги и ингредиенты записываются в одной
+    транзакции: теги и ингредиенты - через bulk_create, рецепты - см.
+    create_recipe_rows. Ошибки возвращаются по индексам.
+    """
+
+    recipes = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False
+    )
+
+    def validate_recipes(self, recipes: list[dict]) -> list[dict]:
+        limit = settings.RECIPES_BATCH_LIMIT
+        if len(recipes) > limit:
+            raise serializers.ValidationError(
+                f'Не больше {limit} рецептов за запрос.'
+            )
+        return recipes
+
+    def get_preloaded(self, recipes: list[dict]) -> dict:
+        """Теги и ингредиенты всего пакета: по запросу на модель."""
+
+        tags_ids, ingredients_ids = set(), set()
+        for recipe in recipes:
+            tags_ids.update(get_pk_values(recipe.get('tags')))
+            ingredients_ids.update(get_pk_values(recipe.get('ingredients')))
+        context = {}
+        preload_objects(context, Tag.objects.all(), tags_ids)
+        preload_objects(context, Ingredient.objects.all(), ingredients_ids)
+        return context['preloaded']
+
+    def create(self, validated_data: dict) -> list[dict]:
+        """Создаёт корректные рецепты, возвращает результат по каждому."""
+
+        recipes: list[dict] = validated_data['recipes']
+        context = {**self.context, 'preloaded': self.get_preloaded(recipes)}
+        # Один экземпляр на весь пакет: поля привязываются один раз
+        child = RecipeChangeSerializer(context=context)
+        results, valid = [], []
+        for index, data in enumerate(recipes):
+            try:
+                valid.append((index, child.run_validation(data)))
+                results.append(None)
+            except serializers.ValidationError as error:
+                results.append({
+                    'index': index,
+                    'errors': serializers.as_serializer_error(error)
+                })
+        if valid:
+            created = self.create_recipes(
+                [recipe_data for _, recipe_data in valid]
+            )
+            data = BaseRecipeSerializer(
+                created, many=True, context=self.context
+            ).data
+            for (index, _), recipe in zip(valid, data):
+                results[index] = {'index': index, 'recipe': recipe}
+        return results
+
+    def create_recipes(self, recipes_data: list[dict]) -> list[Recipe]:
+        author = self.context['request'].user
+        recipes, tags, ingredients = [], [], []
+        for data in recipes_data:
+            data = dict(data)
+            data.pop('author', None)
+            tags.append(data.pop('tags'))
+            ingredients.append(data.pop('recipe_ingredients'))
+            recipes.append(Recipe(author=author, **data))
+        with transaction.atomic():
+            signals_skipped = create_recipe_rows(recipes)
+            recipe_tags = [
+                RecipeTags(recipe=recipe, tag=tag)
+                for recipe, recipe_tags in zip(recipes, tags)
+                for tag in recipe_tags
+            ]
+            RecipeTags.objects.bulk_create(recipe_tags)
+            RecipeIngredients.objects.bulk_create(
+                RecipeIngredients(
+                    recipe=recipe,
+                    ingredient=ingredient['id'],
+                    amount=ingredient['amount']
+                )
+                for recipe, recipe_ingredients in zip(recipes, ingredients)
+                for ingredient in recipe_ingredients
+            )
+            # bulk_create не отправляет сигналы: индекс тегов, а без
+            # сигналов рецептов и ленты подписчиков и очередь картинок
+            # обновляем сами
+            update_tag_index(
+                (link.tag_id, link.recipe_id, True) for link in recipe_tags
+            )
+            if signals_skipped:
+                enqueue_images(recipes)
+                transaction.on_commit(lambda: fan_out_recipes(recipes))
+        return recipes
@@ -1,13 +1,33 @@
 from rest_framework import serializers
 
+from api.serializers.base_serializers import (
+    PreloadedPrimaryKeyRelatedField,
+    get_pk_values
+)
+from api.sparse_fields import SparseFieldsMixin
 from core.constants import MAX_INTEGER_VALUE, MIN_INTEGER_VALUE
 from recipes.models import Ingredient, RecipeIngredients
 
 
+class RecipeIngredientsSetListSerializer(serializers.ListSerializer):
+    """
+    List-сериалайзер ингредиентов рецепта на запись.
+
+    До проверки элементов загружает все ингредиенты списка одним
+    запросом и сообщает обо всех несуществующих id одной ошибкой.
+    """
+
+    def to_internal_value(self, data):
+        id_field: PreloadedPrimaryKeyRelatedField = self.child.fields['id']
+        pk_values = get_pk_values(data)
+        id_field.check_missing(pk_values, id_field.get_preloaded(pk_values))
+        return super().to_internal_value(data)
+
+
 class RecipeIngredientsSetSerializer(serializers.ModelSerializer):
     """Сериалайзер связующей рецепты+ингредиенты на запись."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = PreloadedPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all()
     )
     amount = serializers.IntegerField(
@@ -18,9 +38,12 @@ class RecipeIngredientsSetSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredients
         fields = ('id', 'amount')
+        list_serializer_class = RecipeIngredientsSetListSerializer
 
 
-class RecipeIngredientsGetSerializer(serializers.ModelSerializer):
+class RecipeIngredientsGetSerializer(
+    SparseFieldsMixin, serializers.ModelSerializer
+):
     """Сериалайзер связующей рецепты+ингредиенты на чтение."""
 
     id = serializers.ReadOnlyField(source='ingredient.id')
@@ -0,0 +1,301 @@
+"""
+Быстрый путь сериализации списка рецептов.
+
+RecipeValuesSerializer строит тот же ответ, что и RecipeGetSerializer,
+но из строк values_list() и заранее сгруппированных тегов и ингредиентов:
+без экземпляров моделей, привязки полей DRF и вложенных сериалайзеров
+на каждую строку. Только для чтения. Фрагменты в кэше (см. api.cache)
+общие с RecipeGetSerializer.
+"""
+
+from collections import OrderedDict, defaultdict
+from typing import Iterable, NamedTuple, Optional
+
+from django.db.models import Model, QuerySet
+from rest_framework.request import Request
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from api.cache import (
+    get_fragment_keys,
+    get_fragment_prefix,
+    get_fragments,
+    set_fragments
+)
+from api.image_tasks import check_images, get_images_urls
+from api.serializers.recipe import RecipeGetSerializer, get_recipe_field_paths
+from api.sparse_fields import SparseFields
+from recipes.models import Recipe, RecipeIngredients, RecipeTags
+from users.models import Subscription, User
+
+
+class RecipeValuesSerializer:
+    """
+    Сериалайзер списка рецептов по строкам values_list(named=True).
+
+    Повторяет интерфейс list-сериалайзера DRF: принимает строки страницы
+    и контекст, результат отдаёт в data. Строки готовит get_rows.
+    """
+
+    recipe_fields = RecipeGetSerializer.Meta.fields
+    personal_fields = RecipeGetSerializer.personal_fields
+    personal_author_fields = RecipeGetSerializer.personal_author_fields
+    # Поле ответа -> колонка в values_list
+    author_columns = {
+        'id': 'author_id',
+        'email': 'author__email',
+        'username': 'author__username',
+        'first_name': 'author__first_name',
+        'last_name': 'author__last_name',
+        'avatar': 'author__avatar',
+        'images': 'author__avatar',
+    }
+    tag_columns = {
+        'id': 'tag_id',
+        'name': 'tag__name',
+        'slug': 'tag__slug',
+    }
+    ingredient_columns = {
+        'id': 'ingredient_id',
+        'name': 'ingredient__name',
+        'measurement_unit': 'ingredient__measurement_unit',
+        'amount': 'amount',
+    }
+    # Поля ответа, собираемые не из одноимённой колонки
+    nested_fields = ('tags', 'ingredients', 'author')
+    # Поле ответа -> колонка, из которой оно вычисляется
+    derived_fields = {'images': 'image'}
+
+    def __init__(
+        self, instance: Optional[Iterable[NamedTuple]] = None,
+        many: bool = True, context: Optional[dict] = None, **kwargs
+    ):
+        self.instance = instance
+        self.context = context or {}
+
+    @classmethod
+    def get_rows(cls, queryset: QuerySet) -> QuerySet:
+        """
+        Превращает queryset рецептов в узкие строки страницы.
+
+        В строках только то, что нужно пагинации, ETag и персональным
+        полям. Остальные колонки читаются отдельным запросом лишь для
+        рецептов, которых нет в кэше (get_fragments): сортировка и
+        соединения страницы не тащат за собой описание и автора.
+        """
+
+        # pub_date нужен курсорной пагинации для позиции страницы
+        columns = ['id', 'author_id', 'pub_date']
+        # Флаги пользователя уже посчитаны во вьюсете через Exists()
+        columns.extend(
+            name for name in cls.personal_fields
+            if name in queryset.query.annotations
+        )
+        return queryset.prefetch_related(None).values_list(
+            *columns, named=True
+        )
+
+    @classmethod
+    def get_columns(cls, sparse_fields: SparseFields) -> list[str]:
+        """Колонки рецепта и автора, нужные для выбранных полей."""
+
+        columns = ['id']
+        for name in cls.recipe_fields:
+            if (
+                name in columns
+                or name in cls.nested_fields
+                or name in cls.personal_fields
+            ):
+                continue
+            if sparse_fields.is_requested(name):
+                columns.append(cls.derived_fields.get(name, name))
+        columns.extend(
+            column for name, column in cls.author_columns.items()
+            if sparse_fields.is_requested(f'author.{name}')
+        )
+        # image нужна и самой картинке, и её производным
+        return list(dict.fromkeys(columns))
+
+    @property
+    def data(self) -> ReturnList:
+        return ReturnList(
+            self.to_representation(self.instance), serializer=self
+        )
+
+    def to_representation(self, rows: Iterable[NamedTuple]) -> list:
+        rows = list(rows)
+        request: Optional[Request] = self.context.get('request')
+        sparse_fields = SparseFields.from_request(request)
+        keys = get_fragment_keys(rows, prefix=get_fragment_prefix(
+            request, get_recipe_field_paths()
+        ))
+        fragments = get_fragments(keys.values())
+        missing = [row for row in rows if keys[row.id] not in fragments]
+        new_fragments = {
+            keys[row.id]: fragment for row, fragment in zip(
+                missing, self.get_fragments(missing, sparse_fields)
+            )
+        }
+        set_fragments(new_fragments)
+        fragments.update(new_fragments)
+
+        subscribed_authors = self.get_subscribed_authors(rows)
+        return [
+            self.personalize(
+                row, fragments[keys[row.id]], subscribed_authors,
+                sparse_fields
+            ) for row in rows
+        ]
+
+    def get_fragments(
+        self, rows: list[NamedTuple], sparse_fields: SparseFields
+    ) -> list[OrderedDict]:
+        """Собирает общую для всех пользователей часть ответа."""
+
+        if not rows:
+            return []
+        recipes_ids = [row.id for row in rows]
+        data_rows = {
+            data_row.id: data_row for data_row in Recipe.objects.filter(
+                id__in=recipes_ids
+            ).order_by().values_list(
+                *self.get_columns(sparse_fields), named=True
+            )
+        }
+        # Готовность производных картинок страницы - одним запросом
+        images = []
+        for data_row in data_rows.values():
+            if sparse_fields.is_requested('images'):
+                images.append((Recipe, data_row.image))
+            if sparse_fields.is_requested('author.images'):
+                images.append((User, data_row.author__avatar))
+        check_images(self.context, images)
+        nested = {
+            'tags': self.get_tags(recipes_ids, sparse_fields),
+            'ingredients': self.get_ingredients(recipes_ids, sparse_fields),
+        }
+        fragments = []
+        for recipe_id in recipes_ids:
+            data_row = data_rows[recipe_id]
+            fragment = OrderedDict()
+            for name in self.recipe_fields:
+                if (
+                    name in self.personal_fields
+                    or not sparse_fields.is_requested(name)
+                ):
+                    continue
+                if name == 'author':
+                    fragment[name] = self.get_author(data_row, sparse_fields)
+                elif name in nested:
+                    fragment[name] = nested[name].get(recipe_id, [])
+                elif name == 'image':
+                    fragment[name] = self.get_file_url(
+                        Recipe, name, data_row.image
+                    )
+                elif name == 'images':
+                    fragment[name] = get_images_urls(
+                        self.context, Recipe, data_row.image
+                    )
+                else:
+                    fragment[name] = getattr(data_row, name)
+            fragments.append(fragment)
+        return fragments
+
+    def get_author(
+        self, row: NamedTuple, sparse_fields: SparseFields
+    ) -> OrderedDict:
+        author = OrderedDict()
+        for name, column in self.author_columns.items():
+            if not sparse_fields.is_requested(f'author.{name}'):
+                continue
+            value = getattr(row, column)
+            if name == 'avatar':
+                value = self.get_file_url(User, name, value)
+            elif name == 'images':
+                value = get_images_urls(self.context, User, value)
+            author[name] = value
+        return author
+
+    def get_tags(
+        self, recipes_ids: list[int], sparse_fields: SparseFields
+    ) -> dict[int, list[OrderedDict]]:
+        if not sparse_fields.is_requested('tags'):
+            return {}
+        # Порядок тот же, что у Tag.Meta.ordering в prefetch
+        queryset = RecipeTags.objects.filter(
+            recipe_id__in=recipes_ids
+        ).order_by('tag__name')
+        return self.group_by_recipe(
+            queryset, self.tag_columns, 'tags', sparse_fields
+        )
+
+    def get_ingredients(
+        self, recipes_ids: list[int], sparse_fields: SparseFields
+    ) -> dict[int, list[OrderedDict]]:
+        if not sparse_fields.is_requested('ingredients'):
+            return {}
+        queryset = RecipeIngredients.objects.filter(
+            recipe_id__in=recipes_ids
+        ).order_by('pk')
+        return self.group_by_recipe(
+            queryset, self.ingredient_columns, 'ingredients', sparse_fields
+        )
+
+    def group_by_recipe(
+        self, queryset: QuerySet, columns: dict[str, str], path: str,
+        sparse_fields: SparseFields
+    ) -> dict[int, list[OrderedDict]]:
+        """Выбирает колонки одним запросом и группирует по рецептам."""
+
+        columns = {
+            name: column for name, column in columns.items()
+            if sparse_fields.is_requested(f'{path}.{name}')
+        }
+        grouped = defaultdict(list)
+        for recipe_id, *values in queryset.values_list(
+            'recipe_id', *columns.values()
+        ):
+            grouped[recipe_id].append(OrderedDict(zip(columns, values)))
+        return grouped
+
+    def get_file_url(
+        self, model: type[Model], field_name: str, name: str
+    ) -> Optional[str]:
+        """Абсолютная ссылка на файл, как у serializers.ImageField."""
+
+        if not name:
+            return None
+        url = model._meta.get_field(field_name).storage.url(name)
+        request: Optional[Request] = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_subscribed_authors(self, rows: list[NamedTuple]) -> set:
+        # Подписки на авторов страницы обычно уже собраны во вьюсете
+        subscribed_authors = self.context.get('subscribed_authors')
+        if subscribed_authors is not None:
+            return subscribed_authors
+        request: Optional[Request] = self.context.get('request')
+        if not request or request.user.is_anonymous:
+            return set()
+        return set(
+            Subscription.objects.filter(
+                user=request.user,
+                author_recipe_id__in={row.author_id for row in rows}
+            ).values_list('author_recipe_id', flat=True)
+        )
+
+    def personalize(
+        self, row: NamedTuple, fragment: OrderedDict,
+        subscribed_authors: set, sparse_fields: SparseFields
+    ) -> OrderedDict:
+        """Дополняет фрагмент полями текущего пользователя."""
+
+        data = OrderedDict(fragment)
+        if 'author' in data:
+            data['author'] = OrderedDict(fragment['author'])
+            for name in self.personal_author_fields:
+                if sparse_fields.is_requested(f'author.{name}'):
+                    data['author'][name] = row.author_id in subscribed_authors
+        for name in self.personal_fields:
+            if sparse_fields.is_requested(name):
+                data[name] = getattr(row, name, False)
+        return data
@@ -1,16 +1,50 @@
+from collections import defaultdict
+from typing import Iterable, Iterator, Optional
+
 from django.conf import settings
-from django.db.models.query import QuerySet
+from django.db.models import Manager, Model, OuterRef, Subquery
 from rest_framework import serializers
 from rest_framework.request import Request
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.image_tasks import get_images_urls
 from api.serializers.base_serializers import BaseRecipeSerializer
+from api.serializers.images import ImagesListSerializer
 from api.serializers.user import UserSerializer
+from api.sparse_fields import SparseFieldsMixin
 from api.validators import SubscribeUniqueValidator
+from recipes.models import Recipe
 from users.models import Subscription, User
 
 
-class SubscriptionGetSerializer(serializers.ModelSerializer):
+class SubscriptionListSerializer(ImagesListSerializer):
+    """
+    List-сериалайзер подписок.
+
+    Рецепты всех авторов страницы читаются одним запросом, а их
+    картинки проверяются вместе с аватарами.
+    """
+
+    def to_representation(self, data):
+        authors = list(data.all() if isinstance(data, Manager) else data)
+        if 'recipes' in self.child.fields:
+            self.context['authors_recipes'] = self.child.get_authors_recipes(
+                authors
+            )
+        return super().to_representation(authors)
+
+    def get_images(
+        self, instances: list[User]
+    ) -> Iterator[tuple[type[Model], str]]:
+        yield from super().get_images(instances)
+        for recipes in self.context.get('authors_recipes', {}).values():
+            for recipe in recipes:
+                yield Recipe, recipe.image.name
+
+
+class SubscriptionGetSerializer(
+    SparseFieldsMixin, serializers.ModelSerializer
+):
     """Сериалайзер для фолловеров. Только для чтения."""
 
     is_subscribed = serializers.SerializerMethodField(
@@ -19,6 +53,7 @@ class SubscriptionGetSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField(
         method_name='get_recipes'
     )
+    images = serializers.SerializerMethodField()
     recipes_count = serializers.IntegerField(
         source='recipes.count'
     )
@@ -27,27 +62,59 @@ class SubscriptionGetSerializer(serializers.ModelSerializer):
         model = User
         fields = (
             'email', 'id', 'username', 'first_name', 'last_name',
-            'is_subscribed', 'recipes', 'recipes_count', 'avatar'
+            'is_subscribed', 'recipes', 'recipes_count', 'avatar', 'images'
         )
         read_only_fields = fields
+        list_serializer_class = SubscriptionListSerializer
 
     def get_is_subscribed(self, obj: User):
         request: Request = self.context['request']
         if request.user.is_anonymous:
             return False
+        subscribed_authors = self.context.get('subscribed_authors')
+        if subscribed_authors is not None:
+            return obj.id in subscribed_authors
         return obj.authors.filter(user=request.user).exists()
 
-    def get_recipes(self, obj: User):
+    def get_images(self, obj: User):
+        return get_images_urls(self.context, User, obj.avatar.name)
+
+    def get_recipes_limit(self) -> Optional[int]:
         request: Request = self.context.get('request')
-        recipes_limit: int = (
+        recipes_limit = (
             request.GET.get('recipes_limit') if request
             else settings.RECIPES_LIMIT_MAX
         )
-        queryset: QuerySet = obj.recipes.all()
+        return int(recipes_limit) if recipes_limit else None
+
+    def get_authors_recipes(
+        self, authors: Iterable[User]
+    ) -> dict[int, list[Recipe]]:
+        """Рецепты авторов для ответа одним запросом: {id автора: [...]}."""
+
+        queryset = Recipe.objects.filter(author__in=authors).only(
+            'id', 'author_id', 'name', 'image', 'cooking_time'
+        )
+        recipes_limit = self.get_recipes_limit()
         if recipes_limit:
-            queryset = queryset[:int(recipes_limit)]
-        serializer = BaseRecipeSerializer
-        return serializer(queryset, many=True).data
+            # Первые recipes_limit рецептов каждого автора
+            queryset = queryset.filter(id__in=Subquery(
+                Recipe.objects.filter(
+                    author_id=OuterRef('author_id')
+                ).values('id')[:recipes_limit]
+            ))
+        authors_recipes = defaultdict(list)
+        for recipe in queryset:
+            authors_recipes[recipe.author_id].append(recipe)
+        return authors_recipes
+
+    def get_recipes(self, obj: User):
+        authors_recipes = self.context.get('authors_recipes')
+        if authors_recipes is None:
+            authors_recipes = self.get_authors_recipes([obj])
+        return BaseRecipeSerializer(
+            authors_recipes.get(obj.id, []), many=True, context=self.context
+        ).data
 
 
 class SubscriptionChangedSerializer(serializers.ModelSerializer):
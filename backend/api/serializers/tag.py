@@ -1,9 +1,10 @@
 from rest_framework import serializers
 
+from api.sparse_fields import SparseFieldsMixin
 from recipes.models import Tag
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериалайзер для тегов."""
 
     class Meta:
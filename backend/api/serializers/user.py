@@ -1,6 +1,9 @@
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
 
+from api.image_tasks import get_images_urls
+from api.serializers.images import ImagesListSerializer
+from api.sparse_fields import SparseFieldsMixin
 from users.models import User
 
 
@@ -8,6 +11,7 @@ class CurrentUserSerializer(DjoserUserSerializer):
     """Сериалайзер под текущего пользователя (для /me)."""
 
     is_subscribed = serializers.BooleanField(default=False, read_only=True)
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -18,11 +22,16 @@ class CurrentUserSerializer(DjoserUserSerializer):
             'first_name',
             'last_name',
             'avatar',
+            'images',
             'is_subscribed',
         )
+        list_serializer_class = ImagesListSerializer
 
+    def get_images(self, obj: User):
+        return get_images_urls(self.context, User, obj.avatar.name)
 
-class UserSerializer(CurrentUserSerializer):
+
+class UserSerializer(SparseFieldsMixin, CurrentUserSerializer):
     """Общий сериалайзер пользователя."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -32,4 +41,8 @@ class UserSerializer(CurrentUserSerializer):
         user = request.user
         if user.is_anonymous:
             return False
+        # Подписки на авторов страницы уже собраны во вьюсете
+        subscribed_authors = self.context.get('subscribed_authors')
+        if subscribed_authors is not None:
+            return obj.id in subscribed_authors
         return obj.authors.filter(user=user).exists()
@@ -0,0 +1,59 @@
+"""
+Список покупок в PDF, в отдельном процессе.
+
+Запуск: python -I shopping_list_pdf.py <путь к шрифту> <заголовок>.
+Строки списка приходят в stdin по одной - JSON-массив
+[название, единица измерения, количество], PDF пишется в stdout.
+Django здесь не загружается: скрипт запускается без пути проекта.
+"""
+
+import json
+import sys
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+FONT_NAME = 'ShoppingList'
+# Во встроенных шрифтах PDF нет кириллицы, но файл всё же получится
+FALLBACK_FONT_NAME = 'Helvetica'
+TITLE_SIZE = 16
+FONT_SIZE = 11
+LINE_HEIGHT = 7 * mm
+MARGIN = 20 * mm
+
+
+def register_font(path: str) -> str:
+    try:
+        pdfmetrics.registerFont(TTFont(FONT_NAME, path))
+    except Exception as error:
+        print(f'Шрифт {path} не загружен: {error}', file=sys.stderr)
+        return FALLBACK_FONT_NAME
+    return FONT_NAME
+
+
+def main(font_path: str, title: str) -> None:
+    font = register_font(font_path)
+    width, height = A4
+    canvas = Canvas(sys.stdout.buffer, pagesize=A4)
+    canvas.setTitle(title)
+    canvas.setFont(font, TITLE_SIZE)
+    canvas.drawString(MARGIN, height - MARGIN, title)
+    y = height - MARGIN - 2 * LINE_HEIGHT
+    canvas.setFont(font, FONT_SIZE)
+    for line in sys.stdin:
+        name, measurement_unit, amount = json.loads(line)
+        if y < MARGIN:
+            canvas.showPage()
+            canvas.setFont(font, FONT_SIZE)
+            y = height - MARGIN
+        canvas.drawString(MARGIN, y, f'{name} ({measurement_unit})')
+        canvas.drawRightString(width - MARGIN, y, str(amount))
+        y -= LINE_HEIGHT
+    canvas.save()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], sys.argv[2])
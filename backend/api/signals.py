@@ -0,0 +1,182 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save
+)
+from django.dispatch import receiver
+
+from api.cache import (
+    bump_author_version,
+    bump_catalog_version,
+    bump_recipe_version
+)
+from api.image_derivatives import MODEL_DERIVATIVES
+from api.image_tasks import enqueue_images
+from api.tag_index import tag_index, update_tag_index
+from recipes.models import (
+    ImageTask,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    RecipeTags,
+    Tag
+)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender: type[Model], instance: Recipe, **kwargs) -> None:
+    bump_recipe_version(instance.id)
+
+
+@receiver(post_save, sender=RecipeIngredients)
+@receiver(post_delete, sender=RecipeIngredients)
+@receiver(post_save, sender=RecipeTags)
+@receiver(post_delete, sender=RecipeTags)
+def recipe_relation_changed(
+    sender: type[Model], instance: Model, **kwargs
+) -> None:
+    bump_recipe_version(instance.recipe_id)
+
+
+@receiver(post_save, sender=RecipeTags)
+def recipe_tag_saved(
+    sender: type[Model], instance: RecipeTags, created: bool, **kwargs
+) -> None:
+    if not settings.RECIPE_TAG_INDEX:
+        return
+    if created:
+        update_tag_index([(instance.tag_id, instance.recipe_id, True)])
+    else:
+        # В админке у связи можно сменить рецепт или тег - прежние
+        # значения неизвестны, проще перестроить индекс
+        transaction.on_commit(tag_index.invalidate)
+
+
+@receiver(post_delete, sender=RecipeTags)
+def recipe_tag_deleted(
+    sender: type[Model], instance: RecipeTags, **kwargs
+) -> None:
+    if not settings.RECIPE_TAG_INDEX:
+        return
+    # Уникальности пары нет: связь могла остаться в другой строке
+    linked = RecipeTags.objects.filter(
+        recipe_id=instance.recipe_id, tag_id=instance.tag_id
+    ).exists()
+    update_tag_index([(instance.tag_id, instance.recipe_id, linked)])
+
+
+@receiver(m2m_changed, sender=RecipeTags)
+def recipe_tags_index_changed(
+    sender: type[Model], instance: Model, action: str, reverse: bool,
+    pk_set: set, **kwargs
+) -> None:
+    if not settings.RECIPE_TAG_INDEX:
+        return
+    if action == 'post_clear':
+        transaction.on_commit(tag_index.invalidate)
+    elif action in ('post_add', 'post_remove'):
+        linked = action == 'post_add'
+        update_tag_index(
+            (instance.id, pk, linked) if reverse
+            else (pk, instance.id, linked)
+            for pk in pk_set
+        )
+
+
+@receiver(m2m_changed, sender=RecipeTags)
+def recipe_tags_changed(
+    sender: type[Model], instance: Model, action: str, reverse: bool,
+    pk_set: set, **kwargs
+) -> None:
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_recipe_version(instance.id)
+    elif pk_set:
+        for recipe_id in pk_set:
+            bump_recipe_version(recipe_id)
+    else:  # post_clear со стороны тега - затронуты все его рецепты
+        bump_catalog_version()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def catalog_changed(sender: type[Model], instance: Model, **kwargs) -> None:
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender: type[Model], instance: Tag, **kwargs) -> None:
+    if settings.RECIPE_TAG_INDEX:
+        transaction.on_commit(lambda: tag_index.remove_tag(instance.id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def author_changed(
+    sender: type[Model], instance: Model, update_fields: frozenset = None,
+    **kwargs
+) -> None:
+    # Вход пользователя обновляет только last_login - в рецептах его нет
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_author_version(instance.id)
+
+
+def get_loaded_image_name(instance: Model, field_name: str) -> str:
+    # Без обращения к атрибуту: отложенное поле подгрузилось бы запросом.
+    # До первого обращения в __dict__ лежит строка, после - FieldFile
+    value = instance.__dict__.get(field_name)
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=Recipe)
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def image_loaded(sender: type[Model], instance: Model, **kwargs) -> None:
+    field_name, _ = MODEL_DERIVATIVES[sender]
+    instance._saved_image_name = get_loaded_image_name(instance, field_name)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def image_saved(
+    sender: type[Model], instance: Model, created: bool,
+    update_fields: frozenset = None, **kwargs
+) -> None:
+    field_name, _ = MODEL_DERIVATIVES[sender]
+    if update_fields is not None and field_name not in update_fields:
+        return
+    # Правка текста, пароля или счётчиков картинку не меняет - повторно
+    # её не проверяем
+    name = get_loaded_image_name(instance, field_name)
+    if not created and name == getattr(instance, '_saved_image_name', None):
+        return
+    instance._saved_image_name = name
+    if name:
+        enqueue_images([instance])
+
+
+@receiver(post_delete, sender=ImageTask)
+def image_task_deleted(
+    sender: type[Model], instance: ImageTask, **kwargs
+) -> None:
+    # Задача выполнена: во фрагментах записей с этой картинкой images
+    # ещё null (см. api.image_tasks.get_pending_images)
+    model = ContentType.objects.get_for_id(
+        instance.content_type_id
+    ).model_class()
+    if model not in MODEL_DERIVATIVES:
+        return
+    field_name, _ = MODEL_DERIVATIVES[model]
+    bump = bump_recipe_version if model is Recipe else bump_author_version
+    for pk in model.objects.filter(
+        **{field_name: instance.name}
+    ).values_list('pk', flat=True):
+        bump(pk)
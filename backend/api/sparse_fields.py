@@ -0,0 +1,114 @@
+"""
+Выборочные поля ответа: ?fields= и ?omit=.
+
+Оба параметра принимают список полей через запятую, вложенные поля
+указываются через точку:
+* ?fields=id,name,author.first_name - вернуть только перечисленные поля
+* ?omit=text,ingredients,author.is_subscribed - исключить поля
+
+Неуказанные поля не только не сериализуются, но и не загружаются:
+вьюсеты проверяют выбор через SparseFields.is_requested и отключают
+соответствующие prefetch/annotate.
+"""
+
+from collections import OrderedDict
+from hashlib import sha1
+from typing import Iterable, Optional
+
+from rest_framework.request import Request
+
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+
+
+def parse_fields(value: Optional[str]) -> dict:
+    """Преобразует 'a,b.c' в дерево {'a': {}, 'b': {'c': {}}}."""
+
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for name in filter(None, path.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFields:
+    """Выбор полей ответа, заданный в query-параметрах запроса."""
+
+    def __init__(
+        self, fields: Optional[str] = None, omit: Optional[str] = None
+    ):
+        self.fields = parse_fields(fields)
+        self.omit = {
+            tuple(path.strip().split('.'))
+            for path in (omit or '').split(',') if path.strip()
+        }
+
+    @classmethod
+    def from_request(cls, request: Optional[Request]) -> 'SparseFields':
+        if request is None:
+            return cls()
+        return cls(
+            fields=request.query_params.get(FIELDS_QUERY_PARAM),
+            omit=request.query_params.get(OMIT_QUERY_PARAM)
+        )
+
+    def get_key(self, paths: Iterable[str]) -> str:
+        """
+        Ключ выбора для кэша: хеш выбранных путей из paths (все поля
+        ответа). Порядок, повторы, пробелы и неизвестные поля на ключ не
+        влияют, а длина ключа не зависит от query-параметров.
+        """
+
+        requested = sorted(path for path in paths if self.is_requested(path))
+        return sha1('\n'.join(requested).encode()).hexdigest()
+
+    def is_requested(self, path: str) -> bool:
+        """
+        Нужно ли поле в ответе.
+
+        path - путь поля от корня ответа, например 'author.is_subscribed'.
+        """
+
+        names = tuple(path.split('.'))
+        if any(
+            names[:index] in self.omit for index in range(1, len(names) + 1)
+        ):
+            return False
+        node = self.fields
+        if not node:
+            return True
+        for name in names:
+            if name not in node:
+                return False
+            node = node[name]
+            if not node:  # Поле выбрано целиком со всеми вложенными
+                return True
+        return True
+
+
+class SparseFieldsMixin:
+    """
+    Примесь для сериалайзеров с выборочными полями (?fields= / ?omit=).
+
+    Путь поля определяется по цепочке родителей, поэтому примесь работает
+    и для вложенных сериалайзеров (например, автор внутри рецепта).
+    """
+
+    def get_sparse_path(self) -> tuple:
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return tuple(reversed(path))
+
+    def get_fields(self) -> OrderedDict:
+        fields = super().get_fields()
+        sparse_fields = SparseFields.from_request(self.context.get('request'))
+        path = self.get_sparse_path()
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if sparse_fields.is_requested('.'.join((*path, name)))
+        )
@@ -0,0 +1,194 @@
+"""
+Индекс тегов в памяти процесса: для каждого тега - битовая карта id его
+рецептов (бит N установлен - рецепт N с тегом).
+
+Включается настройкой RECIPE_TAG_INDEX. Строится лениво при первом
+запросе из RecipeTags и дальше обновляется сигналами. Процессы узнают об
+изменениях друг друга по версии индекса в кэше (как версии фрагментов в
+api.cache): если версия ушла вперёд не только из-за своих изменений,
+индекс перестраивается при следующем запросе. Поэтому при нескольких
+процессах нужен общий кэш (Redis, Memcached).
+
+Битовая карта - обычный int: pyroaring в зависимостях нет, а для
+справочника из десятка тегов и миллиона рецептов это ~125 КБ на тег.
+"""
+
+from functools import reduce
+from operator import and_, or_
+from threading import RLock
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.cache import initial_version
+from recipes.models import RecipeTags
+
+TAG_INDEX_VERSION_KEY = 'tag_index_version'
+
+
+def bitmap_from_ids(recipes_ids: list[int]) -> int:
+    if not recipes_ids:
+        return 0
+    data = bytearray((max(recipes_ids) >> 3) + 1)
+    for recipe_id in recipes_ids:
+        data[recipe_id >> 3] |= 1 << (recipe_id & 7)
+    return int.from_bytes(data, 'little')
+
+
+def bitmap_to_ids(bitmap: int) -> list[int]:
+    """id рецептов по возрастанию."""
+
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) >> 3, 'little')
+    return [
+        (index << 3) + bit
+        for index, byte in enumerate(data) if byte
+        for bit in range(8) if byte >> bit & 1
+    ]
+
+
+def bitmap_count(bitmap: int) -> int:
+    # int.bit_count() появился только в Python 3.10
+    return bin(bitmap).count('1')
+
+
+class TagBitmapIndex:
+    """Битовые карты рецептов по тегам с версией для сверки с кэшем."""
+
+    def __init__(self) -> None:
+        self.bitmaps: dict[int, int] = {}
+        self.version: Optional[int] = None  # None - индекс не построен
+        self.lock = RLock()
+
+    def get_shared_version(self) -> int:
+        version = cache.get(TAG_INDEX_VERSION_KEY)
+        if version is None:
+            cache.add(TAG_INDEX_VERSION_KEY, initial_version(), timeout=None)
+            version = cache.get(TAG_INDEX_VERSION_KEY)
+        return version
+
+    def build(self) -> None:
+        """Строит индекс заново по таблице связей рецептов и тегов."""
+
+        with self.lock:
+            # Версию читаем до данных: изменения во время построения
+            # сдвинут её, и индекс перестроится ещё раз
+            version = self.get_shared_version()
+            self.bitmaps = self.load_bitmaps()
+            self.version = version
+
+    def load_bitmaps(self) -> dict[int, int]:
+        recipes_ids: dict[int, list[int]] = {}
+        for tag_id, recipe_id in RecipeTags.objects.order_by().values_list(
+            'tag_id', 'recipe_id'
+        ).iterator():
+            recipes_ids.setdefault(tag_id, []).append(recipe_id)
+        return {
+            tag_id: bitmap_from_ids(ids) for tag_id, ids in recipes_ids.items()
+        }
+
+    def ensure_fresh(self) -> None:
+        with self.lock:
+            if self.version != self.get_shared_version():
+                self.build()
+
+    def invalidate(self) -> None:
+        """Помечает индекс устаревшим во всех процессах."""
+
+        with self.lock:
+            self.version = None
+            cache.set(TAG_INDEX_VERSION_KEY, initial_version(), timeout=None)
+
+    def get_recipes_ids(
+        self, tags_ids: list[int], match_all: bool = False,
+        limit: Optional[int] = None
+    ) -> Optional[list[int]]:
+        """
+        id рецептов с любым (или каждым при match_all) из тегов.
+
+        Если рецептов больше limit, возвращает None: такой список дешевле
+        не передавать в SQL, а отфильтровать подзапросом по индексу БД.
+        """
+
+        self.ensure_fresh()
+        bitmaps = self.bitmaps
+        bitmap = reduce(
+            and_ if match_all else or_,
+            (bitmaps.get(tag_id, 0) for tag_id in tags_ids)
+        )
+        if limit is not None and bitmap_count(bitmap) > limit:
+            return None
+        return bitmap_to_ids(bitmap)
+
+    def apply(self, changes: Iterable[tuple[int, int, bool]]) -> None:
+        """
+        Применяет изменения (id тега, id рецепта, есть ли связь).
+
+        Версия в кэше увеличивается; если её успел сдвинуть кто-то ещё,
+        индекс помечается устаревшим и будет перестроен.
+        """
+
+        with self.lock:
+            if self.version is not None:
+                bitmaps = dict(self.bitmaps)
+                for tag_id, recipe_id, linked in changes:
+                    bitmap = bitmaps.get(tag_id, 0)
+                    if linked:
+                        bitmap |= 1 << recipe_id
+                    elif bitmap >> recipe_id & 1:
+                        bitmap ^= 1 << recipe_id
+                    bitmaps[tag_id] = bitmap
+                # Читатели берут self.bitmaps без блокировки - подменяем
+                # словарь целиком
+                self.bitmaps = bitmaps
+            try:
+                version = cache.incr(TAG_INDEX_VERSION_KEY)
+            except ValueError:
+                version = None
+            if self.version is None or version != self.version + 1:
+                self.version = None
+            else:
+                self.version = version
+
+    def remove_tag(self, tag_id: int) -> None:
+        with self.lock:
+            if self.version is not None:
+                bitmaps = dict(self.bitmaps)
+                bitmaps.pop(tag_id, None)
+                self.bitmaps = bitmaps
+            self.apply(())
+
+    def check(self) -> dict[int, tuple[int, int]]:
+        """
+        Сверяет индекс процесса с БД.
+
+        Возвращает {id тега: (нет в индексе, лишних в индексе)} только
+        для расходящихся тегов.
+        """
+
+        self.ensure_fresh()
+        bitmaps = self.bitmaps
+        actual = self.load_bitmaps()
+        differences = {}
+        for tag_id in bitmaps.keys() | actual.keys():
+            bitmap = bitmaps.get(tag_id, 0)
+            actual_bitmap = actual.get(tag_id, 0)
+            if bitmap != actual_bitmap:
+                differences[tag_id] = (
+                    bitmap_count(actual_bitmap & ~bitmap),
+                    bitmap_count(bitmap & ~actual_bitmap)
+                )
+        return differences
+
+
+tag_index = TagBitmapIndex()
+
+
+def update_tag_index(changes: Iterable[tuple[int, int, bool]]) -> None:
+    """Обновляет индекс после фиксации транзакции, если он включён."""
+
+    if not settings.RECIPE_TAG_INDEX:
+        return
+    changes = list(changes)
+    transaction.on_commit(lambda: tag_index.apply(changes))
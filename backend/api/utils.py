@@ -84,3 +84,10 @@ def many_unique_with_minimum_one_validate(
                 field_name=plural.capitalize()
             )
         })
+
+
+class EchoBuffer:
+    """Псевдофайл для csv.writer: write возвращает строку, а не пишет её."""
+
+    def write(self, value: str) -> str:
+        return value
@@ -1,4 +1,7 @@
-from django.shortcuts import get_object_or_404, redirect
+from django.conf import settings
+from django.db.models import Exists, OuterRef, QuerySet
+from django.http import Http404
+from django.shortcuts import redirect
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -9,14 +12,27 @@ from rest_framework.serializers import Serializer
 from rest_framework.views import APIView
 
 from api.filters import RecipeFilter
+from api.pagination import FeedPagination, RecipePagination
 from api.permissions import IsAuthorOrReadOnly, ReadOnly
-from api.serializers import RecipeChangeSerializer, RecipeGetSerializer
+from api.serializers import (
+    RecipeBatchSerializer,
+    RecipeChangeSerializer,
+    RecipeGetSerializer,
+    RecipeValuesSerializer
+)
+from api.sparse_fields import SparseFields
+from api.views.recipe_etag import RecipeETagMixin
 from api.views.recipe_favorite import RecipeFavoriteMixin
 from api.views.shopping_cart import ShoppingCartMixin
-from recipes.models import Recipe
+from api.views.subscription import SubscribedAuthorsMixin
+from core.constants import FRONTEND_DETAIL_URL
+from recipes.models import Recipe, RecipeFavorite, ShoppingCart
+from recipes.short_links import get_recipe_id
 
 
 class RecipeViewSet(
+    SubscribedAuthorsMixin,
+    RecipeETagMixin,
     viewsets.ModelViewSet,
     RecipeFavoriteMixin,
     ShoppingCartMixin
@@ -27,19 +43,65 @@ class RecipeViewSet(
     permission_classes = [IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
     serializer_class = RecipeChangeSerializer
     ordering = ['-id']
+    subscribed_field = 'author.is_subscribed'
+
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+        # Поля, исключённые через ?fields= / ?omit=, не загружаем вовсе
+        sparse_fields = SparseFields.from_request(self.request)
+        # Связанные строки не грузим: ответ обычно собирается из кэша, а
+        # при промахе RecipeGetSerializer сам перечитывает рецепты
+        # (get_fresh_instances). Здесь нужны пагинация, ETag и флаги
+        if (
+            self.action in ('list', 'retrieve', 'feed')
+            and not sparse_fields.is_requested('text')
+        ):
+            queryset = queryset.defer('text')
+        user = self.request.user
+        if user.is_authenticated:
+            # Флаги считаем одним запросом на всю страницу,
+            # а не отдельным exists() на каждый рецепт
+            flags = {
+                'is_favorited': RecipeFavorite,
+                'is_in_shopping_cart': ShoppingCart
+            }
+            queryset = queryset.annotate(**{
+                annotation: Exists(model.objects.filter(
+                    author=user, recipe=OuterRef('pk')
+                ))
+                for annotation, model in flags.items()
+                if sparse_fields.is_requested(annotation)
+            })
+        return queryset
+
+    def use_values_serializer(self) -> bool:
+        return (
+            self.action in ('list', 'feed')
+            and settings.RECIPE_LIST_VALUES_SERIALIZER
+        )
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        queryset = super().filter_queryset(queryset)
+        if self.use_values_serializer():
+            # Список рецептов собирается из строк, без экземпляров моделей
+            return RecipeValuesSerializer.get_rows(queryset)
+        return queryset
 
     def get_permissions(self):
         if (
-            self.action == 'download_shopping_cart'
+            self.action in ('download_shopping_cart', 'feed')
             or self.request.method == 'POST'
         ):
             self.permission_classes = [IsAuthenticated]
         return super().get_permissions()
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.use_values_serializer():
+            return RecipeValuesSerializer
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeGetSerializer
         if self.action in ['create', 'update', 'partial_update']:
             return RecipeChangeSerializer
@@ -60,6 +122,46 @@ class RecipeViewSet(
         super().perform_update(serializer)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['POST'], url_path='batch')
+    def batch(self, request: Request):
+        """
+        Пакетное создание рецептов: {"recipes": [...]}.
+
+        Ответ - результат по каждому рецепту в порядке запроса: recipe
+        для созданных или errors. Статус 201, если созданы все, 207 - если
+        часть, 400 - если ни один.
+        """
+
+        serializer = RecipeBatchSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        results: list[dict] = serializer.save()
+        created = sum('recipe' in result for result in results)
+        if created == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'results': results}, status=response_status)
+
+    @action(detail=False, methods=['GET'], url_path='feed')
+    def feed(self, request: Request):
+        """Рецепты авторов из подписок, от новых к старым."""
+
+        paginator = FeedPagination()
+        recipes_ids = paginator.paginate_feed(request.user, request)
+        queryset = self.get_queryset().filter(id__in=recipes_ids)
+        if self.use_values_serializer():
+            queryset = RecipeValuesSerializer.get_rows(queryset)
+        recipes = list(queryset)
+        self.subscribed_authors = self.get_subscribed_authors(
+            recipe.author_id for recipe in recipes
+        )
+        serializer = self.get_serializer(recipes, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['GET'], url_path='get-link')
     def get_short_link(self, request: Request, pk: int):
         try:
@@ -86,8 +188,12 @@ class RecipeRedirectView(APIView):
     Важно: редирект идёт на адрес фронта, а не /api/!
     """
 
+    # Без аутентификации: проверка токена - лишний запрос к базе
+    authentication_classes = []
     permission_classes = [ReadOnly]
 
     def get(self, request: Request, short_link: str):
-        recipe = get_object_or_404(Recipe, short_link=short_link)
-        return redirect(recipe.get_frontend_absolute_url())
+        recipe_id = get_recipe_id(short_link)
+        if recipe_id is None:
+            raise Http404
+        return redirect(FRONTEND_DETAIL_URL.format(pk=recipe_id))
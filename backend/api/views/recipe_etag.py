@@ -0,0 +1,96 @@
+from hashlib import sha1
+from typing import Optional
+
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from api.cache import get_recipes_versions
+from recipes.models import Recipe
+
+
+class RecipeETagMixin:
+    """
+    Условные GET-запросы (ETag / If-None-Match) для рецептов.
+
+    ETag строится без сериализации: из версий рецептов (см. api.cache),
+    персональных флагов текущего пользователя, адреса запроса и, для
+    списка, данных пагинации. При совпадении с If-None-Match отдаётся
+    304 без тела. Рассчитан на работу вместе с SubscribedAuthorsMixin.
+    """
+
+    def get_recipes_etag(
+        self, recipes: list[Recipe], extra: Optional[dict] = None
+    ) -> str:
+        versions = get_recipes_versions(recipes)
+        rows = [
+            (
+                recipe.id,
+                versions[recipe.id],
+                getattr(recipe, 'is_favorited', False),
+                getattr(recipe, 'is_in_shopping_cart', False),
+                recipe.author_id in self.subscribed_authors
+            ) for recipe in recipes
+        ]
+        source = repr((self.request.build_absolute_uri(), rows, extra))
+        return '"{}"'.format(sha1(source.encode()).hexdigest())
+
+    def is_not_modified(self, request: Request, etag: str) -> bool:
+        if_none_match = request.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in etags
+
+    def set_etag(self, response: Response, etag: str) -> Response:
+        response['ETag'] = etag
+        # Флаги в ответе зависят от пользователя
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def conditional_response(self, etag: str) -> Optional[Response]:
+        if self.is_not_modified(self.request, etag):
+            return self.set_etag(
+                Response(status=status.HTTP_304_NOT_MODIFIED), etag
+            )
+        return None
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            recipes = list(queryset)
+            self.subscribed_authors = self.get_subscribed_authors(
+                recipe.author_id for recipe in recipes
+            )
+            extra = None
+        else:
+            recipes = page
+            # Метаданные страницы (count, next, previous) без сериализации
+            extra = self.get_paginated_response([]).data
+        etag = self.get_recipes_etag(recipes, extra=extra)
+        not_modified = self.conditional_response(etag)
+        if not_modified:
+            return not_modified
+
+        serializer = self.get_serializer(recipes, many=True)
+        if page is None:
+            return self.set_etag(Response(serializer.data), etag)
+        return self.set_etag(
+            self.get_paginated_response(serializer.data), etag
+        )
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        instance: Recipe = self.get_object()
+        self.subscribed_authors = self.get_subscribed_authors(
+            [instance.author_id]
+        )
+        etag = self.get_recipes_etag([instance])
+        not_modified = self.conditional_response(etag)
+        if not_modified:
+            return not_modified
+
+        serializer = self.get_serializer(instance)
+        return self.set_etag(Response(serializer.data), etag)
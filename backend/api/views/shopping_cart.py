@@ -1,18 +1,14 @@
-import csv
-import io
 from datetime import datetime
 
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import action
 from rest_framework.request import Request
 
-from api.serializers import (
-    DownloadShoppingCartSerializer,
-    ShoppingCartSerializer
-)
+from api.renderers import SHOPPING_LIST_RENDERERS, ShoppingListRenderer
+from api.serializers import ShoppingCartSerializer
 from api.utils import object_delete, object_update
-from recipes.models import Recipe, ShoppingCart
+from recipes.models import Recipe, ShoppingCart, ShoppingListItem
 
 
 class ShoppingCartMixin:
@@ -41,36 +37,28 @@ class ShoppingCartMixin:
             model=ShoppingCart
         )
 
-    @action(detail=False, methods=['GET'], url_path='download_shopping_cart')
+    @action(
+        detail=False, methods=['GET'], url_path='download_shopping_cart',
+        renderer_classes=SHOPPING_LIST_RENDERERS
+    )
     def download_shopping_cart(self, request):
-        serializer = DownloadShoppingCartSerializer(
-            instance=ShoppingCart.objects.all(),
-            many=True, context={'request': request}
-        )
+        # Готовый список читается по индексу курсором, строки отдаются
+        # по мере готовности (recipes.shopping_list)
+        ingredients = ShoppingListItem.objects.get_rows(request.user)
+        renderer: ShoppingListRenderer = request.accepted_renderer
 
         now = datetime.now()
         formatted_time = now.strftime('%d-%m-%Y_%H_%M_%S')
 
-        response = HttpResponse(content_type='text/csv; charset=cp1251')
-        filename = f'shopping_cart.csv_{request.user.id}_{formatted_time}'
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=renderer.content_type
+        )
+        filename = (
+            f'shopping_cart_{request.user.id}_{formatted_time}.'
+            f'{renderer.extension}'
+        )
         response['Content-Disposition'] = (
             f'attachment; filename="{filename}"'
         )
-
-        csv_buffer = io.TextIOWrapper(response, encoding='cp1251', newline='')
-        writer = csv.writer(csv_buffer)
-        writer.writerow(['Ингредиент', 'Единица измерения', 'Количество'])
-        if serializer.data:
-            ingredients = serializer.data[0]['ingredients']
-
-            rows = [
-                [
-                    ingredient['name'],
-                    ingredient['measurement_unit'],
-                    ingredient['total_amount']
-                ] for ingredient in ingredients
-            ]
-            writer.writerows(rows)
-
-        csv_buffer.flush()  # Сбрасываем буфер, чтобы данные записались
         return response
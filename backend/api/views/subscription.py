@@ -1,3 +1,6 @@
+from typing import Iterable, Optional
+
+from django.db.models import Model, QuerySet
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -7,10 +10,55 @@ from api.serializers import (
     SubscriptionChangedSerializer,
     SubscriptionGetSerializer
 )
+from api.sparse_fields import SparseFields
 from api.utils import object_delete, object_update
 from users.models import Subscription, User
 
 
+class SubscribedAuthorsMixin:
+    """
+    Пакетная проверка подписок для страницы пагинации.
+
+    Собирает id авторов со страницы и одним запросом к Subscription
+    определяет, на кого из них подписан текущий пользователь. Результат
+    передаётся сериалайзерам через контекст под ключом subscribed_authors.
+    Поле с id автора у объектов страницы задаётся в author_id_field,
+    путь поля is_subscribed в ответе - в subscribed_field: если оно
+    исключено через ?fields= / ?omit=, запрос не выполняется.
+    """
+
+    author_id_field = 'author_id'
+    subscribed_field = 'is_subscribed'
+
+    def get_subscribed_authors(self, authors_ids: Iterable[int]) -> set:
+        user = self.request.user
+        sparse_fields = SparseFields.from_request(self.request)
+        if (
+            user.is_anonymous
+            or not sparse_fields.is_requested(self.subscribed_field)
+        ):
+            return set()
+        return set(
+            Subscription.objects.filter(
+                user=user, author_recipe_id__in=set(authors_ids)
+            ).values_list('author_recipe_id', flat=True)
+        )
+
+    def paginate_queryset(self, queryset: QuerySet) -> Optional[list]:
+        page: Optional[list[Model]] = super().paginate_queryset(queryset)
+        if page is not None:
+            self.subscribed_authors = self.get_subscribed_authors(
+                getattr(obj, self.author_id_field) for obj in page
+            )
+        return page
+
+    def get_serializer_context(self) -> dict:
+        context = super().get_serializer_context()
+        if hasattr(self, 'subscribed_authors'):
+            context['subscribed_authors'] = self.subscribed_authors
+        return context
+
+
 class SubscriptionMixin:
     """Отдельный блок действий для управления подписчиками."""
 
@@ -29,7 +77,7 @@ class SubscriptionMixin:
         serializer = SubscriptionGetSerializer(
             pages,
             many=True,
-            context={'request': request}
+            context=self.get_serializer_context()
         )
         return self.get_paginated_response(serializer.data)
 
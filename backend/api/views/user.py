@@ -5,16 +5,22 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 
+from api.image_derivatives import delete_image
 from api.permissions import ReadOnly
 from api.serializers import AvatarSerializer, UserSerializer
-from api.views.subscription import SubscriptionMixin
+from api.views.subscription import SubscribedAuthorsMixin, SubscriptionMixin
 from users.models import User
 
 
-class UserViewSet(djoser_views.UserViewSet, SubscriptionMixin):
+class UserViewSet(
+    SubscribedAuthorsMixin,
+    djoser_views.UserViewSet,
+    SubscriptionMixin
+):
     """Вьюсет пользователей."""
 
     queryset = User.objects.all()
+    author_id_field = 'id'
     serializer_class = UserSerializer
     pagination_class = PageNumberPagination
     pagination_class.page_size_query_param = 'limit'
@@ -49,9 +55,8 @@ class UserViewSet(djoser_views.UserViewSet, SubscriptionMixin):
         request.user.avatar = avatar_data
         request.user.save()
 
-        image_url = request.build_absolute_uri(
-            f'/media/users/{avatar_data.name}'
-        )
+        # Хранилище могло вернуть имя уже сохранённой такой же картинки
+        image_url = request.build_absolute_uri(request.user.avatar.url)
         return response.Response(
             {'avatar': str(image_url)}, status=status.HTTP_200_OK
         )
@@ -60,7 +65,7 @@ class UserViewSet(djoser_views.UserViewSet, SubscriptionMixin):
     def delete_avatar(self, request: Request, *args, **kwargs):
         user = self.request.user
         if user.avatar:
-            user.avatar.delete(save=False)
+            delete_image(user)
             user.avatar = None
             user.save()
         return response.Response(status=status.HTTP_204_NO_CONTENT)
@@ -80,6 +80,18 @@ else:
         }
     }
 
+# LocMemCache - только для разработки и тестов: у каждого процесса свой
+# кэш, и версии рецептов, увеличенные в одном воркере (или в image_worker),
+# остальные не видят. В продакшене - общий memcached (см. .env.example)
+CACHES = {
+    'default': {
+        'BACKEND': env.str(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': env.str('CACHE_LOCATION', ''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -110,6 +122,8 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / '/media/'
+# Картинки с именем-хешем содержимого не дублируются (core.storage)
+DEFAULT_FILE_STORAGE = 'core.storage.MediaStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -141,4 +155,23 @@ DJOSER = {
     }
 }
 
+PAGE_SIZE_MAX = env.int('PAGE_SIZE_MAX', 100)
 RECIPES_LIMIT_MAX = env.int('RECIPES_LIMIT_MAX', 10)
+RECIPES_BATCH_LIMIT = env.int('RECIPES_BATCH_LIMIT', 100)
+RECIPE_CACHE_TIMEOUT = env.int('RECIPE_CACHE_TIMEOUT', 60 * 60)
+RECIPE_LIST_VALUES_SERIALIZER = env.bool('RECIPE_LIST_VALUES_SERIALIZER', True)
+RECIPE_TAG_INDEX = env.bool('RECIPE_TAG_INDEX', False)
+RECIPE_TAG_INDEX_MAX_IDS = env.int('RECIPE_TAG_INDEX_MAX_IDS', 5000)
+FEED_FANOUT_LIMIT = env.int('FEED_FANOUT_LIMIT', 10_000)
+FEED_BACKFILL_LIMIT = env.int('FEED_BACKFILL_LIMIT', 100)
+IMAGE_UPLOAD_MAX_SIZE = env.int('IMAGE_UPLOAD_MAX_SIZE', 8 * 1024 * 1024)
+IMAGE_MAX_PIXELS = env.int('IMAGE_MAX_PIXELS', 25_000_000)
+IMAGE_VERIFY_TIMEOUT = env.int('IMAGE_VERIFY_TIMEOUT', 10)
+IMAGE_VERIFY_MEMORY_LIMIT = env.int(
+    'IMAGE_VERIFY_MEMORY_LIMIT', 512 * 1024 * 1024
+)
+
+# Шрифт с кириллицей для списка покупок в PDF (api.renderers)
+SHOPPING_LIST_PDF_FONT = env.str(
+    'SHOPPING_LIST_PDF_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
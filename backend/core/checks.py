@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Кэши, которые видит только процесс, их создавший
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs) -> list[Warning]:
+    """
+    Кэш продакшена должен быть общим для всех процессов: иначе версии
+    рецептов, увеличенные в одном процессе, не доходят до остальных, и
+    те отдают устаревшие фрагменты.
+    """
+
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'Кэш по умолчанию виден только одному процессу.',
+        hint=(
+            'Укажите общий кэш в CACHE_BACKEND и CACHE_LOCATION, например '
+            'django.core.cache.backends.memcached.PyMemcacheCache.'
+        ),
+        id='core.W001'
+    )]
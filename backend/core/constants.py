@@ -42,5 +42,36 @@ RECIPE_DETAIL_URL = '/api/recipes/{pk}/'
 FRONTEND_DETAIL_URL = '/recipes/{pk}/'
 USER_AVATAR_PATH = 'users/'
 
-# Остальные значения
+# Производные картинок (api.image_derivatives)
+RECIPE_IMAGE_WIDTHS = (200, 400, 800)
+USER_AVATAR_SIZES = (64, 128, 256)
+IMAGE_DERIVATIVE_FORMATS = ('webp', 'jpeg')
+IMAGE_DERIVATIVE_QUALITY = 80
+
+# Единицы измерения (recipes.units): единица -> (базовая единица,
+# множитель). Базовая - самая мелкая единица величины, поэтому
+# множители целые и суммы в базе считаются без округления
+UNIT_CONVERSIONS = {
+    'мг': ('мг', 1),
+    'г': ('мг', 1000),
+    'кг': ('мг', 1_000_000),
+    'капля': ('капля', 1),
+    'мл': ('капля', 20),
+    'ч. л.': ('капля', 100),
+    'ст. л.': ('капля', 300),
+    'стакан': ('капля', 4000),
+    'л': ('капля', 20_000),
+}
+# Ряды единиц по возрастанию: сумма выводится в самой крупной единице
+# ряда, в которой получается не меньше 1 и не больше двух знаков после
+# запятой
+READABLE_UNITS = (('мг', 'г', 'кг'), ('мл', 'л'), ('ч. л.', 'ст. л.'))
+
+# Короткие ссылки (recipes.short_links)
+BASE62_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+MIN_LENGTH_SHORT_LINK = 2
+# Длина старых ссылок (обрезанный UUID4)
 MAX_LENGTH_SHORT_LINK = 6
+SHORT_LINK_CACHE_SIZE = 4096
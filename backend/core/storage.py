@@ -0,0 +1,18 @@
+from django.core.files.storage import FileSystemStorage
+
+
+class MediaStorage(FileSystemStorage):
+    """
+    Хранилище медиафайлов с дедупликацией.
+
+    Файл, имя которого - хеш содержимого (у content есть content_hash,
+    см. api.images), не сохраняется повторно: если такой файл уже есть,
+    save возвращает его имя. Остальные файлы сохраняются как обычно.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if getattr(content, 'content_hash', None) and self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -1,15 +1,68 @@
 from re import sub as re_sub
+from typing import Optional
 from uuid import uuid4
 
-from core.constants import MAX_LENGTH_SHORT_LINK
+from core.constants import (
+    BASE62_ALPHABET,
+    MAX_LENGTH_SHORT_LINK,
+    MIN_LENGTH_SHORT_LINK
+)
+
+BASE62_INDEX = {char: index for index, char in enumerate(BASE62_ALPHABET)}
+# Больше 11 знаков base62 не помещается в bigint
+MAX_LENGTH_BASE62 = 11
+MAX_BASE62_VALUE = 2 ** 63 - 1
 
 
 def generate_short_link() -> str:
-    """Генерирует обрезанный до N знаков UUID4."""
+    """
+    Генерирует обрезанный до N знаков UUID4.
+
+    Так создавались короткие ссылки до перехода на base62, функция
+    осталась для старых миграций.
+    """
 
     return uuid4().hex[:MAX_LENGTH_SHORT_LINK]
 
 
+def encode_base62(number: int) -> str:
+    """
+    Кодирует неотрицательное число в base62.
+
+    Результат дополняется нулями слева до MIN_LENGTH_SHORT_LINK знаков.
+    """
+
+    chars = []
+    while True:
+        number, remainder = divmod(number, len(BASE62_ALPHABET))
+        chars.append(BASE62_ALPHABET[remainder])
+        if not number:
+            break
+    return ''.join(reversed(chars)).rjust(
+        MIN_LENGTH_SHORT_LINK, BASE62_ALPHABET[0]
+    )
+
+
+def decode_base62(text: str) -> Optional[int]:
+    """
+    Обратное к encode_base62; None, если строка не base62, велика или
+    записана не так, как её записал бы encode_base62 (лишние нули
+    слева): у каждого числа одна ссылка.
+    """
+
+    if not text or len(text) > MAX_LENGTH_BASE62:
+        return None
+    number = 0
+    for char in text:
+        index = BASE62_INDEX.get(char)
+        if index is None:
+            return None
+        number = number * len(BASE62_ALPHABET) + index
+    if number > MAX_BASE62_VALUE or encode_base62(number) != text:
+        return None
+    return number
+
+
 def to_snake_case(text: str) -> str:
     """Преобразовывает CamelCase в snake_case.
 
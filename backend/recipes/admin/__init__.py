@@ -1,5 +1,6 @@
+from recipes.admin.image_task import ImageTaskAdmin
 from recipes.admin.ingredient import IngredientAdmin
 from recipes.admin.recipe import RecipeAdmin
 from recipes.admin.tag import TagAdmin
 
-__all__ = ['IngredientAdmin', 'RecipeAdmin', 'TagAdmin']
+__all__ = ['ImageTaskAdmin', 'IngredientAdmin', 'RecipeAdmin', 'TagAdmin']
@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from recipes.models.image_task import ImageTask
+
+
+@admin.register(ImageTask)
+class ImageTaskAdmin(admin.ModelAdmin):
+    """Страничка очереди обработки картинок в админке."""
+
+    list_display = ('name', 'content_type', 'status', 'attempts', 'updated_at')
+    list_filter = ('status', 'content_type')
+    search_fields = ('name',)
+    readonly_fields = ('content_type', 'name', 'attempts', 'error')
+    ordering = ('-id',)
@@ -3,9 +3,13 @@ from django.urls import reverse
 from django.utils.html import format_html
 
 from recipes.models.recipe import Recipe
-from recipes.models.recipe_favorite import RecipeFavorite
 from recipes.models.recipe_ingredients import RecipeIngredients
 from recipes.models.recipe_tags import RecipeTags
+from recipes.shopping_list import (
+    change_recipe_amounts,
+    get_amounts_difference,
+    get_recipe_amounts
+)
 
 
 class RecipeIngredientInline(admin.TabularInline):
@@ -35,7 +39,8 @@ class RecipeAdmin(admin.ModelAdmin):
     """
 
     list_display = (
-        'name', 'get_author_recipe', 'pub_date', 'get_favorite_count',
+        'name', 'get_author_recipe', 'pub_date', 'favorites_count',
+        'shopping_cart_count',
     )
     search_fields = (
         'name', 'author__username', 'author__first_name', 'author__last_name'
@@ -43,9 +48,23 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ('tags',)
     inlines = [RecipeIngredientInline, RecipeTagInline]
     autocomplete_fields = ('author', )
-    readonly_fields = ('short_link', 'pub_date')
+    readonly_fields = (
+        'short_link', 'pub_date', 'favorites_count', 'shopping_cart_count'
+    )
     ordering = ('id',)
 
+    def save_related(self, request, form, formsets, change):
+        # Инлайн сохраняет ингредиенты по одному: разницу для списков
+        # покупок считаем по состоянию до и после
+        if not change:
+            return super().save_related(request, form, formsets, change)
+        recipe_id = form.instance.id
+        old_amounts = get_recipe_amounts(recipe_id)
+        super().save_related(request, form, formsets, change)
+        change_recipe_amounts(recipe_id, get_amounts_difference(
+            old_amounts, get_recipe_amounts(recipe_id)
+        ))
+
     def get_author_recipe(self, obj: Recipe):
         # Создаем ссылку на редактирование автора рецепта
         url = reverse('admin:users_user_change', args=[obj.author.id])
@@ -53,8 +72,4 @@ class RecipeAdmin(admin.ModelAdmin):
             '<a href="{}">{}</a>', url, obj.author.__str__()
         )
 
-    def get_favorite_count(self, obj: Recipe):
-        return RecipeFavorite.objects.filter(recipe=obj).count()
-
     get_author_recipe.short_description = 'Автор рецепта'
-    get_favorite_count.short_description = 'В избранном у ...'
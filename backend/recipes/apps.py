@@ -1,6 +1,27 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def restore_search_index(using: str, **kwargs) -> None:
+    from django.db import connections
+
+    from recipes.search import SEARCH_TABLE, install_search_index
+
+    # SQLite пересоздаёт таблицу рецептов при её изменении в миграциях,
+    # а вместе с ней пропадают и триггеры поискового индекса
+    connection = connections[using]
+    if (
+        connection.vendor == 'sqlite'
+        and SEARCH_TABLE in connection.introspection.table_names()
+    ):
+        install_search_index(connection)
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self) -> None:
+        from recipes import signals  # noqa: F401
+
+        post_migrate.connect(restore_search_index, sender=self)
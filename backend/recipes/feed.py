@@ -0,0 +1,102 @@
+"""
+Лента подписок: рецепты авторов, на которых подписан пользователь,
+от новых к старым.
+
+Лента строится при записи (fan-out-on-write): при публикации рецепта
+каждому подписчику автора добавляется FeedEntry, и чтение страницы -
+один проход по индексу (user_id, recipe_id). Если подписчиков больше
+FEED_FANOUT_LIMIT, вместо тысяч строк пишется одна общая запись без
+пользователя, а при чтении общие записи авторов из подписок
+подмешиваются отдельным запросом (fan-out-on-read).
+"""
+
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+BATCH_SIZE = 1000
+
+
+def fan_out_recipes(recipes: list[Recipe]) -> None:
+    """Добавляет рецепты в ленты подписчиков их авторов."""
+
+    limit = settings.FEED_FANOUT_LIMIT
+    recipes_by_author: dict[int, list[Recipe]] = {}
+    for recipe in recipes:
+        recipes_by_author.setdefault(recipe.author_id, []).append(recipe)
+    for author_id, author_recipes in recipes_by_author.items():
+        followers_ids = list(
+            Subscription.objects.filter(
+                author_recipe_id=author_id
+            ).values_list('user_id', flat=True)[:limit + 1]
+        )
+        if len(followers_ids) > limit:
+            followers_ids = [None]
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=user_id, author_id=author_id,
+                    recipe_id=recipe.id
+                )
+                for recipe in author_recipes for user_id in followers_ids
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+
+
+def backfill_feed(user_id: int, author_id: int) -> None:
+    """Добавляет в ленту нового подписчика последние рецепты автора."""
+
+    recipes_ids = Recipe.objects.filter(
+        author_id=author_id
+    ).order_by('-id').values_list(
+        'id', flat=True
+    )[:settings.FEED_BACKFILL_LIMIT]
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, author_id=author_id, recipe_id=pk)
+            for pk in recipes_ids
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def remove_from_feed(user_id: int, author_id: int) -> None:
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def get_feed_recipes_ids(
+    user_id: int, limit: int, before: Optional[int] = None
+) -> list[int]:
+    """
+    id рецептов ленты по убыванию, не больше limit.
+
+    before - id рецепта, после которого продолжается лента (keyset).
+    """
+
+    def page(queryset: QuerySet) -> list[int]:
+        if before is not None:
+            queryset = queryset.filter(recipe_id__lt=before)
+        return list(
+            queryset.order_by('-recipe_id').values_list(
+                'recipe_id', flat=True
+            )[:limit]
+        )
+
+    recipes_ids = page(FeedEntry.objects.filter(user_id=user_id))
+    shared_ids = page(FeedEntry.objects.filter(
+        user__isnull=True,
+        author_id__in=Subscription.objects.filter(
+            user_id=user_id
+        ).values('author_recipe_id')
+    ))
+    if not shared_ids:
+        return recipes_ids
+    # Рецепт мог попасть в ленту и лично (догрузка при подписке)
+    return sorted(set(recipes_ids) | set(shared_ids), reverse=True)[:limit]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipetags',
+            index=models.Index(fields=['tag', 'recipe'], name='recipe_tags_tag_recipe_idx'),
+        ),
+    ]
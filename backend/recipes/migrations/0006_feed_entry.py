@@ -0,0 +1,64 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import recipes.models.fields
+
+
+def fill_feed(apps, schema_editor):
+    # Как при подписке: последние рецепты автора в ленту подписчика
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    subscriptions = Subscription.objects.values_list(
+        'user_id', 'author_recipe_id'
+    )
+    for user_id, author_id in subscriptions.iterator():
+        recipes_ids = Recipe.objects.filter(
+            author_id=author_id
+        ).order_by('-id').values_list(
+            'id', flat=True
+        )[:settings.FEED_BACKFILL_LIMIT]
+        FeedEntry.objects.bulk_create(
+            FeedEntry(user_id=user_id, author_id=author_id, recipe_id=pk)
+            for pk in recipes_ids
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0005_recipe_tags_tag_recipe_index'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', recipes.models.fields.UserForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор рецепта')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', recipes.models.fields.UserForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'Лента подписок',
+                'db_table': 'cookbook_feed_entry',
+                'abstract': False,
+                'default_related_name': 'feed_entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['author', 'recipe'], name='feed_entry_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
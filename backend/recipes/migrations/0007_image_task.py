@@ -0,0 +1,42 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('recipes', '0006_feed_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, verbose_name='Путь до картинки')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('processing', 'Обрабатывается'), ('failed', 'Ошибка')], default='pending', max_length=16, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Поставлена')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменена')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype', verbose_name='Модель')),
+            ],
+            options={
+                'verbose_name': 'обработка картинки',
+                'verbose_name_plural': 'Обработка картинок',
+                'db_table': 'cookbook_image_task',
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='imagetask',
+            index=models.Index(fields=['status', 'id'], name='image_task_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='imagetask',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('pending', 'processing'))), fields=('content_type', 'name'), name='unique_active_image_task'),
+        ),
+    ]
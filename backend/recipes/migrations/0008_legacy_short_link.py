@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_links(apps, schema_editor):
+    # Случайные ссылки не были уникальными: совпавшую оставляем
+    # самому старому рецепту, у остальных теперь только ссылка по id
+    Recipe = apps.get_model('recipes', 'Recipe')
+    duplicates = Recipe.objects.order_by().values('short_link').annotate(
+        count=Count('id')
+    ).filter(count__gt=1).values_list('short_link', flat=True)
+    for short_link in list(duplicates):
+        first_id = Recipe.objects.filter(
+            short_link=short_link
+        ).order_by('id').values_list('id', flat=True)[0]
+        Recipe.objects.filter(short_link=short_link).exclude(
+            id=first_id
+        ).update(short_link=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_image_task'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_link',
+            field=models.CharField(max_length=6, null=True, verbose_name='Короткая ссылка'),
+        ),
+        migrations.RunPython(drop_duplicate_links, migrations.RunPython.noop),
+        migrations.RenameField(
+            model_name='recipe',
+            old_name='short_link',
+            new_name='legacy_short_link',
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='legacy_short_link',
+            field=models.CharField(blank=True, editable=False, max_length=6, null=True, unique=True, verbose_name='Старая короткая ссылка'),
+        ),
+    ]
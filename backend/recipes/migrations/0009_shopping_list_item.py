@@ -0,0 +1,62 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+import recipes.models.fields
+
+BATCH_SIZE = 1000
+
+
+def fill_shopping_lists(apps, schema_editor):
+    # Как команда rebuild_shopping_lists: суммы ингредиентов корзин
+    RecipeIngredients = apps.get_model('recipes', 'RecipeIngredients')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    totals = RecipeIngredients.objects.filter(
+        recipe__shopping_cart__isnull=False
+    ).values_list('recipe__shopping_cart__author', 'ingredient').annotate(
+        total=Sum('amount')
+    ).order_by()
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id,
+                total_amount=total
+            ) for user_id, ingredient_id, total in totals.iterator()
+        ),
+        batch_size=BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_legacy_short_link'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.BigIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', recipes.models.fields.UserForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to=settings.AUTH_USER_MODEL, verbose_name='Владелец списка покупок')),
+            ],
+            options={
+                'verbose_name': 'строка списка покупок',
+                'verbose_name_plural': 'Списки покупок',
+                'db_table': 'cookbook_shopping_list_item',
+                'abstract': False,
+                'default_related_name': 'shopping_list_items',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
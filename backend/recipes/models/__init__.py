@@ -1,21 +1,27 @@
 from recipes.models.abstract_models import CookbookBaseModel
+from recipes.models.feed_entry import FeedEntry
 from recipes.models.fields import UserForeignKey
+from recipes.models.image_task import ImageTask
 from recipes.models.ingredient import Ingredient
 from recipes.models.recipe import Recipe
 from recipes.models.recipe_favorite import RecipeFavorite
 from recipes.models.recipe_ingredients import RecipeIngredients
 from recipes.models.recipe_tags import RecipeTags
 from recipes.models.shopping_cart import ShoppingCart
+from recipes.models.shopping_list_item import ShoppingListItem
 from recipes.models.tag import Tag
 
 __all__ = [
     'CookbookBaseModel',
+    'FeedEntry',
+    'ImageTask',
     'Ingredient',
     'Recipe',
     'RecipeFavorite',
     'RecipeIngredients',
     'RecipeTags',
     'ShoppingCart',
+    'ShoppingListItem',
     'Tag',
     'UserForeignKey'
 ]
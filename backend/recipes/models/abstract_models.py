@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F
 
 from recipes.models.base_models import CookbookBaseModel
 from recipes.models.fields import UserForeignKey
@@ -20,9 +21,22 @@ class BaseActionRecipeModel(CookbookBaseModel):
         to=Recipe, verbose_name='Рецепт', on_delete=models.CASCADE
     )
 
+    counter_field: str = None  # Поле-счётчик Recipe, назначаем у дочерних
+
     class Meta(CookbookBaseModel.Meta):
         abstract = True
         # Хотел сюда еще ограничение уникальности вынести, определяя имя
         # через cls.__name__, но что бы я не делал - в миграции не попадают.
         # Походу, это не реально для текущей версии:
         # https://stackoverflow.com/questions/57149015/creating-a-models-uniqueconstraint-in-abstract-model
+
+    @classmethod
+    def update_counter(cls, recipe_id: int, delta: int) -> None:
+        """Атомарно изменяет счётчик рецепта на delta."""
+
+        recipes = Recipe.objects.filter(id=recipe_id)
+        if delta < 0:
+            # Разошедшийся счётчик не уводим в минус, его чинит
+            # команда repair_counters
+            recipes = recipes.filter(**{f'{cls.counter_field}__gte': -delta})
+        recipes.update(**{cls.counter_field: F(cls.counter_field) + delta})
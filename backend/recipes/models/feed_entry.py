@@ -0,0 +1,45 @@
+from django.db import models
+
+from recipes.models.base_models import CookbookBaseModel
+from recipes.models.fields import UserForeignKey
+from recipes.models.recipe import Recipe
+
+
+class FeedEntry(CookbookBaseModel):
+    """
+    Запись ленты подписок (см. recipes.feed).
+
+    Заполняется при публикации рецепта для каждого подписчика автора.
+    У авторов с огромным числом подписчиков вместо этого создаётся одна
+    общая запись без пользователя - её лента подмешивает при чтении.
+    """
+
+    user = UserForeignKey(
+        verbose_name='Подписчик', null=True, blank=True,
+        related_name='feed_entries'
+    )
+    author = UserForeignKey(verbose_name='Автор рецепта', related_name='+')
+    recipe = models.ForeignKey(
+        to=Recipe, verbose_name='Рецепт', on_delete=models.CASCADE
+    )
+
+    class Meta(CookbookBaseModel.Meta):
+        constraints = [
+            # Заодно индекс (user_id, recipe_id) для чтения ленты
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            # Удаление записей при отписке и общие записи авторов
+            models.Index(
+                fields=('author', 'recipe'), name='feed_entry_author_idx'
+            )
+        ]
+        default_related_name = 'feed_entries'
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Лента подписок'
+
+    def __str__(self) -> str:
+        return f'Рецепт #{self.recipe_id} для #{self.user_id}'
@@ -0,0 +1,63 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+from core.constants import LENGTH_CHARFIELD_256
+from recipes.models.base_models import CookbookBaseModel
+
+
+class ImageTask(CookbookBaseModel):
+    """
+    Задача фоновой обработки загруженной картинки (см. api.image_tasks).
+
+    Запрос только сохраняет оригинал и ставит задачу, а проверку картинки
+    и создание производных выполняет команда process_image_tasks.
+    Выполненные задачи удаляются, остаются только ожидающие и ошибки.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        PROCESSING = 'processing', 'Обрабатывается'
+        FAILED = 'failed', 'Ошибка'
+
+    content_type = models.ForeignKey(
+        to=ContentType, verbose_name='Модель', on_delete=models.CASCADE,
+        related_name='+'
+    )
+    name = models.CharField(
+        verbose_name='Путь до картинки', max_length=LENGTH_CHARFIELD_256
+    )
+    status = models.CharField(
+        verbose_name='Статус', max_length=16, choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток', default=0
+    )
+    error = models.TextField(verbose_name='Ошибка', blank=True)
+    created_at = models.DateTimeField(
+        verbose_name='Поставлена', auto_now_add=True
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Изменена', auto_now=True
+    )
+
+    class Meta(CookbookBaseModel.Meta):
+        constraints = [
+            # Одна и та же картинка не стоит в очереди дважды
+            models.UniqueConstraint(
+                fields=('content_type', 'name'),
+                condition=models.Q(status__in=('pending', 'processing')),
+                name='unique_active_image_task'
+            )
+        ]
+        indexes = [
+            # Выборка задач воркером
+            models.Index(
+                fields=('status', 'id'), name='image_task_status_idx'
+            )
+        ]
+        verbose_name = 'обработка картинки'
+        verbose_name_plural = 'Обработка картинок'
+
+    def __str__(self) -> str:
+        return f'{self.name} ({self.get_status_display()})'
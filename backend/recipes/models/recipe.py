@@ -13,15 +13,24 @@ from core.constants import (
     MIN_INTEGER_VALUE,
     RECIPE_IMAGE_PATH
 )
-from core.utils import generate_short_link
+from core.utils import encode_base62
 from recipes.models.base_models import CookbookBaseModel
 from recipes.models.fields import UserForeignKey
 from recipes.models.ingredient import Ingredient
 from recipes.models.tag import Tag
+from recipes.search import search_recipes
 
 User = get_user_model()
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def search(self, query: str) -> 'RecipeQuerySet':
+        """Полнотекстовый поиск по названию и описанию (см. search.py)."""
+
+        return search_recipes(self, query)
+
+
 class Recipe(CookbookBaseModel):
     """Модель рецептов."""
 
@@ -56,14 +65,28 @@ class Recipe(CookbookBaseModel):
             )
         ]
     )
-    short_link = models.CharField(
-        verbose_name='Короткая ссылка', default=generate_short_link,
-        max_length=MAX_LENGTH_SHORT_LINK
+    # Ссылки новых рецептов - id в base62 (short_link), а выданные
+    # раньше случайные ссылки продолжают работать (recipes.short_links)
+    legacy_short_link = models.CharField(
+        verbose_name='Старая короткая ссылка',
+        max_length=MAX_LENGTH_SHORT_LINK, unique=True, null=True,
+        blank=True, editable=False
     )
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации',
         default=now, editable=False
     )
+    # Счётчики ведутся в RecipeFavorite/ShoppingCart через F()-выражения
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном', default=0, editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='В корзинах', default=0, editable=False
+    )
+
+    counter_fields = ('favorites_count', 'shopping_cart_count')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta(CookbookBaseModel.Meta):
         default_related_name = 'recipes'
@@ -74,5 +97,22 @@ class Recipe(CookbookBaseModel):
     def __str__(self) -> str:
         return f'[{self.id}] {self.name}'
 
+    def save(self, *args, **kwargs) -> None:
+        # Значения счётчиков в экземпляре могут устареть, пока он в работе:
+        # при обновлении не перезаписываем их, чтобы не потерять F()-правки
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred_fields = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred_fields
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def short_link(self) -> str:
+        return encode_base62(self.pk)
+
     def get_frontend_absolute_url(self) -> str:
         return FRONTEND_DETAIL_URL.format(pk=self.pk)
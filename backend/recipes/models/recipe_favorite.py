@@ -9,6 +9,8 @@ User = get_user_model()
 class RecipeFavorite(BaseActionRecipeModel):
     """Модель избранных рецептов."""
 
+    counter_field = 'favorites_count'
+
     class Meta(BaseActionRecipeModel.Meta):
         constraints = [
             models.UniqueConstraint(
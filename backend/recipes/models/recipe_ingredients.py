@@ -10,40 +10,6 @@ from core.constants import (
 from recipes.models.base_models import CookbookBaseModel
 from recipes.models.ingredient import Ingredient
 from recipes.models.recipe import Recipe
-from users.models.user import User
-
-
-class RecipeIngredientsQuerySet(models.QuerySet):
-    """QuerySet модели-связи рецептов и ингредиентов."""
-
-    def get_sum_amount(self) -> 'RecipeIngredientsQuerySet':
-        return self.annotate(total_amount=models.Sum('amount'))
-
-    def order_by_ingredient_name(self) -> 'RecipeIngredientsQuerySet':
-        return self.order_by('ingredient__name')
-
-    def rename_fields(self) -> 'RecipeIngredientsQuerySet':
-        return self.values(
-            name=models.F('ingredient__name'),
-            measurement_unit=models.F('ingredient__measurement_unit')
-        )
-
-
-class ShopCartListManager(models.Manager):
-    """
-    Manager модели-связи рецептов и ингредиентов.
-
-    Используется для получения список ингредиентов для покупок.
-    """
-
-    def get_queryset(self, author: User) -> RecipeIngredientsQuerySet:
-        return (
-            RecipeIngredientsQuerySet(self.model)
-            .filter(recipe__shopping_cart__author=author)
-            .rename_fields()
-            .get_sum_amount()
-            .order_by_ingredient_name()
-        )
 
 
 class RecipeIngredients(CookbookBaseModel):
@@ -69,9 +35,6 @@ class RecipeIngredients(CookbookBaseModel):
         ]
     )
 
-    objects = RecipeIngredientsQuerySet.as_manager()
-    shopping_list = ShopCartListManager()
-
     class Meta(CookbookBaseModel.Meta):
         default_related_name = 'recipe_ingredients'
         verbose_name = 'ингредиент рецепта'
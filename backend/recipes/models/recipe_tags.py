@@ -17,6 +17,12 @@ class RecipeTags(CookbookBaseModel):
 
     class Meta(CookbookBaseModel.Meta):
         default_related_name = 'recipe_tags'
+        indexes = [
+            # Фильтр по тегам: EXISTS по tag_id с проверкой recipe_id
+            models.Index(
+                fields=('tag', 'recipe'), name='recipe_tags_tag_recipe_idx'
+            )
+        ]
         verbose_name = 'Тег рецепта'
         verbose_name_plural = 'Теги рецептов'
 
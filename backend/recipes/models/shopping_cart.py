@@ -9,6 +9,8 @@ User = get_user_model()
 class ShoppingCart(BaseActionRecipeModel):
     """Модель корзины покупок."""
 
+    counter_field = 'shopping_cart_count'
+
     class Meta(BaseActionRecipeModel.Meta):
         constraints = [
             models.UniqueConstraint(
@@ -0,0 +1,70 @@
+from typing import Iterator
+
+from django.db import models
+
+from recipes.models.base_models import CookbookBaseModel
+from recipes.models.fields import UserForeignKey
+from recipes.models.ingredient import Ingredient
+from recipes.units import Amount, get_factor, to_readable
+from users.models.user import User
+
+
+class ShoppingListItemQuerySet(models.QuerySet):
+    """QuerySet строк готового списка покупок."""
+
+    def get_rows(
+        self, user: User
+    ) -> Iterator[tuple[str, str, Amount]]:
+        """
+        Строки списка покупок (название, единица, количество) в самых
+        читаемых единицах. Один запрос по индексу (user_id, ingredient_id),
+        строки читаются курсором.
+        """
+
+        rows = self.filter(user=user, total_amount__gt=0).order_by(
+            'ingredient__name'
+        ).values_list(
+            'ingredient__name', 'ingredient__measurement_unit',
+            'total_amount'
+        )
+        for name, measurement_unit, total_amount in rows.iterator():
+            yield (
+                name,
+                *to_readable(
+                    measurement_unit,
+                    total_amount * get_factor(measurement_unit)
+                )
+            )
+
+
+class ShoppingListItem(CookbookBaseModel):
+    """
+    Строка списка покупок пользователя (см. recipes.shopping_list).
+
+    Сумма ингредиента по всем рецептам корзины, в единицах самого
+    ингредиента: смена единицы ингредиента не требует пересчёта.
+    Обновляется при изменении корзины и ингредиентов рецептов в ней.
+    """
+
+    user = UserForeignKey(verbose_name='Владелец списка покупок')
+    ingredient = models.ForeignKey(
+        to=Ingredient, verbose_name='Ингредиент', on_delete=models.CASCADE
+    )
+    total_amount = models.BigIntegerField(verbose_name='Количество')
+
+    objects = ShoppingListItemQuerySet.as_manager()
+
+    class Meta(CookbookBaseModel.Meta):
+        constraints = [
+            # Заодно индекс (user_id, ingredient_id) для чтения списка
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item'
+            )
+        ]
+        default_related_name = 'shopping_list_items'
+        verbose_name = 'строка списка покупок'
+        verbose_name_plural = 'Списки покупок'
+
+    def __str__(self) -> str:
+        return f'Ингредиент #{self.ingredient_id} для #{self.user_id}'
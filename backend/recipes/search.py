@@ -0,0 +1,173 @@
+"""
+Полнотекстовый поиск рецептов по названию и описанию.
+
+Индекс зависит от СУБД и создаётся вне моделей (миграция и post_migrate):
+* PostgreSQL - колонка tsvector (конфигурация russian) у таблицы рецептов,
+  GIN-индекс по ней и триггер, пересчитывающий её при записи;
+* SQLite - виртуальная таблица FTS5 с внешним содержимым (таблица
+  рецептов) и триггеры, синхронизирующие её при записи.
+В обоих случаях название весит больше описания, результаты ранжируются.
+"""
+
+import re
+
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Q, QuerySet
+
+RECIPE_TABLE = 'cookbook_recipe'
+SEARCH_TABLE = 'cookbook_recipe_search'
+SEARCH_CONFIG = 'pg_catalog.russian'
+# Вес названия и описания (PostgreSQL - классы A/B, SQLite - bm25)
+NAME_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+
+POSTGRESQL_SEARCH_VECTOR = (
+    "setweight(to_tsvector('{config}', coalesce({row}.name, '')), 'A') || "
+    "setweight(to_tsvector('{config}', coalesce({row}.text, '')), 'B')"
+)
+POSTGRESQL_DROP_TRIGGER = (
+    f'DROP TRIGGER IF EXISTS {RECIPE_TABLE}_search_vector ON {RECIPE_TABLE}'
+)
+POSTGRESQL_INSTALL = (
+    f'ALTER TABLE {RECIPE_TABLE} '
+    'ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    f'CREATE OR REPLACE FUNCTION {RECIPE_TABLE}_search_vector_update() '
+    'RETURNS trigger AS $$ BEGIN NEW.search_vector := '
+    + POSTGRESQL_SEARCH_VECTOR.format(config=SEARCH_CONFIG, row='NEW')
+    + '; RETURN NEW; END $$ LANGUAGE plpgsql',
+    POSTGRESQL_DROP_TRIGGER,
+    f'CREATE TRIGGER {RECIPE_TABLE}_search_vector '
+    f'BEFORE INSERT OR UPDATE OF name, text ON {RECIPE_TABLE} '
+    f'FOR EACH ROW EXECUTE FUNCTION {RECIPE_TABLE}_search_vector_update()',
+    f'UPDATE {RECIPE_TABLE} SET search_vector = '
+    + POSTGRESQL_SEARCH_VECTOR.format(config=SEARCH_CONFIG, row=RECIPE_TABLE)
+    + ' WHERE search_vector IS NULL',
+    f'CREATE INDEX IF NOT EXISTS {RECIPE_TABLE}_search_vector_idx '
+    f'ON {RECIPE_TABLE} USING GIN (search_vector)',
+)
+POSTGRESQL_UNINSTALL = (
+    POSTGRESQL_DROP_TRIGGER,
+    f'DROP FUNCTION IF EXISTS {RECIPE_TABLE}_search_vector_update()',
+    f'ALTER TABLE {RECIPE_TABLE} DROP COLUMN IF EXISTS search_vector',
+)
+
+SQLITE_DELETE_ROW = (
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, text) "
+    "VALUES ('delete', old.id, old.name, old.text);"
+)
+SQLITE_INSERT_ROW = (
+    f'INSERT INTO {SEARCH_TABLE}(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text);'
+)
+SQLITE_INSTALL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+    f"name, text, content='{RECIPE_TABLE}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert '
+    f'AFTER INSERT ON {RECIPE_TABLE} BEGIN {SQLITE_INSERT_ROW} END',
+    f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete '
+    f'AFTER DELETE ON {RECIPE_TABLE} BEGIN {SQLITE_DELETE_ROW} END',
+    f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update '
+    f'AFTER UPDATE OF name, text ON {RECIPE_TABLE} '
+    f'BEGIN {SQLITE_DELETE_ROW} {SQLITE_INSERT_ROW} END',
+)
+SQLITE_REBUILD = (
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+)
+SQLITE_UNINSTALL = (
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+)
+
+
+def install_search_index(
+    connection: BaseDatabaseWrapper, rebuild: bool = False
+) -> None:
+    """
+    Создаёт недостающие объекты поискового индекса.
+
+    Повторный вызов безопасен. Нужен и после миграций: в SQLite изменение
+    таблицы рецептов пересоздаёт её вместе с триггерами.
+    """
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRESQL_INSTALL:
+                cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            for sql in SQLITE_INSTALL:
+                cursor.execute(sql)
+            if rebuild:
+                cursor.execute(SQLITE_REBUILD)
+
+
+def uninstall_search_index(connection: BaseDatabaseWrapper) -> None:
+    statements = {
+        'postgresql': POSTGRESQL_UNINSTALL,
+        'sqlite': SQLITE_UNINSTALL,
+    }.get(connection.vendor, ())
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def get_terms(query: str) -> list[str]:
+    return re.findall(r'\w+', query)
+
+
+def search_recipes(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Рецепты, подходящие под запрос, по убыванию релевантности.
+
+    Все слова запроса обязательны. Релевантность доступна в поле
+    search_rank. На СУБД без поддержки индекса - поиск через icontains.
+
+    Используется extra(): индекс SQLite - отдельная таблица без модели,
+    и ранжировать её нужно в соединении, а не подзапросом на каждую
+    строку - иначе MATCH выполняется заново для каждого рецепта.
+    """
+
+    terms = get_terms(query)
+    if not terms:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+        queryset = queryset.extra(
+            select={
+                'search_rank':
+                f'ts_rank({RECIPE_TABLE}.search_vector, {tsquery})'
+            },
+            select_params=(' '.join(terms),),
+            where=[f'{RECIPE_TABLE}.search_vector @@ {tsquery}'],
+            params=(' '.join(terms),)
+        )
+    elif vendor == 'sqlite':
+        # Каждое слово - фраза в кавычках с поиском по префиксу:
+        # стемминга для русского в FTS5 нет, а операторы запроса
+        # пользователя не должны интерпретироваться
+        match = ' '.join(
+            '"{}"*'.format(term.replace('"', '""')) for term in terms
+        )
+        queryset = queryset.extra(
+            select={
+                'search_rank':
+                f'-bm25({SEARCH_TABLE}, {NAME_WEIGHT}, {TEXT_WEIGHT})'
+            },
+            tables=[SEARCH_TABLE],
+            where=[
+                f'{SEARCH_TABLE}.rowid = {RECIPE_TABLE}.id',
+                f'{SEARCH_TABLE} MATCH %s'
+            ],
+            params=(match,)
+        )
+    else:
+        for term in terms:
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(text__icontains=term)
+            )
+        return queryset
+    return queryset.order_by('-search_rank', '-id')
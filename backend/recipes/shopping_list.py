@@ -0,0 +1,199 @@
+"""
+Список покупок: суммы ингредиентов всех рецептов корзины пользователя.
+
+Список хранится готовым (ShoppingListItem) и обновляется при записи:
+рецепт попал в корзину или ушёл из неё - количества его ингредиентов
+прибавляются к списку владельца или вычитаются из него; у рецепта в
+корзинах изменились ингредиенты - разница применяется к спискам всех
+его владельцев (одним UPDATE на тысячу списков). Скачивание списка -
+чтение по индексу (user_id, ingredient_id), без агрегации по корзине.
+
+Разошедшийся с корзинами список находит команда check_shopping_lists,
+пересобирает - rebuild_shopping_lists.
+"""
+
+import heapq
+from collections import Counter
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Iterable, Iterator, Optional
+
+from django.db import models, transaction
+from django.db.models import QuerySet
+
+from recipes.models import RecipeIngredients, ShoppingCart, ShoppingListItem
+
+BATCH_SIZE = 1000
+
+Amounts = dict[int, int]  # id ингредиента: количество
+
+
+def get_recipe_amounts(recipe_id: int) -> Amounts:
+    """Количества ингредиентов рецепта."""
+
+    amounts = Counter()
+    rows = RecipeIngredients.objects.filter(recipe_id=recipe_id).values_list(
+        'ingredient_id', 'amount'
+    )
+    for ingredient_id, amount in rows:
+        amounts[ingredient_id] += amount
+    return amounts
+
+
+def get_amounts_difference(old: Amounts, new: Amounts) -> Amounts:
+    return {
+        ingredient_id: new.get(ingredient_id, 0) - old.get(ingredient_id, 0)
+        for ingredient_id in old.keys() | new.keys()
+    }
+
+
+def change_shopping_lists(users_ids: list[int], amounts: Amounts) -> None:
+    """
+    Изменяет количества в списках пользователей на amounts.
+
+    Строки, в которых ничего не осталось, удаляются.
+    """
+
+    amounts = {
+        ingredient_id: delta for ingredient_id, delta in amounts.items()
+        if delta
+    }
+    if not amounts:
+        return
+    added_ids = [
+        ingredient_id for ingredient_id, delta in amounts.items() if delta > 0
+    ]
+    items = ShoppingListItem.objects.filter(
+        user_id__in=users_ids, ingredient_id__in=amounts
+    )
+    with transaction.atomic():
+        if added_ids:
+            # Недостающие строки создаются пустыми, а прибавляются вместе
+            # с остальными одним UPDATE
+            ShoppingListItem.objects.bulk_create(
+                (
+                    ShoppingListItem(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        total_amount=0
+                    )
+                    for user_id in users_ids for ingredient_id in added_ids
+                ),
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True
+            )
+        items.update(total_amount=models.F('total_amount') + models.Case(
+            *(
+                models.When(ingredient_id=ingredient_id, then=delta)
+                for ingredient_id, delta in amounts.items()
+            ),
+            output_field=models.BigIntegerField()
+        ))
+        if len(added_ids) < len(amounts):
+            items.filter(total_amount__lte=0).delete()
+
+
+def add_to_shopping_list(user_id: int, recipe_id: int) -> None:
+    change_shopping_lists([user_id], get_recipe_amounts(recipe_id))
+
+
+def remove_from_shopping_list(user_id: int, recipe_id: int) -> None:
+    amounts = get_recipe_amounts(recipe_id)
+    change_shopping_lists(
+        [user_id],
+        {ingredient_id: -amount for ingredient_id, amount in amounts.items()}
+    )
+
+
+def change_recipe_amounts(recipe_id: int, amounts: Amounts) -> None:
+    """Применяет изменение ингредиентов рецепта к спискам его владельцев."""
+
+    if not any(amounts.values()):
+        return
+    users_ids = list(
+        ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+            'author_id', flat=True
+        )
+    )
+    for start in range(0, len(users_ids), BATCH_SIZE):
+        change_shopping_lists(users_ids[start:start + BATCH_SIZE], amounts)
+
+
+def get_live_totals(users_ids: Optional[list[int]] = None) -> QuerySet:
+    """
+    Суммы, посчитанные по корзинам: (id пользователя, id ингредиента,
+    количество), по возрастанию id.
+    """
+
+    # Условия в одном filter: иначе у связи с корзиной будет два JOIN
+    lookups = {'recipe__shopping_cart__isnull': False}
+    if users_ids is not None:
+        lookups = {'recipe__shopping_cart__author__in': users_ids}
+    return RecipeIngredients.objects.filter(**lookups).values_list(
+        'recipe__shopping_cart__author', 'ingredient'
+    ).annotate(total=models.Sum('amount')).order_by(
+        'recipe__shopping_cart__author', 'ingredient'
+    )
+
+
+def rebuild_shopping_lists(users_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Пересобирает списки пользователей (всех, если users_ids не задан)
+    по корзинам. Возвращает число строк в пересобранных списках.
+    """
+
+    if users_ids is None:
+        with transaction.atomic():
+            ShoppingListItem.objects.all().delete()
+            return create_items(get_live_totals())
+    users_ids = list(users_ids)
+    created = 0
+    for start in range(0, len(users_ids), BATCH_SIZE):
+        batch = users_ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            ShoppingListItem.objects.filter(user_id__in=batch).delete()
+            created += create_items(get_live_totals(batch))
+    return created
+
+
+def create_items(totals: QuerySet) -> int:
+    rows = totals.iterator()
+    created = 0
+    while True:
+        items = [
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id,
+                total_amount=total
+            ) for user_id, ingredient_id, total in islice(rows, BATCH_SIZE)
+        ]
+        if not items:
+            return created
+        ShoppingListItem.objects.bulk_create(items)
+        created += len(items)
+
+
+def find_differences() -> Iterator[tuple[int, int, int, int]]:
+    """
+    Расхождения списков с корзинами: (id пользователя, id ингредиента,
+    количество по корзинам, количество в списке), 0 - строки нет.
+
+    Обе выборки читаются курсором по возрастанию ключа и сливаются,
+    в памяти держится только текущая строка.
+    """
+
+    live = (
+        (user_id, ingredient_id, 0, total)
+        for user_id, ingredient_id, total in get_live_totals().iterator()
+    )
+    stored = (
+        (user_id, ingredient_id, 1, total)
+        for user_id, ingredient_id, total in
+        ShoppingListItem.objects.order_by('user_id', 'ingredient_id')
+        .values_list('user_id', 'ingredient_id', 'total_amount').iterator()
+    )
+    rows = heapq.merge(live, stored)
+    for (user_id, ingredient_id), group in groupby(rows, itemgetter(0, 1)):
+        totals = [0, 0]
+        for _, _, source, total in group:
+            totals[source] = total
+        if totals[0] != totals[1]:
+            yield user_id, ingredient_id, *totals
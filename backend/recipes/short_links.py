@@ -0,0 +1,45 @@
+"""
+Короткие ссылки рецептов: /s/<ссылка>/.
+
+Ссылка - id рецепта в base62 (Recipe.short_link), поэтому редирект
+вычисляет адрес без запроса к базе. Раньше ссылки были случайными
+(шесть шестнадцатеричных знаков) - они хранятся в уникальной колонке
+Recipe.legacy_short_link, и такие ссылки ищутся по её индексу.
+Новые старые ссылки не появляются, поэтому результат поиска
+кешируется в процессе без сброса.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional
+
+from core.constants import MAX_LENGTH_SHORT_LINK, SHORT_LINK_CACHE_SIZE
+from core.utils import decode_base62
+from recipes.models import Recipe
+
+LEGACY_SHORT_LINK = re.compile(rf'[0-9a-f]{{{MAX_LENGTH_SHORT_LINK}}}')
+
+
+@lru_cache(maxsize=SHORT_LINK_CACHE_SIZE)
+def get_legacy_recipe_id(short_link: str) -> Optional[int]:
+    return Recipe.objects.filter(
+        legacy_short_link=short_link
+    ).values_list('id', flat=True).first()
+
+
+def get_recipe_id(short_link: str) -> Optional[int]:
+    """
+    Id рецепта по короткой ссылке или None.
+
+    Существование рецепта не проверяется: удалённый рецепт покажет
+    страница фронта.
+    """
+
+    # Старая ссылка может оказаться и корректной строкой base62 -
+    # у неё приоритет (id, дающие такую строку, больше 900 млн)
+    if LEGACY_SHORT_LINK.fullmatch(short_link):
+        recipe_id = get_legacy_recipe_id(short_link)
+        if recipe_id is not None:
+            return recipe_id
+    recipe_id = decode_base62(short_link)
+    return recipe_id or None
@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.dispatch import receiver
+
+from recipes.feed import backfill_feed, fan_out_recipes, remove_from_feed
+from recipes.models import Recipe, RecipeFavorite, ShoppingCart
+from recipes.models.abstract_models import BaseActionRecipeModel
+from recipes.shopping_list import (
+    add_to_shopping_list,
+    remove_from_shopping_list
+)
+from users.models import Subscription
+
+
+@receiver(pre_save, sender=RecipeFavorite)
+@receiver(pre_save, sender=ShoppingCart)
+def action_recipe_changing(
+    sender: type[BaseActionRecipeModel], instance: BaseActionRecipeModel,
+    **kwargs
+) -> None:
+    # В админке у существующей записи можно сменить рецепт и владельца
+    instance._previous_author_id, instance._previous_recipe_id = (
+        sender.objects.filter(pk=instance.pk).values_list(
+            'author_id', 'recipe_id'
+        ).first() if instance.pk else None
+    ) or (None, None)
+
+
+@receiver(post_save, sender=RecipeFavorite)
+@receiver(post_save, sender=ShoppingCart)
+def action_recipe_saved(
+    sender: type[BaseActionRecipeModel], instance: BaseActionRecipeModel,
+    created: bool, **kwargs
+) -> None:
+    previous_recipe_id = getattr(instance, '_previous_recipe_id', None)
+    if created:
+        sender.update_counter(instance.recipe_id, 1)
+    elif previous_recipe_id not in (None, instance.recipe_id):
+        sender.update_counter(previous_recipe_id, -1)
+        sender.update_counter(instance.recipe_id, 1)
+
+
+@receiver(post_delete, sender=RecipeFavorite)
+@receiver(post_delete, sender=ShoppingCart)
+def action_recipe_deleted(
+    sender: type[BaseActionRecipeModel], instance: BaseActionRecipeModel,
+    **kwargs
+) -> None:
+    sender.update_counter(instance.recipe_id, -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_saved(
+    sender: type[ShoppingCart], instance: ShoppingCart, created: bool,
+    **kwargs
+) -> None:
+    previous = (
+        getattr(instance, '_previous_author_id', None),
+        getattr(instance, '_previous_recipe_id', None)
+    )
+    if created:
+        add_to_shopping_list(instance.author_id, instance.recipe_id)
+    elif None not in previous and previous != (
+        instance.author_id, instance.recipe_id
+    ):
+        remove_from_shopping_list(*previous)
+        add_to_shopping_list(instance.author_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_deleting(
+    sender: type[ShoppingCart], instance: ShoppingCart, **kwargs
+) -> None:
+    # До удаления: при удалении рецепта его ингредиенты удаляются
+    # в той же транзакции, и после неё вычитать было бы нечего
+    remove_from_shopping_list(instance.author_id, instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(
+    sender: type[Recipe], instance: Recipe, created: bool, **kwargs
+) -> None:
+    if created:
+        transaction.on_commit(lambda: fan_out_recipes([instance]))
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(
+    sender: type[Subscription], instance: Subscription, created: bool,
+    **kwargs
+) -> None:
+    if created:
+        backfill_feed(instance.user_id, instance.author_recipe_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(
+    sender: type[Subscription], instance: Subscription, **kwargs
+) -> None:
+    remove_from_feed(instance.user_id, instance.author_recipe_id)
@@ -0,0 +1,48 @@
+"""
+Перевод единиц измерения для списка покупок.
+
+Сумма ингредиента (см. recipes.shopping_list) переводится в базовые
+единицы (UNIT_CONVERSIONS), а для вывода - в самую читаемую единицу ряда
+(READABLE_UNITS): 1500 г - 1.5 кг, 6 ч. л. - 2 ст. л., но 1234 г так и
+остаются граммами.
+Единицы не из таблицы выводятся как есть.
+"""
+
+from decimal import Decimal
+from typing import Union
+
+from core.constants import READABLE_UNITS, UNIT_CONVERSIONS
+
+Amount = Union[int, float]
+
+# Больше двух знаков после запятой - уже нечитаемо
+READABLE_PRECISION = 100
+
+
+def get_factor(measurement_unit: str) -> int:
+    return UNIT_CONVERSIONS.get(measurement_unit, (None, 1))[1]
+
+
+def get_readable_units(measurement_unit: str) -> tuple[str, ...]:
+    """Единицы ряда, не меньше данной, от крупной к мелкой."""
+
+    for units in READABLE_UNITS:
+        if measurement_unit in units:
+            return units[units.index(measurement_unit):][::-1]
+    return (measurement_unit,)
+
+
+def to_readable(measurement_unit: str, total: int) -> tuple[str, Amount]:
+    """
+    Переводит сумму в базовых единицах в самую читаемую единицу.
+
+    measurement_unit - единица ингредиента, в ней же сумма выводится,
+    если крупнее ничего не подходит.
+    """
+
+    for unit in get_readable_units(measurement_unit):
+        factor = get_factor(unit)
+        if total >= factor and total * READABLE_PRECISION % factor == 0:
+            amount = Decimal(total) / factor
+            return unit, int(amount) if amount % 1 == 0 else float(amount)
+    return measurement_unit, total // get_factor(measurement_unit)
@@ -1,7 +1,9 @@
 from http import HTTPStatus
 from typing import Any, Optional, Union
 
+from django.db import connection
 from django.db.models import Model
+from django.test.utils import CaptureQueriesContext
 from jsonschema import validate
 from jsonschema.exceptions import ValidationError
 from rest_framework.response import Response
@@ -468,3 +470,25 @@ class BaseTest:
         assert count_in_db == new_count_in_db, (
             'Убедитесь, что данные в БД не изменились.'
         )
+
+    def url_captured_queries(
+        self, client: APIClient, url: str, method: str = 'get',
+        data: Optional[dict[str, Any]] = None
+    ) -> tuple[Response, list[str]]:
+        """
+        Функция для сбора SQL-запросов, выполненных при обращении к url.
+
+        Принимает:
+        * client - Клиент для запроса
+        * url - Адрес запроса
+        * method - Метод, используемый при отправке запроса. По умолчанию get
+        * data - Опционально. Тело запроса
+
+        Возвращает:
+        * response - Ответ на запрос
+        * queries - Список выполненных SQL-запросов
+        """
+        with CaptureQueriesContext(connection) as context:
+            response: Response = getattr(client, method)(url, data)
+        self._url_is_accessible(response=response, url=url)
+        return response, [query['sql'] for query in context.captured_queries]
@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+from django.core.cache import cache
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(
@@ -31,3 +33,10 @@ if FILENAME not in project_dir_content:
     )
 
 assert get_version() < '4.0.0', 'Пожалуйста, используйте версию Django < 4.0.0'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
@@ -1,15 +1,23 @@
+from random import Random
+
 import pytest
 
 from tests.utils.models import (
+    recipe_favorite_model,
     recipe_ingredients_model,
     recipe_model,
-    recipe_tags_model
+    recipe_tags_model,
+    shopping_cart_model,
+    subscription_model
 )
 from tests.utils.recipe import IMAGE
 
 Recipe = recipe_model()
 RecipeIngredients = recipe_ingredients_model()
 RecipeTags = recipe_tags_model()
+RecipeFavorite = recipe_favorite_model()
+ShoppingCart = shopping_cart_model()
+Subscription = subscription_model()
 
 
 def create_recipe(data: dict):
@@ -151,3 +159,39 @@ def all_recipes(
     secound_author_recipes, another_author_recipe
 ) -> list:
     return [*secound_author_recipes, another_author_recipe]
+
+
+@pytest.fixture(params=[1, 2, 3])
+def random_recipes(
+    request, ingredients, tags, first_user, second_user, third_user
+) -> list:
+    """Случайные рецепты, избранное, корзина и подписки третьего юзера."""
+
+    rng = Random(request.param)
+    authors = [first_user, second_user, third_user]
+    recipes = [
+        create_recipe({
+            'author': rng.choice(authors),
+            'name': f'Случайный рецепт №{number}',
+            'image': rng.choice((IMAGE, 'recipes/images/image.png', '')),
+            'text': f'Описание случайного рецепта №{number}',
+            'cooking_time': rng.randint(1, 120),
+            'ingredients': [
+                {'id': ingredient, 'amount': rng.randint(1, 1000)}
+                for ingredient in rng.sample(
+                    ingredients, rng.randint(1, len(ingredients))
+                )
+            ],
+            'tags': rng.sample(tags, rng.randint(0, len(tags)))
+        }) for number in range(15)
+    ]
+    for model in (RecipeFavorite, ShoppingCart):
+        model.objects.bulk_create(
+            model(author=third_user, recipe=recipe)
+            for recipe in rng.sample(recipes, rng.randint(0, len(recipes)))
+        )
+    Subscription.objects.bulk_create(
+        Subscription(user=third_user, author_recipe=author)
+        for author in rng.sample(authors[:2], rng.randint(0, 2))
+    )
+    return recipes
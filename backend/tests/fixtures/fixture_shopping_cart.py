@@ -1,5 +1,6 @@
 import pytest
 
+from recipes.shopping_list import rebuild_shopping_lists
 from tests.utils.models import shopping_cart_model
 
 ShoppingCart = shopping_cart_model()
@@ -14,6 +15,8 @@ def three_shopping_cart(
         for recipe in (first_recipe, second_recipe, third_recipe)
     ]
     ShoppingCart.objects.bulk_create(shopping_cart)
+    # bulk_create не отправляет сигналы - список покупок собираем сами
+    rebuild_shopping_lists([third_user.id])
     return list(ShoppingCart.objects.all())
 
 
@@ -24,4 +27,6 @@ def all_shopping_cart(third_user, all_recipes) -> list:
         for recipe in all_recipes
     ]
     ShoppingCart.objects.bulk_create(shopping_cart)
+    # bulk_create не отправляет сигналы - список покупок собираем сами
+    rebuild_shopping_lists([third_user.id])
     return list(ShoppingCart.objects.all())
@@ -1,13 +1,17 @@
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
 from django.db.models import Model
 from rest_framework.test import APIClient
 
 from tests.base_test import BaseTest
 from tests.utils.favorite import URL_FAVORITE
 from tests.utils.general import NOT_EXISTING_ID
-from tests.utils.models import recipe_favorite_model
+from tests.utils.models import recipe_favorite_model, recipe_model
 from tests.utils.recipe import RESPONSE_SCHEMA_SHORT_RECIPE
 
+Recipe = recipe_model()
 RecipeFavorite = recipe_favorite_model()
 
 
@@ -53,6 +57,25 @@ class TestFavorite(BaseTest):
             response_schema=RESPONSE_SCHEMA_SHORT_RECIPE
         )
 
+    def test_add_to_favorite_absolute_image_urls(
+        self, third_user_authorized_client: APIClient, first_recipe: Model
+    ):
+        call_command(
+            'process_image_tasks', '--once', '--workers', '0',
+            stdout=StringIO(), stderr=StringIO()
+        )
+        response = third_user_authorized_client.post(
+            URL_FAVORITE.format(id=first_recipe.id)
+        )
+        recipe = response.json()
+        assert recipe['image'].startswith('http://') and all(
+            url.startswith('http://')
+            for urls in recipe['images'].values() for url in urls.values()
+        ), (
+            'Убедитесь, что ссылки на картинку и её производные в ответе '
+            'абсолютные.'
+        )
+
     def test_delete_favorite_unauthorized(
         self, api_client: APIClient, all_favorite: list
     ):
@@ -92,3 +115,39 @@ class TestFavorite(BaseTest):
             model=RecipeFavorite,
             item_id=favorite.id
         )
+
+    def test_favorite_updates_recipe_counter(
+        self, third_user_authorized_client: APIClient,
+        second_user_authorized_client: APIClient, first_recipe: Model
+    ):
+        url = URL_FAVORITE.format(id=first_recipe.id)
+        for client in (
+            third_user_authorized_client, second_user_authorized_client
+        ):
+            client.post(url)
+        # Сохранение устаревшего экземпляра не затирает счётчик
+        first_recipe.save()
+        recipe = Recipe.objects.get(id=first_recipe.id)
+        assert recipe.favorites_count == 2, (
+            'Убедитесь, что при добавлении в избранное увеличивается '
+            'счётчик `favorites_count` рецепта.'
+        )
+        third_user_authorized_client.delete(url)
+        recipe.refresh_from_db()
+        assert recipe.favorites_count == 1, (
+            'Убедитесь, что при удалении из избранного уменьшается '
+            'счётчик `favorites_count` рецепта.'
+        )
+
+    @pytest.mark.usefixtures('all_favorite', 'all_shopping_cart')
+    def test_repair_counters(self):
+        # bulk_create не отправляет сигналы - счётчики не обновлены
+        call_command('repair_counters', stdout=StringIO())
+        for recipe in Recipe.objects.all():
+            assert (
+                recipe.favorites_count == recipe.recipe_favorite.count()
+                and recipe.shopping_cart_count == recipe.shopping_cart.count()
+            ), (
+                'Убедитесь, что команда repair_counters пересчитывает '
+                'счётчики рецептов.'
+            )
@@ -0,0 +1,117 @@
+from http import HTTPStatus
+
+import pytest
+from django.db.models import Model
+from pytest_django.fixtures import SettingsWrapper
+from rest_framework.test import APIClient
+
+from api.pagination import FeedPagination
+from tests.base_test import BaseTest
+from tests.utils.models import (
+    feed_entry_model,
+    recipe_model,
+    subscription_model
+)
+from tests.utils.recipe import URL_FEED, URL_RECIPES
+
+FeedEntry = feed_entry_model()
+Recipe = recipe_model()
+Subscription = subscription_model()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFeed(BaseTest):
+
+    def get_feed_ids(self, client: APIClient, limit: int) -> list[int]:
+        """Проходит ленту по ссылкам next и собирает id рецептов."""
+
+        recipes_ids = []
+        url = f'{URL_FEED}?limit={limit}'
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data: dict = response.json()
+            assert len(data['results']) <= limit
+            recipes_ids.extend(recipe['id'] for recipe in data['results'])
+            url = data['next']
+        return recipes_ids
+
+    def test_feed_unauthorized(self, api_client: APIClient):
+        self.url_requires_authorization(
+            client=api_client, url=URL_FEED, method='get'
+        )
+
+    @pytest.mark.parametrize('fanout_limit', [10_000, 0])
+    def test_feed_contains_subscribed_authors_recipes(
+        self, settings: SettingsWrapper,
+        third_user_authorized_client: APIClient, all_recipes: list,
+        second_user: Model, third_user: Model, fanout_limit: int
+    ):
+        settings.FEED_FANOUT_LIMIT = fanout_limit
+        # Прежние рецепты попадают в ленту при подписке, новые - при
+        # публикации
+        Subscription.objects.create(user=third_user, author_recipe=second_user)
+        new_recipe = Recipe.objects.create(
+            author=second_user, name='Новый рецепт', text='Описание',
+            cooking_time=10
+        )
+        if fanout_limit == 0:
+            assert FeedEntry.objects.filter(
+                recipe=new_recipe, user__isnull=True
+            ).count() == 1, (
+                'Убедитесь, что у автора с большим числом подписчиков '
+                'рецепт попадает в ленту одной общей записью.'
+            )
+        expected_ids = list(
+            Recipe.objects.filter(author=second_user).order_by(
+                '-id'
+            ).values_list('id', flat=True)
+        )
+        assert self.get_feed_ids(
+            third_user_authorized_client, limit=2
+        ) == expected_ids, (
+            'Убедитесь, что лента содержит рецепты авторов из подписок '
+            'от новых к старым без пропусков и повторов.'
+        )
+        feed = third_user_authorized_client.get(URL_FEED, {'limit': 2})
+        recipes = third_user_authorized_client.get(
+            URL_RECIPES, {'author': second_user.id, 'limit': 2}
+        )
+        assert feed.json()['results'] == recipes.json()['results'], (
+            'Убедитесь, что рецепты в ленте сериализуются так же, '
+            'как в списке рецептов.'
+        )
+
+    def test_feed_unsubscribe(
+        self, third_user_authorized_client: APIClient,
+        third_user_subscriptions: list, all_recipes: list,
+        first_user: Model, second_user: Model
+    ):
+        def recipes_ids(*authors) -> set:
+            return set(Recipe.objects.filter(
+                author__in=authors
+            ).values_list('id', flat=True))
+
+        assert set(self.get_feed_ids(third_user_authorized_client, 10)) == (
+            recipes_ids(first_user, second_user)
+        )
+        Subscription.objects.filter(author_recipe=first_user).delete()
+        assert set(self.get_feed_ids(third_user_authorized_client, 10)) == (
+            recipes_ids(second_user)
+        ), 'Убедитесь, что после отписки рецептов автора нет в ленте.'
+
+    def test_feed_limit_capped(
+        self, monkeypatch: pytest.MonkeyPatch,
+        third_user_authorized_client: APIClient,
+        third_user_subscriptions: list, all_recipes: list
+    ):
+        monkeypatch.setattr(FeedPagination, 'max_page_size', 2)
+        response = third_user_authorized_client.get(
+            URL_FEED, {'limit': 1_000_000}
+        )
+        assert response.status_code == HTTPStatus.OK
+        data: dict = response.json()
+        assert len(data['results']) == 2, (
+            'Убедитесь, что размер страницы ленты ограничен max_page_size.'
+        )
+        assert data['next'] is not None
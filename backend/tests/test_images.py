@@ -0,0 +1,457 @@
+import base64
+import re
+import tracemalloc
+from http import HTTPStatus
+from io import StringIO
+from urllib.parse import urlparse
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Model
+from PIL import Image
+from pytest_django.fixtures import SettingsWrapper
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from api.management.commands import (
+    process_image_tasks as process_image_tasks_command
+)
+from api.serializers import AvatarSerializer
+from core.constants import (
+    IMAGE_DERIVATIVE_FORMATS,
+    RECIPE_IMAGE_WIDTHS,
+    USER_AVATAR_SIZES
+)
+from recipes.models import ImageTask
+from tests.base_test import BaseTest
+from tests.utils.image import MEGABYTE, make_base64_png
+from tests.utils.models import recipe_model
+from tests.utils.recipe import URL_GET_RECIPE, URL_RECIPES
+from tests.utils.user import URL_AVATAR, URL_ME
+
+Recipe = recipe_model()
+
+# ~10 МБ после декодирования
+LARGE_IMAGE_SIDE = 1880
+
+
+@pytest.fixture(scope='module')
+def large_image() -> str:
+    return make_base64_png(LARGE_IMAGE_SIDE, LARGE_IMAGE_SIDE)
+
+
+def process_image_tasks() -> str:
+    """Обрабатывает очередь картинок в текущем процессе."""
+
+    out = StringIO()
+    call_command(
+        'process_image_tasks', '--once', '--workers', '0',
+        stdout=out, stderr=StringIO()
+    )
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBase64Image(BaseTest):
+
+    def decode_with_peak_memory(self, data: str) -> tuple[object, int]:
+        """Декодирует картинку полем аватара, возвращает (файл, пик памяти)."""
+
+        field = AvatarSerializer().fields['avatar']
+        tracemalloc.start()
+        try:
+            try:
+                result = field.to_internal_value(data)
+            except ValidationError as error:
+                result = error
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result, peak
+
+    def test_large_image_decoded_in_chunks(
+        self, settings: SettingsWrapper, large_image: str
+    ):
+        settings.IMAGE_UPLOAD_MAX_SIZE = 16 * MEGABYTE
+        file, peak = self.decode_with_peak_memory(large_image)
+        assert not isinstance(file, ValidationError), (
+            f'Картинка ~10 МБ должна проходить проверку: {file}'
+        )
+        assert file.size > 10 * MEGABYTE
+        assert file.name.endswith('.png')
+        assert peak < MEGABYTE, (
+            'Убедитесь, что картинка декодируется кусками во временный '
+            f'файл: пик памяти {peak // 1024} КБ при картинке '
+            f'{file.size // MEGABYTE} МБ.'
+        )
+
+    def test_oversized_image_rejected_before_decoding(
+        self, settings: SettingsWrapper, large_image: str
+    ):
+        settings.IMAGE_UPLOAD_MAX_SIZE = MEGABYTE
+        error, peak = self.decode_with_peak_memory(large_image)
+        assert isinstance(error, ValidationError), (
+            'Убедитесь, что картинка больше IMAGE_UPLOAD_MAX_SIZE '
+            'отклоняется.'
+        )
+        assert peak < 64 * 1024, (
+            'Убедитесь, что размер картинки проверяется до декодирования: '
+            f'пик памяти {peak // 1024} КБ.'
+        )
+
+    @pytest.mark.parametrize('data', [
+        'data:image/png;base64,' + 'A' * 400,
+        'data:image/png;base64,bm90IGFuIGltYWdl',
+        'data:image/png;base64,абв',
+        'data:image/png,iVBORw0KGgo=',
+    ])
+    def test_invalid_image_rejected(self, data: str):
+        error, _ = self.decode_with_peak_memory(data)
+        assert isinstance(error, ValidationError), (
+            'Убедитесь, что повреждённая картинка отклоняется.'
+        )
+
+    def test_decompression_bomb_rejected(self, settings: SettingsWrapper):
+        settings.IMAGE_MAX_PIXELS = 1_000_000
+        # 4 млн пикселей, но после сжатия - несколько КБ
+        bomb = make_base64_png(2000, 2000, noise=False)
+        assert len(bomb) < 64 * 1024
+        error, _ = self.decode_with_peak_memory(bomb)
+        assert isinstance(error, ValidationError), (
+            'Убедитесь, что картинка больше IMAGE_MAX_PIXELS пикселей '
+            'отклоняется.'
+        )
+
+    def test_put_oversized_avatar(
+        self, settings: SettingsWrapper,
+        first_user_authorized_client: APIClient,
+        large_image: str
+    ):
+        settings.IMAGE_UPLOAD_MAX_SIZE = MEGABYTE
+        response = first_user_authorized_client.put(
+            URL_AVATAR, data={'avatar': large_image}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True)
+class TestImageDerivatives(BaseTest):
+
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings: SettingsWrapper, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        return tmp_path
+
+    def create_recipe(
+        self, client: APIClient, ingredients: list, tags: list
+    ) -> dict:
+        response = client.post(URL_RECIPES, data={
+            'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+            'tags': [tags[0].id],
+            'image': make_base64_png(900, 600),
+            'name': 'Рецепт с картинкой',
+            'text': 'Проверка производных.',
+            'cooking_time': 10
+        })
+        assert response.status_code == HTTPStatus.CREATED
+        return response.json()
+
+    def get_path(self, media_root, url: str):
+        return media_root / urlparse(url).path.removeprefix('/media/')
+
+    def test_recipe_image_derivatives(
+        self, second_user_authorized_client: APIClient, ingredients: list,
+        tags: list, media_root
+    ):
+        recipe = self.create_recipe(
+            second_user_authorized_client, ingredients, tags
+        )
+        image_path = self.get_path(media_root, recipe['image'])
+        assert list(image_path.parent.iterdir()) == [image_path], (
+            'Убедитесь, что производные создаются не в запросе, а в фоне.'
+        )
+        assert ImageTask.objects.filter(
+            name=recipe['image'].split('/media/')[-1],
+            status=ImageTask.Status.PENDING
+        ).exists(), (
+            'Убедитесь, что загрузка картинки ставит задачу в очередь.'
+        )
+        url = URL_GET_RECIPE.format(id=recipe['id'])
+        for data in (
+            recipe, second_user_authorized_client.get(url).json(),
+            second_user_authorized_client.get(URL_RECIPES).json()[
+                'results'
+            ][0]
+        ):
+            assert data['images'] is None, (
+                'Убедитесь, что до создания производных поле `images` '
+                'равно null.'
+            )
+
+        process_image_tasks()
+        assert not ImageTask.objects.exists(), (
+            'Убедитесь, что выполненные задачи удаляются из очереди.'
+        )
+        recipe = second_user_authorized_client.get(url).json()
+        assert recipe['images'] == second_user_authorized_client.get(
+            URL_RECIPES
+        ).json()['results'][0]['images']
+        assert set(recipe['images'] or ()) == {
+            str(width) for width in RECIPE_IMAGE_WIDTHS
+        }, (
+            'Убедитесь, что после создания производных ответ (и кэш '
+            'рецепта) содержит ссылки на них.'
+        )
+        for width, urls in recipe['images'].items():
+            assert set(urls) == set(IMAGE_DERIVATIVE_FORMATS)
+            for image_format, url in urls.items():
+                path = self.get_path(media_root, url)
+                assert path.exists(), (
+                    f'Убедитесь, что производная {url} создаётся при '
+                    'загрузке картинки рецепта.'
+                )
+                with Image.open(path) as image:
+                    assert image.format.lower() == image_format
+                    # Картинка шириной 900 не увеличивается
+                    assert image.width == min(int(width), 900)
+                    assert image.height == round(
+                        image.width * 600 / 900
+                    )
+
+    def test_failed_derivatives_not_linked(
+        self, second_user_authorized_client: APIClient, ingredients: list,
+        tags: list, monkeypatch: pytest.MonkeyPatch
+    ):
+        recipe = self.create_recipe(
+            second_user_authorized_client, ingredients, tags
+        )
+        url = URL_GET_RECIPE.format(id=recipe['id'])
+        tasks = ImageTask.objects.filter(
+            name=recipe['image'].split('/media/')[-1]
+        )
+
+        def process_image_file(model_label: str, name: str) -> int:
+            raise OSError('Хранилище недоступно')
+
+        monkeypatch.setattr(
+            process_image_tasks_command, 'process_image_file',
+            process_image_file
+        )
+        call_command(
+            'process_image_tasks', '--once', '--workers', '0',
+            '--max-attempts', '1', stdout=StringIO(), stderr=StringIO()
+        )
+        assert tasks.get().status == ImageTask.Status.FAILED
+        recipe = second_user_authorized_client.get(url).json()
+        assert recipe['image'] and recipe['images'] is None, (
+            'Убедитесь, что после исчерпания попыток обработки поле '
+            '`images` равно null: производные не созданы.'
+        )
+
+        monkeypatch.undo()
+        call_command('generate_image_derivatives', stdout=StringIO())
+        assert not tasks.exists(), (
+            'Убедитесь, что generate_image_derivatives снимает ошибки '
+            'обработанных картинок.'
+        )
+        assert set(
+            second_user_authorized_client.get(url).json()['images'] or ()
+        ) == {str(width) for width in RECIPE_IMAGE_WIDTHS}
+
+    def test_unchanged_image_not_enqueued(
+        self, second_user_authorized_client: APIClient, second_user: Model,
+        ingredients: list, tags: list
+    ):
+        recipe = self.create_recipe(
+            second_user_authorized_client, ingredients, tags
+        )
+        process_image_tasks()
+        instance = Recipe.objects.get(id=recipe['id'])
+        instance.text = 'Новое описание'
+        instance.save()
+        Recipe.objects.defer('image').get(id=recipe['id']).save()
+        second_user.set_password('NewPassword123')
+        second_user.save()
+        assert not ImageTask.objects.exists(), (
+            'Убедитесь, что сохранение записи без смены картинки не ставит '
+            'её в очередь повторно.'
+        )
+
+    def test_avatar_derivatives(
+        self, first_user_authorized_client: APIClient, media_root
+    ):
+        response = first_user_authorized_client.put(
+            URL_AVATAR, data={'avatar': make_base64_png(300, 200)}
+        )
+        assert response.status_code == HTTPStatus.OK
+        process_image_tasks()
+        user = first_user_authorized_client.get(URL_ME).json()
+        assert set(user['images']) == {
+            str(size) for size in USER_AVATAR_SIZES
+        }
+        paths = []
+        for size, urls in user['images'].items():
+            for url in urls.values():
+                path = self.get_path(media_root, url)
+                with Image.open(path) as image:
+                    assert image.size == (int(size), int(size)), (
+                        'Убедитесь, что аватары обрезаются до квадрата.'
+                    )
+                paths.append(path)
+
+        response = first_user_authorized_client.delete(URL_AVATAR)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert not any(path.exists() for path in paths), (
+            'Убедитесь, что при удалении аватара удаляются и производные.'
+        )
+        assert first_user_authorized_client.get(URL_ME).json()[
+            'images'
+        ] is None
+
+    def test_generate_image_derivatives_command(
+        self, second_user_authorized_client: APIClient, ingredients: list,
+        tags: list, media_root
+    ):
+        recipe = self.create_recipe(
+            second_user_authorized_client, ingredients, tags
+        )
+        process_image_tasks()
+        recipe = second_user_authorized_client.get(
+            URL_GET_RECIPE.format(id=recipe['id'])
+        ).json()
+        paths = [
+            self.get_path(media_root, url)
+            for urls in recipe['images'].values() for url in urls.values()
+        ]
+        for path in paths[::2]:
+            path.unlink()
+        out = StringIO()
+        call_command('generate_image_derivatives', stdout=out)
+        assert all(path.exists() for path in paths), (
+            'Убедитесь, что команда generate_image_derivatives '
+            'восстанавливает недостающие производные.'
+        )
+        assert f'создано файлов {len(paths[::2])}' in out.getvalue()
+
+    def test_corrupted_image_rejected_in_background(
+        self, first_user_authorized_client: APIClient, media_root
+    ):
+        # Заголовок PNG цел, данные обрезаны: в запросе это не видно
+        data = base64.b64decode(
+            make_base64_png(200, 200).split(',')[1]
+        )
+        image = 'data:image/png;base64,' + base64.b64encode(
+            data[:len(data) // 2]
+        ).decode()
+        response = first_user_authorized_client.put(
+            URL_AVATAR, data={'avatar': image}
+        )
+        assert response.status_code == HTTPStatus.OK
+        path = self.get_path(media_root, response.json()['avatar'])
+        assert path.exists()
+
+        assert 'Не удалось обработать картинок: 1' in process_image_tasks()
+        task = ImageTask.objects.get()
+        assert task.status == ImageTask.Status.FAILED
+        assert task.error
+        assert first_user_authorized_client.get(URL_ME).json()[
+            'avatar'
+        ] is None, (
+            'Убедитесь, что картинка, не прошедшая проверку, отвязывается '
+            'от пользователя.'
+        )
+        assert not path.exists(), (
+            'Убедитесь, что картинка, не прошедшая проверку, удаляется.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestContentAddressedImages(BaseTest):
+
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings: SettingsWrapper, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        return tmp_path
+
+    def put_avatar(self, client: APIClient, image: str) -> str:
+        response = client.put(URL_AVATAR, data={'avatar': image})
+        assert response.status_code == HTTPStatus.OK
+        return client.get(URL_ME).json()['avatar']
+
+    def test_identical_avatars_stored_once(
+        self, first_user_authorized_client: APIClient,
+        second_user_authorized_client: APIClient, media_root
+    ):
+        image = make_base64_png(100, 100)
+        first_url = self.put_avatar(first_user_authorized_client, image)
+        second_url = self.put_avatar(second_user_authorized_client, image)
+        assert re.search(r'/media/users/[0-9a-f]{32}\.png$', first_url), (
+            'Убедитесь, что имя картинки - хеш её содержимого.'
+        )
+        assert first_url == second_url, (
+            'Убедитесь, что одинаковые картинки хранятся одним файлом.'
+        )
+        originals = [
+            path for path in (media_root / 'users').iterdir()
+            if path.suffix == '.png'
+        ]
+        assert len(originals) == 1
+
+        other_url = self.put_avatar(
+            second_user_authorized_client, make_base64_png(100, 100)
+        )
+        assert other_url != first_url
+
+        response = first_user_authorized_client.delete(URL_AVATAR)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        path = media_root / urlparse(first_url).path.removeprefix('/media/')
+        assert not path.exists(), (
+            'Убедитесь, что картинка удаляется, если на неё больше никто '
+            'не ссылается.'
+        )
+
+    def test_shared_avatar_kept_on_delete(
+        self, first_user_authorized_client: APIClient,
+        second_user_authorized_client: APIClient, media_root
+    ):
+        image = make_base64_png(100, 100)
+        url = self.put_avatar(first_user_authorized_client, image)
+        self.put_avatar(second_user_authorized_client, image)
+        response = first_user_authorized_client.delete(URL_AVATAR)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        path = media_root / urlparse(url).path.removeprefix('/media/')
+        assert path.exists(), (
+            'Убедитесь, что при удалении аватара не удаляется файл, '
+            'на который ссылается другой пользователь.'
+        )
+        assert second_user_authorized_client.get(URL_ME).json()[
+            'avatar'
+        ] == url
+
+    def test_recipe_patch_with_same_image(
+        self, second_user_authorized_client: APIClient, first_recipe,
+        ingredients: list, tags: list, media_root
+    ):
+        url = URL_GET_RECIPE.format(id=first_recipe.id)
+        body = {
+            'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+            'tags': [tags[0].id],
+            'image': make_base64_png(50, 50),
+            'name': 'Рецепт',
+            'text': 'Описание.',
+            'cooking_time': 10
+        }
+        images = set()
+        for _ in range(2):
+            response = second_user_authorized_client.patch(url, data=body)
+            assert response.status_code == HTTPStatus.OK
+            images.add(response.json()['image'])
+        assert len(images) == 1, (
+            'Убедитесь, что повторная загрузка той же картинки не '
+            'меняет её адрес.'
+        )
+        stored = list((media_root / 'recipes' / 'images').glob('*.png'))
+        assert len(stored) == 1, (
+            'Убедитесь, что повторная загрузка той же картинки не '
+            'создаёт новый файл.'
+        )
@@ -1,20 +1,38 @@
 import re
+import warnings
+from http import HTTPStatus
+from io import StringIO
 
 import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.models import Model, Q
+from django.test.utils import CaptureQueriesContext
 from pytest_django.fixtures import SettingsWrapper
 from pytest_lazyfixture import lazy_fixture
 from rest_framework.response import Response
 from rest_framework.test import APIClient
 
+from api.serializers import recipe as recipe_serializers
+from api.tag_index import TAG_INDEX_VERSION_KEY, tag_index
+from core.utils import decode_base62, encode_base62
+from recipes.short_links import get_legacy_recipe_id
 from tests.base_test import BaseTest
 from tests.utils.general import NOT_EXISTING_ID
 from tests.utils.models import (
+    feed_entry_model,
+    ingredient_model,
     recipe_favorite_model,
     recipe_ingredients_model,
     recipe_model,
     recipe_tags_model,
-    shopping_cart_model
+    shopping_cart_model,
+    subscription_model,
+    tag_model
 )
 from tests.utils.recipe import (
     BODY_ONLY_POST_BAD_REQUEST,
@@ -23,20 +41,26 @@ from tests.utils.recipe import (
     IMAGE,
     RESPONSE_SCHEMA_RECIPE,
     RESPONSE_SCHEMA_RECIPES,
+    RESPONSE_SCHEMA_RECIPES_CURSOR,
     RESPONSE_SCHEMA_SHORT_LINK,
     URL_GET_FRONT_RECIPE,
     URL_GET_RECIPE,
     URL_GET_SHORT_LINK,
     URL_RECIPES,
+    URL_RECIPES_BATCH,
     URL_SHORT_LINK
 )
 from tests.utils.tag import TAG_SET_SLUGS
 
+FeedEntry = feed_entry_model()
+Ingredient = ingredient_model()
 Recipe = recipe_model()
 RecipeFavorite = recipe_favorite_model()
 RecipeIngredients = recipe_ingredients_model()
 RecipeTags = recipe_tags_model()
 ShoppingCart = shopping_cart_model()
+Subscription = subscription_model()
+Tag = tag_model()
 
 
 @pytest.mark.django_db(transaction=True)
@@ -267,6 +291,82 @@ class TestRecipe(BaseTest):
             limit=settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
         )
 
+    @pytest.mark.parametrize('tag_index_enabled', [False, True])
+    @pytest.mark.parametrize('match', [None, 'any', 'all'])
+    def test_get_recipes_filter_by_tags_match(
+        self, api_client: APIClient, settings: SettingsWrapper,
+        random_recipes: list, match: str, tag_index_enabled: bool
+    ):
+        settings.RECIPE_TAG_INDEX = tag_index_enabled
+        slug_list = TAG_SET_SLUGS['three_tags']
+        params = {'tags': slug_list, 'limit': 100}
+        if match:
+            params['match'] = match
+        response: Response = api_client.get(URL_RECIPES, params)
+        assert response.status_code == HTTPStatus.OK
+        recipes_ids = [recipe['id'] for recipe in response.json()['results']]
+        assert len(recipes_ids) == len(set(recipes_ids)), (
+            'Убедитесь, что фильтрация по тегам не дублирует рецепты.'
+        )
+        recipes_tags = {recipe.id: set() for recipe in random_recipes}
+        for recipe_id, slug in RecipeTags.objects.values_list(
+            'recipe_id', 'tag__slug'
+        ):
+            recipes_tags[recipe_id].add(slug)
+        check = all if match == 'all' else any
+        expected_ids = sorted(
+            (
+                recipe_id for recipe_id, slugs in recipes_tags.items()
+                if check(slug in slugs for slug in slug_list)
+            ),
+            reverse=True
+        )
+        assert recipes_ids == expected_ids, (
+            'Убедитесь, что `match=any` (по умолчанию) возвращает рецепты '
+            'с любым из тегов, а `match=all` - только со всеми тегами.'
+        )
+
+    def test_tag_index_follows_changes(
+        self, api_client: APIClient, settings: SettingsWrapper,
+        all_recipes: list, tags: list
+    ):
+        settings.RECIPE_TAG_INDEX = True
+        settings.RECIPE_TAG_INDEX_MAX_IDS = 100
+        tag_slug = tags[0].slug
+
+        def filter_by_tag() -> set:
+            response: Response = api_client.get(
+                URL_RECIPES, {'tags': tag_slug, 'limit': 100}
+            )
+            return {recipe['id'] for recipe in response.json()['results']}
+
+        def expected() -> set:
+            return set(RecipeTags.objects.filter(
+                tag=tags[0]
+            ).values_list('recipe_id', flat=True))
+
+        filter_by_tag()  # Индекс строится при первом запросе
+        first, second, third = all_recipes[:3]
+        first.tags.set([tags[0], tags[1]])
+        second.tags.remove(tags[0])
+        RecipeTags.objects.create(recipe=third, tag=tags[0])
+        RecipeTags.objects.filter(recipe=third, tag=tags[0]).delete()
+        all_recipes[3].delete()
+        assert tag_index.version == cache.get(TAG_INDEX_VERSION_KEY), (
+            'Убедитесь, что индекс тегов обновляется сигналами, '
+            'а не перестраивается.'
+        )
+        assert filter_by_tag() == expected(), (
+            'Убедитесь, что индекс тегов учитывает изменения тегов рецептов.'
+        )
+        out = StringIO()
+        call_command('check_tag_index', stdout=out)
+        assert 'с расхождениями: 0' in out.getvalue()
+
+        tag_index.apply([(tags[0].id, second.id, True)])
+        with pytest.raises(CommandError):
+            call_command('check_tag_index', stdout=StringIO())
+
     @pytest.mark.parametrize(
         'client', [
             lazy_fixture('api_client'),
@@ -335,6 +435,70 @@ class TestRecipe(BaseTest):
             expected_redirect_url=URL_GET_FRONT_RECIPE.format(id=recipe.id)
         )
 
+    @pytest.mark.parametrize(
+        'client', [
+            lazy_fixture('api_client'),
+            lazy_fixture('second_user_authorized_client')
+        ]
+    )
+    def test_redirect_short_link_without_queries(
+        self, client: APIClient, first_recipe: Model
+    ):
+        response, queries = self.url_captured_queries(
+            client=client,
+            url=URL_SHORT_LINK.format(uuid=first_recipe.short_link)
+        )
+        assert response.status_code == HTTPStatus.FOUND
+        assert not queries, (
+            'Убедитесь, что редирект по короткой ссылке не обращается к '
+            f'базе данных. Выполнено запросов: {len(queries)}.'
+        )
+
+    def test_redirect_legacy_short_link(
+        self, api_client: APIClient, second_recipe: Model
+    ):
+        get_legacy_recipe_id.cache_clear()
+        Recipe.objects.filter(id=second_recipe.id).update(
+            legacy_short_link='0a1b2c'
+        )
+        url = URL_SHORT_LINK.format(uuid='0a1b2c')
+        self.url_redirects_with_found_status(
+            client=api_client, url=url,
+            expected_redirect_url=URL_GET_FRONT_RECIPE.format(
+                id=second_recipe.id
+            )
+        )
+        _, queries = self.url_captured_queries(client=api_client, url=url)
+        assert not queries, (
+            'Убедитесь, что старые короткие ссылки кешируются.'
+        )
+
+    @pytest.mark.parametrize('short_link', ['00', 'a-b', 'z' * 12])
+    def test_redirect_invalid_short_link(
+        self, api_client: APIClient, short_link: str
+    ):
+        response: Response = api_client.get(
+            URL_SHORT_LINK.format(uuid=short_link)
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_redirect_non_canonical_short_link(
+        self, api_client: APIClient, first_recipe: Model
+    ):
+        response: Response = api_client.get(
+            URL_SHORT_LINK.format(uuid='0' + first_recipe.short_link)
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Убедитесь, что короткая ссылка с лишними нулями слева не '
+            'ведёт на рецепт.'
+        )
+
+    @pytest.mark.parametrize('number', [1, 61, 62, 3843, 2 ** 63 - 1])
+    def test_short_link_base62_round_trip(self, number: int):
+        short_link = encode_base62(number)
+        assert re.fullmatch(r'[a-zA-Z0-9]{2,11}', short_link)
+        assert decode_base62(short_link) == number
+
     def test_update_recipe_author(  # TODO: Возможно, вынести часть логики
         self, second_user_authorized_client: APIClient, first_recipe: Model,
         tags: list, ingredients: list
@@ -514,3 +678,722 @@ class TestRecipe(BaseTest):
         ), (
             'Убедитесь, что удалились связанные с рецептом ингредиенты.'
         )
+
+    def test_update_recipe_writes_only_changes(
+        self, second_user_authorized_client: APIClient, first_recipe: Model,
+        ingredients: list, tags: list
+    ):
+        url = URL_GET_RECIPE.format(id=first_recipe.id)
+        tables = {
+            'recipe': Recipe._meta.db_table,
+            'ingredients': RecipeIngredients._meta.db_table,
+            'tags': RecipeTags._meta.db_table,
+        }
+
+        def patch(body: dict) -> dict:
+            """PATCH рецепта и число записей в таблицы: {(таблица, DML)}."""
+
+            response, queries = self.url_captured_queries(
+                client=second_user_authorized_client, url=url,
+                method='patch', data=body
+            )
+            assert response.status_code == HTTPStatus.OK
+            writes = {}
+            for query in queries:
+                statement = query.split(maxsplit=1)[0].upper()
+                if statement not in ('INSERT', 'UPDATE', 'DELETE'):
+                    continue
+                table = re.search(
+                    r'(?:INTO|UPDATE|FROM) "?(\w+)"?', query
+                ).group(1)
+                for name, db_table in tables.items():
+                    if table == db_table:
+                        key = (name, statement)
+                        writes[key] = writes.get(key, 0) + 1
+            return writes
+
+        ingredients_ids = set(RecipeIngredients.objects.filter(
+            recipe=first_recipe
+        ).values_list('id', flat=True))
+        body = {
+            'ingredients': [
+                {'id': ingredients[0].id, 'amount': 10},
+                {'id': ingredients[1].id, 'amount': 20},
+            ],
+            'tags': [tags[0].id, tags[1].id],
+            'text': 'Новое описание',
+        }
+        assert patch(body) == {('recipe', 'UPDATE'): 1}, (
+            'Убедитесь, что при изменении только описания рецепта строки '
+            'ингредиентов и тегов не перезаписываются.'
+        )
+
+        body['ingredients'][1]['amount'] = 25
+        body['ingredients'].append({'id': ingredients[2].id, 'amount': 5})
+        body['tags'] = [tags[1].id, tags[2].id]
+        assert patch(body) == {
+            ('ingredients', 'UPDATE'): 1,
+            ('ingredients', 'INSERT'): 1,
+            ('tags', 'DELETE'): 1,
+            ('tags', 'INSERT'): 1,
+        }, (
+            'Убедитесь, что при обновлении рецепта выполняются только '
+            'нужные INSERT/UPDATE/DELETE для ингредиентов и тегов.'
+        )
+        assert ingredients_ids < set(RecipeIngredients.objects.filter(
+            recipe=first_recipe
+        ).values_list('id', flat=True)), (
+            'Убедитесь, что неизменившиеся строки ингредиентов не '
+            'пересоздаются.'
+        )
+        assert set(RecipeIngredients.objects.filter(
+            recipe=first_recipe
+        ).values_list('ingredient_id', 'amount')) == {
+            (ingredients[0].id, 10), (ingredients[1].id, 25),
+            (ingredients[2].id, 5)
+        }
+        assert set(first_recipe.tags.values_list('id', flat=True)) == {
+            tags[1].id, tags[2].id
+        }
+
+        body['ingredients'] = body['ingredients'][1:]
+        assert patch(body) == {('ingredients', 'DELETE'): 1}, (
+            'Убедитесь, что удалённый из рецепта ингредиент удаляется '
+            'одним запросом, а остальные строки не трогаются.'
+        )
+
+    def test_update_recipe_ingredients_order_and_duplicates(
+        self, second_user_authorized_client: APIClient, second_user: Model,
+        first_recipe: Model, ingredients: list, tags: list
+    ):
+        url = URL_GET_RECIPE.format(id=first_recipe.id)
+        ShoppingCart.objects.create(author=second_user, recipe=first_recipe)
+        # Повтор ингредиента из старых данных
+        RecipeIngredients.objects.create(
+            recipe=first_recipe, ingredient=ingredients[0], amount=7
+        )
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+
+        for order in (
+            (ingredients[0], ingredients[1], ingredients[2]),
+            (ingredients[2], ingredients[0]),
+        ):
+            response = second_user_authorized_client.patch(url, data={
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 10}
+                    for ingredient in order
+                ],
+                'tags': [tags[0].id],
+            })
+            assert response.status_code == HTTPStatus.OK
+            expected = [ingredient.id for ingredient in order]
+            for data in (
+                response.json(),
+                second_user_authorized_client.get(url).json()
+            ):
+                assert [
+                    ingredient['id'] for ingredient in data['ingredients']
+                ] == expected, (
+                    'Убедитесь, что ингредиенты рецепта возвращаются в '
+                    'порядке из запроса.'
+                )
+        assert RecipeIngredients.objects.filter(
+            recipe=first_recipe
+        ).count() == 2, (
+            'Убедитесь, что повторы ингредиента в рецепте удаляются при '
+            'обновлении.'
+        )
+        # Падает, если списки покупок разошлись с корзинами
+        call_command('check_shopping_lists', stdout=StringIO())
+
+    @pytest.mark.parametrize('count', [1, 2, 5])
+    def test_add_recipe_related_ids_single_query(
+        self, second_user_authorized_client: APIClient, ingredients: list,
+        tags: list, count: int
+    ):
+        body = {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in ingredients[:count]
+            ],
+            'tags': [tag.id for tag in tags[:count]],
+            'image': IMAGE,
+            'name': 'Рецепт с ингредиентами',
+            'text': 'Проверка запросов.',
+            'cooking_time': 10
+        }
+        response, queries = self.url_captured_queries(
+            client=second_user_authorized_client, url=URL_RECIPES,
+            method='post', data=body
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        for model in (Ingredient, Tag):
+            table = model._meta.db_table
+            selects = [
+                query for query in queries
+                if f'WHERE "{table}"."id"' in query
+            ]
+            assert len(selects) == 1, (
+                f'Убедитесь, что id из таблицы {table} проверяются одним '
+                f'запросом. Выполнено: {len(selects)}.'
+            )
+
+    def test_add_recipe_reports_all_missing_ids(
+        self, second_user_authorized_client: APIClient, ingredients: list,
+        tags: list
+    ):
+        missing_ids = [NOT_EXISTING_ID, NOT_EXISTING_ID + 1]
+        body = {
+            'ingredients': [{'id': ingredients[0].id, 'amount': 10}] + [
+                {'id': pk, 'amount': 10} for pk in missing_ids
+            ],
+            'tags': [tags[0].id, *missing_ids],
+            'image': IMAGE,
+            'name': 'Рецепт с ошибками',
+            'text': 'Проверка ошибок.',
+            'cooking_time': 10
+        }
+        response: Response = second_user_authorized_client.post(
+            URL_RECIPES, data=body
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        for field in ('ingredients', 'tags'):
+            errors = response.json()[field]
+            assert len(errors) == 1 and all(
+                str(pk) in errors[0] for pk in missing_ids
+            ), (
+                f'Убедитесь, что все несуществующие id в поле {field} '
+                'перечислены в одной ошибке.'
+            )
+
+    def get_batch_body(
+        self, count: int, ingredients: list, tags: list
+    ) -> dict:
+        return {'recipes': [
+            {
+                'ingredients': [
+                    {'id': ingredients[number % 2].id, 'amount': number + 1},
+                    {'id': ingredients[2].id, 'amount': 100},
+                ],
+                'tags': [tags[number % 3].id],
+                'image': IMAGE,
+                'name': f'Пакетный рецепт №{number}',
+                'text': 'Рецепт из пакетной загрузки.',
+                'cooking_time': number + 1
+            } for number in range(count)
+        ]}
+
+    def test_batch_create_recipes_unauthorized(self, api_client: APIClient):
+        self.url_requires_authorization(
+            client=api_client, url=URL_RECIPES_BATCH, data={'recipes': []}
+        )
+
+    @pytest.mark.usefixtures('third_user_subscribed_to_second')
+    def test_batch_create_recipes(
+        self, second_user_authorized_client: APIClient, second_user: Model,
+        third_user: Model, ingredients: list, tags: list
+    ):
+        body = self.get_batch_body(3, ingredients, tags)
+        body['recipes'][1]['tags'] = [NOT_EXISTING_ID]
+        body['recipes'][1].pop('ingredients')
+        response: Response = second_user_authorized_client.post(
+            URL_RECIPES_BATCH, body
+        )
+        assert response.status_code == HTTPStatus.MULTI_STATUS, (
+            'Убедитесь, что при частично корректном пакете возвращается 207.'
+        )
+        results: list = response.json()['results']
+        assert [result['index'] for result in results] == [0, 1, 2]
+        assert set(results[1]['errors']) == {'tags', 'ingredients'}, (
+            'Убедитесь, что ошибки возвращаются для каждого рецепта.'
+        )
+        for index in (0, 2):
+            data: dict = body['recipes'][index]
+            recipe = Recipe.objects.get(id=results[index]['recipe']['id'])
+            assert (recipe.name, recipe.author_id) == (
+                data['name'], second_user.id
+            )
+            assert list(recipe.tags.values_list('id', flat=True)) == (
+                data['tags']
+            )
+            assert set(recipe.recipe_ingredients.values_list(
+                'ingredient_id', 'amount'
+            )) == {
+                (ingredient['id'], ingredient['amount'])
+                for ingredient in data['ingredients']
+            }
+            assert FeedEntry.objects.filter(
+                user=third_user, recipe=recipe
+            ).exists(), 'Убедитесь, что рецепты пакета попадают в ленту.'
+        assert Recipe.objects.count() == 2
+
+    @pytest.mark.parametrize('count', [1, 2])
+    def test_batch_create_recipes_limit(
+        self, second_user_authorized_client: APIClient,
+        settings: SettingsWrapper, ingredients: list, tags: list,
+        count: int
+    ):
+        settings.RECIPES_BATCH_LIMIT = 1
+        response: Response = second_user_authorized_client.post(
+            URL_RECIPES_BATCH, self.get_batch_body(count, ingredients, tags)
+        )
+        expected_status = (
+            HTTPStatus.CREATED if count == 1 else HTTPStatus.BAD_REQUEST
+        )
+        assert response.status_code == expected_status, (
+            'Убедитесь, что размер пакета ограничен RECIPES_BATCH_LIMIT.'
+        )
+        assert Recipe.objects.count() == (count == 1)
+
+    @pytest.mark.skipif(
+        not connection.features.can_return_rows_from_bulk_insert,
+        reason='База не возвращает id из bulk_create'
+    )
+    def test_batch_create_recipes_constant_queries(
+        self, second_user_authorized_client: APIClient, ingredients: list,
+        tags: list
+    ):
+        count_queries = {}
+        for count in (1, 5):
+            # Очередь картинок кеширует ContentType после первого запроса
+            ContentType.objects.clear_cache()
+            response, queries = self.url_captured_queries(
+                client=second_user_authorized_client, url=URL_RECIPES_BATCH,
+                method='post',
+                data=self.get_batch_body(count, ingredients, tags)
+            )
+            assert response.status_code == HTTPStatus.CREATED
+            count_queries[count] = len(queries)
+        assert count_queries[1] == count_queries[5], (
+            'Убедитесь, что количество запросов к БД при пакетном создании '
+            'не зависит от количества рецептов. Ожидалось '
+            f'{count_queries[1]} запросов, выполнено {count_queries[5]}.'
+        )
+
+    @pytest.mark.parametrize('limit', [3, 6])
+    @pytest.mark.usefixtures('all_shopping_cart')
+    def test_get_recipes_flags_constant_queries(
+        self, third_user_authorized_client: APIClient, third_user: Model,
+        limit: int
+    ):
+        RecipeFavorite.objects.create(
+            author=third_user, recipe=Recipe.objects.first()
+        )
+        flag_tables = (
+            RecipeFavorite._meta.db_table, ShoppingCart._meta.db_table
+        )
+        count_flag_queries = {}
+        for page_size in (1, limit):
+            url = URL_RECIPES + '?limit=' + str(page_size)
+            response, queries = self.url_captured_queries(
+                client=third_user_authorized_client, url=url
+            )
+            count_flag_queries[page_size] = len([
+                query for query in queries
+                if any(table in query for table in flag_tables)
+            ])
+        assert count_flag_queries[1] == count_flag_queries[limit], (
+            'Убедитесь, что флаги `is_favorited` и `is_in_shopping_cart` '
+            'вычисляются одним запросом на всю страницу рецептов.'
+        )
+        favorited = set(
+            RecipeFavorite.objects.filter(
+                author=third_user
+            ).values_list('recipe_id', flat=True)
+        )
+        for recipe in response.json()['results']:
+            assert recipe['is_in_shopping_cart'] is True, (
+                'Убедитесь, что флаг `is_in_shopping_cart` вычисляется верно.'
+            )
+            assert recipe['is_favorited'] == (recipe['id'] in favorited), (
+                'Убедитесь, что флаг `is_favorited` вычисляется верно.'
+            )
+
+    @pytest.mark.parametrize(
+        'user_status, client',
+        [
+            ('anonymous', lazy_fixture('api_client')),
+            ('authorized', lazy_fixture('third_user_authorized_client'))
+        ]
+    )
+    @pytest.mark.parametrize('limit', [3, 6])
+    @pytest.mark.usefixtures('all_recipes', 'third_user_subscribed_to_second')
+    def test_get_recipes_constant_queries(
+        self, client: APIClient, user_status: str, limit: int,
+        second_user: Model
+    ):
+        count_queries = {}
+        for page_size in (1, limit):
+            url = URL_RECIPES + '?limit=' + str(page_size)
+            response, queries = self.url_captured_queries(
+                client=client, url=url
+            )
+            count_queries[page_size] = len(queries)
+        is_authorized = user_status == 'authorized'
+        for recipe in response.json()['results']:
+            author: dict = recipe['author']
+            assert author['is_subscribed'] == (
+                is_authorized and author['id'] == second_user.id
+            ), 'Убедитесь, что флаг `is_subscribed` автора вычисляется верно.'
+        assert len(response.json()['results']) == limit, (
+            'Убедитесь что работает пагинация.'
+        )
+        assert count_queries[1] == count_queries[limit], (
+            'Убедитесь, что количество запросов к БД на странице рецептов '
+            'не зависит от количества рецептов на ней. Ожидалось '
+            f'{count_queries[1]} запросов, выполнено {count_queries[limit]}.'
+        )
+
+    @pytest.mark.parametrize(
+        'ordering, expected_ordering', [
+            (None, ('-id',)),
+            ('pub_date', ('pub_date', 'id')),
+            ('-pub_date', ('-pub_date', '-id'))
+        ]
+    )
+    @pytest.mark.usefixtures('all_recipes')
+    def test_get_recipes_cursor_pagination(
+        self, api_client: APIClient, ordering: str, expected_ordering: tuple
+    ):
+        url = URL_RECIPES + '?pagination=cursor&limit=2'
+        if ordering:
+            url += '&ordering=' + ordering
+        recipes_ids = []
+        while url:
+            response: Response = api_client.get(url)
+            self.url_get_resource(
+                response=response,
+                url=url,
+                response_schema=RESPONSE_SCHEMA_RECIPES_CURSOR
+            )
+            data: dict = response.json()
+            assert len(data['results']) <= 2, (
+                'Убедитесь что работает пагинация.'
+            )
+            recipes_ids.extend(recipe['id'] for recipe in data['results'])
+            url = data['next']
+        expected_ids = list(
+            Recipe.objects.order_by(
+                *expected_ordering
+            ).values_list('id', flat=True)
+        )
+        assert recipes_ids == expected_ids, (
+            'Убедитесь, что курсорная пагинация отдаёт все рецепты без '
+            'повторов и в заданном порядке.'
+        )
+
+    def test_get_recipe_uses_fragment_cache(
+        self, api_client: APIClient, first_recipe: Model
+    ):
+        url = URL_GET_RECIPE.format(id=first_recipe.id)
+        old_name: str = api_client.get(url).json()['name']
+        # update() не отправляет сигналы - версия рецепта не меняется
+        Recipe.objects.filter(id=first_recipe.id).update(name='Новое имя')
+        assert api_client.get(url).json()['name'] == old_name, (
+            'Убедитесь, что общая часть рецепта берётся из кэша.'
+        )
+        Recipe.objects.get(id=first_recipe.id).save()
+        assert api_client.get(url).json()['name'] == 'Новое имя', (
+            'Убедитесь, что кэш рецепта сбрасывается при его изменении.'
+        )
+
+    def test_get_recipe_sparse_fields_cache_key(
+        self, api_client: APIClient, first_recipe: Model
+    ):
+        url = URL_GET_RECIPE.format(id=first_recipe.id)
+        old_name = api_client.get(url, {'fields': 'id,name'}).json()['name']
+        # update() не отправляет сигналы - версия рецепта не меняется
+        Recipe.objects.filter(id=first_recipe.id).update(name='Новое имя')
+        response = api_client.get(url, {'fields': ' name , id,name,unknown'})
+        assert response.json() == {'id': first_recipe.id, 'name': old_name}, (
+            'Убедитесь, что ключ фрагмента строится по выбранным полям, '
+            'а не по строке запроса.'
+        )
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            response = api_client.get(
+                url, {'fields': 'name,' + 'x \x01' * 300, 'omit': 'a ' * 300}
+            )
+        assert response.status_code == HTTPStatus.OK, (
+            'Убедитесь, что ключ кэша не зависит от длины и символов '
+            'query-параметров ?fields= и ?omit=.'
+        )
+
+    def test_get_recipe_edit_between_reads_not_cached(
+        self, api_client: APIClient, first_recipe: Model,
+        monkeypatch: pytest.MonkeyPatch
+    ):
+        url = URL_GET_RECIPE.format(id=first_recipe.id)
+        original_get_fragment_keys = recipe_serializers.get_fragment_keys
+
+        def edit_then_get_fragment_keys(*args, **kwargs):
+            # Правка фиксируется после чтения рецепта, до чтения версий
+            recipe = Recipe.objects.get(id=first_recipe.id)
+            recipe.name = 'Новое имя'
+            recipe.save()
+            monkeypatch.undo()
+            return original_get_fragment_keys(*args, **kwargs)
+
+        monkeypatch.setattr(
+            recipe_serializers, 'get_fragment_keys',
+            edit_then_get_fragment_keys
+        )
+        assert api_client.get(url).json()['name'] == 'Новое имя'
+        assert api_client.get(url).json()['name'] == 'Новое имя', (
+            'Убедитесь, что данные, прочитанные до версий рецепта, не '
+            'попадают в кэш под новой версией.'
+        )
+
+    @pytest.mark.usefixtures('third_user_subscribed_to_second')
+    def test_get_recipe_cached_personal_fields(
+        self, api_client: APIClient,
+        third_user_authorized_client: APIClient, third_user: Model,
+        first_recipe: Model
+    ):
+        RecipeFavorite.objects.create(author=third_user, recipe=first_recipe)
+        url = URL_GET_RECIPE.format(id=first_recipe.id)
+        for client, expected in (
+            (api_client, False),
+            (third_user_authorized_client, True),
+            (api_client, False)
+        ):
+            response: Response = client.get(url)
+            self.url_get_resource(
+                response=response,
+                url=url,
+                response_schema=RESPONSE_SCHEMA_RECIPE
+            )
+            data: dict = response.json()
+            assert (
+                data['is_favorited'] == expected
+                and data['author']['is_subscribed'] == expected
+                and data['is_in_shopping_cart'] is False
+            ), (
+                'Убедитесь, что персональные поля рецепта не кэшируются и '
+                'вычисляются для текущего пользователя.'
+            )
+
+    @pytest.mark.parametrize('url', [URL_RECIPES, URL_GET_RECIPE])
+    def test_get_recipes_conditional(
+        self, third_user_authorized_client: APIClient, third_user: Model,
+        first_recipe: Model, url: str
+    ):
+        url = url.format(id=first_recipe.id)
+        response: Response = third_user_authorized_client.get(url)
+        etag = response.headers.get('ETag')
+        assert response.status_code == HTTPStatus.OK and etag, (
+            f'Убедитесь, что ответ на запрос к `{url}` содержит ETag.'
+        )
+
+        response = third_user_authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        )
+        assert (
+            response.status_code == HTTPStatus.NOT_MODIFIED
+            and not response.content
+        ), (
+            f'Убедитесь, что запрос к `{url}` с актуальным If-None-Match '
+            'возвращает статус-код 304 без тела.'
+        )
+
+        RecipeFavorite.objects.create(author=third_user, recipe=first_recipe)
+        response = third_user_authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        )
+        assert (
+            response.status_code == HTTPStatus.OK
+            and response.headers.get('ETag') != etag
+        ), (
+            'Убедитесь, что ETag меняется вместе с персональными флагами '
+            'пользователя.'
+        )
+
+        etag = response.headers.get('ETag')
+        recipe = Recipe.objects.get(id=first_recipe.id)
+        recipe.name = 'Новое имя'
+        recipe.save()
+        response = third_user_authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        )
+        assert (
+            response.status_code == HTTPStatus.OK
+            and response.headers.get('ETag') != etag
+        ), 'Убедитесь, что ETag меняется при изменении рецепта.'
+
+    def test_get_recipe_loads_related_rows_on_miss_only(
+        self, third_user_authorized_client: APIClient, first_recipe: Model
+    ):
+        url = URL_GET_RECIPE.format(id=first_recipe.id)
+        tables = (RecipeTags._meta.db_table, RecipeIngredients._meta.db_table)
+
+        def get_queries(**headers) -> tuple[Response, dict[str, int]]:
+            """GET рецепта и число запросов: {таблица: запросов}."""
+
+            with CaptureQueriesContext(connection) as context:
+                response = third_user_authorized_client.get(url, **headers)
+            return response, {
+                table: sum(
+                    f'"{table}"' in query['sql']
+                    for query in context.captured_queries
+                ) for table in tables
+            }
+
+        cache.clear()
+        response, counts = get_queries()
+        assert counts == dict.fromkeys(tables, 1), (
+            'Убедитесь, что при промахе кэша теги и ингредиенты рецепта '
+            f'читаются по одному разу. Запросов: {counts}.'
+        )
+        for headers in ({}, {'HTTP_IF_NONE_MATCH': response['ETag']}):
+            _, counts = get_queries(**headers)
+            assert counts == dict.fromkeys(tables, 0), (
+                'Убедитесь, что рецепт из кэша и ответ 304 не загружают '
+                f'теги и ингредиенты. Запросов: {counts}.'
+            )
+
+    @pytest.mark.parametrize(
+        'params, expected_fields, expected_author_fields', [
+            (
+                'fields=id,name,author.first_name',
+                {'id', 'name', 'author'},
+                {'first_name'}
+            ),
+            (
+                'omit=ingredients,tags,text,author.is_subscribed',
+                {
+                    'id', 'name', 'image', 'images', 'cooking_time',
+                    'author', 'is_favorited', 'is_in_shopping_cart'
+                },
+                {
+                    'id', 'email', 'username', 'first_name', 'last_name',
+                    'avatar', 'images'
+                }
+            )
+        ]
+    )
+    @pytest.mark.usefixtures('all_recipes', 'third_user_subscribed_to_second')
+    def test_get_recipes_sparse_fields(
+        self, third_user_authorized_client: APIClient, params: str,
+        expected_fields: set, expected_author_fields: set
+    ):
+        url = URL_RECIPES + '?' + params
+        response, queries = self.url_captured_queries(
+            client=third_user_authorized_client, url=url
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Убедитесь, что запрос к `{url}` возвращает статус-код 200.'
+        )
+        for recipe in response.json()['results']:
+            assert set(recipe) == expected_fields, (
+                'Убедитесь, что в ответе есть только выбранные поля рецепта.'
+            )
+            assert set(recipe['author']) == expected_author_fields, (
+                'Убедитесь, что в ответе есть только выбранные поля автора.'
+            )
+        skipped_tables = (
+            RecipeIngredients._meta.db_table,
+            RecipeTags._meta.db_table,
+            Subscription._meta.db_table
+        )
+        assert not [
+            query for query in queries
+            if any(table in query for table in skipped_tables)
+        ], (
+            'Убедитесь, что данные невыбранных полей не запрашиваются из БД.'
+        )
+
+    @pytest.mark.parametrize(
+        'client',
+        [
+            lazy_fixture('api_client'),
+            lazy_fixture('third_user_authorized_client')
+        ]
+    )
+    @pytest.mark.parametrize(
+        'params', [
+            'limit=100',
+            'limit=4&page=2',
+            'limit=5&pagination=cursor',
+            'limit=100&omit=text,author.is_subscribed',
+            'limit=100&fields=id,tags.slug,ingredients.amount,author.avatar'
+        ]
+    )
+    @pytest.mark.usefixtures('random_recipes')
+    def test_get_recipes_values_serializer_parity(
+        self, client: APIClient, settings: SettingsWrapper, params: str
+    ):
+        url = URL_RECIPES + '?' + params
+        content = {}
+        for values_serializer in (False, True):
+            cache.clear()
+            settings.RECIPE_LIST_VALUES_SERIALIZER = values_serializer
+            response: Response = client.get(url)
+            assert response.status_code == HTTPStatus.OK, (
+                f'Убедитесь, что запрос к `{url}` возвращает статус-код 200.'
+            )
+            content[values_serializer] = response.content
+        assert content[True] == content[False], (
+            'Убедитесь, что быстрый путь сериализации списка рецептов '
+            'возвращает тот же ответ, что и RecipeGetSerializer.'
+        )
+        # Фрагменты в кэше общие для обоих путей
+        settings.RECIPE_LIST_VALUES_SERIALIZER = False
+        assert client.get(url).content == content[True], (
+            'Убедитесь, что фрагменты быстрого пути совместимы с '
+            'RecipeGetSerializer.'
+        )
+
+    @pytest.mark.parametrize(
+        'search, expected_recipes', [
+            ('жарен', ['fifth_recipe', 'fourth_recipe']),
+            ('НЕЧТО жарен', ['fourth_recipe']),
+            # Совпадение в названии весит больше, чем в описании
+            ('съе', ['first_recipe', 'third_recipe']),
+            ('"съе" OR NOT*', []),
+            ('!?', [
+                'another_author_recipe', 'fifth_recipe', 'fourth_recipe',
+                'third_recipe', 'second_recipe', 'first_recipe'
+            ])
+        ]
+    )
+    def test_get_recipes_search(
+        self, request, api_client: APIClient, all_recipes: list,
+        search: str, expected_recipes: list
+    ):
+        url = URL_RECIPES
+        response: Response = api_client.get(url, {'search': search})
+        self.url_get_resource(
+            response=response,
+            url=url,
+            response_schema=RESPONSE_SCHEMA_RECIPES
+        )
+        expected_ids = [
+            request.getfixturevalue(name).id for name in expected_recipes
+        ]
+        assert [
+            recipe['id'] for recipe in response.json()['results']
+        ] == expected_ids, (
+            'Убедитесь, что поиск `search` находит рецепты по всем словам '
+            'запроса в названии и описании и сортирует их по релевантности.'
+        )
+
+    def test_get_recipes_search_index_sync(
+        self, api_client: APIClient, first_recipe: Model
+    ):
+        def search(query: str) -> list:
+            response: Response = api_client.get(
+                URL_RECIPES, {'search': query}
+            )
+            return [recipe['id'] for recipe in response.json()['results']]
+
+        recipe = Recipe.objects.get(id=first_recipe.id)
+        recipe.name = 'Пирог с вишней'
+        recipe.save()
+        assert search('вишней') == [recipe.id] and not search('съедобное'), (
+            'Убедитесь, что поисковый индекс обновляется при изменении '
+            'рецепта.'
+        )
+        recipe.delete()
+        assert not search('вишней'), (
+            'Убедитесь, что удалённый рецепт пропадает из поиска.'
+        )
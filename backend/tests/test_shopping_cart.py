@@ -1,25 +1,44 @@
+import csv
+import json
+import tracemalloc
 from http import HTTPStatus
+from io import StringIO
 
 import pytest
-from django.db.models import Model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F, Model, Sum
+from django.test.utils import CaptureQueriesContext
 from rest_framework.response import Response
 from rest_framework.test import APIClient
 
+from recipes.shopping_list import rebuild_shopping_lists
 from tests.base_test import BaseTest
 from tests.utils.general import (
     NOT_EXISTING_ID,
     URL_NOT_FOUND_ERROR,
     URL_OK_ERROR
 )
-from tests.utils.models import shopping_cart_model
-from tests.utils.recipe import RESPONSE_SCHEMA_SHORT_RECIPE
+from tests.utils.models import (
+    ingredient_model,
+    recipe_ingredients_model,
+    recipe_model,
+    shopping_cart_model,
+    shopping_list_item_model
+)
+from tests.utils.recipe import RESPONSE_SCHEMA_SHORT_RECIPE, URL_GET_RECIPE
 from tests.utils.shopping_cart import (
     ALLOWED_CONTENT_TYPES,
     URL_DOWNLOAD_SHOPPING_CART,
     URL_SHOPPING_CART
 )
 
+Ingredient = ingredient_model()
+Recipe = recipe_model()
+RecipeIngredients = recipe_ingredients_model()
 ShoppingCart = shopping_cart_model()
+ShoppingListItem = shopping_list_item_model()
 
 
 @pytest.mark.django_db(transaction=True)
@@ -92,6 +111,226 @@ class TestShoppingCart(BaseTest):
             f'типов: {ALLOWED_CONTENT_TYPES}.'
         )
 
+    def get_expected_rows(self, user: Model) -> list[list]:
+        """Суммы без перевода единиц: в фикстурах они меньше порогов."""
+
+        return [
+            [item['ingredient__name'], item['ingredient__measurement_unit'],
+             item['total']]
+            for item in RecipeIngredients.objects.filter(
+                recipe__shopping_cart__author=user
+            ).values(
+                'ingredient__name', 'ingredient__measurement_unit'
+            ).annotate(total=Sum('amount')).order_by('ingredient__name')
+        ]
+
+    def download_with_stats(
+        self, client: APIClient
+    ) -> tuple[list[list[str]], int, int]:
+        """Скачивает список покупок: (строки CSV, запросов, пик памяти)."""
+
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(URL_DOWNLOAD_SHOPPING_CART)
+                content = response.getvalue()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert response.status_code == HTTPStatus.OK
+        rows = list(csv.reader(content.decode('cp1251').splitlines()))
+        return rows, len(context.captured_queries), peak
+
+    def test_download_shopping_cart_ignores_other_carts(
+        self, django_user_model: Model,
+        third_user_authorized_client: APIClient, all_shopping_cart: list,
+        all_recipes: list
+    ):
+        # Первый запрос прогревает кеши Django и DRF
+        self.download_with_stats(third_user_authorized_client)
+        rows, queries, peak = self.download_with_stats(
+            third_user_authorized_client
+        )
+        assert rows[1:] == [
+            [str(value) for value in row]
+            for row in self.get_expected_rows(all_shopping_cart[0].author)
+        ], 'Проверьте содержимое списка покупок.'
+
+        django_user_model.objects.bulk_create(
+            django_user_model(
+                username=f'buyer{number}', email=f'buyer{number}@mail.ru'
+            ) for number in range(300)
+        )
+        users = django_user_model.objects.filter(
+            username__startswith='buyer'
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(author=user, recipe=recipe)
+            for user in users for recipe in all_recipes
+        )
+        rebuild_shopping_lists()
+        other_rows, other_queries, other_peak = self.download_with_stats(
+            third_user_authorized_client
+        )
+        assert other_rows == rows
+        assert other_queries == queries, (
+            'Убедитесь, что количество запросов при скачивании списка '
+            'покупок не зависит от корзин других пользователей. '
+            f'Было {queries}, стало {other_queries}.'
+        )
+        assert other_peak < peak + 64 * 1024, (
+            'Убедитесь, что память при скачивании списка покупок не '
+            'зависит от корзин других пользователей: пик '
+            f'{peak // 1024} КБ, с чужими корзинами {other_peak // 1024} КБ.'
+        )
+
+    @pytest.mark.parametrize('download_format, content_type', [
+        ('csv', 'text/csv; charset=cp1251'),
+        ('csv-utf8', 'text/csv; charset=utf-8'),
+        ('txt', 'text/plain; charset=utf-8'),
+        ('json', 'application/json; charset=utf-8'),
+        ('pdf', 'application/pdf'),
+    ])
+    def test_download_shopping_cart_formats(
+        self, third_user: Model, third_user_authorized_client: APIClient,
+        all_shopping_cart: list, download_format: str, content_type: str
+    ):
+        response = third_user_authorized_client.get(
+            URL_DOWNLOAD_SHOPPING_CART, {'format': download_format}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'] == content_type, (
+            f'Проверьте тип файла списка покупок в формате {download_format}.'
+        )
+        assert response['Content-Disposition'].endswith(
+            f'.{download_format.split("-")[0]}"'
+        )
+        content = response.getvalue()
+        expected = self.get_expected_rows(third_user)
+        assert expected
+        if download_format == 'pdf':
+            assert content.startswith(b'%PDF-')
+            assert content.rstrip().endswith(b'%%EOF')
+        elif download_format == 'json':
+            assert [
+                [item['name'], item['measurement_unit'],
+                 item['total_amount']]
+                for item in json.loads(content)
+            ] == expected
+        else:
+            text = content.decode(content_type.split('charset=')[1])
+            if download_format == 'txt':
+                for name, measurement_unit, amount in expected:
+                    assert f'{name} ({measurement_unit}) — {amount}' in text
+            else:
+                assert list(csv.reader(text.splitlines()))[1:] == [
+                    [str(value) for value in row] for row in expected
+                ]
+
+    @pytest.mark.parametrize('accept, content_type', [
+        ('application/json', 'application/json; charset=utf-8'),
+        ('text/plain', 'text/plain; charset=utf-8'),
+        ('application/pdf', 'application/pdf'),
+        ('*/*', 'text/csv; charset=cp1251'),
+    ])
+    def test_download_shopping_cart_accept(
+        self, third_user_authorized_client: APIClient,
+        all_shopping_cart: list, accept: str, content_type: str
+    ):
+        response = third_user_authorized_client.get(
+            URL_DOWNLOAD_SHOPPING_CART, HTTP_ACCEPT=accept
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'] == content_type, (
+            'Проверьте, что формат списка покупок выбирается по заголовку '
+            'Accept.'
+        )
+
+    def test_download_shopping_cart_empty_json(
+        self, third_user_authorized_client: APIClient
+    ):
+        response = third_user_authorized_client.get(
+            URL_DOWNLOAD_SHOPPING_CART, {'format': 'json'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert json.loads(response.getvalue()) == []
+
+    def test_download_shopping_cart_not_acceptable(
+        self, third_user_authorized_client: APIClient
+    ):
+        response = third_user_authorized_client.get(
+            URL_DOWNLOAD_SHOPPING_CART, HTTP_ACCEPT='image/png'
+        )
+        assert response.status_code == HTTPStatus.NOT_ACCEPTABLE
+
+    def test_download_shopping_cart_converts_units(
+        self, second_user: Model, third_user: Model,
+        third_user_authorized_client: APIClient
+    ):
+        recipes_count = 2000
+        # Единица, количество в рецепте, итог в списке покупок
+        units = {
+            'мука': ('г', 1, ['кг', 2]),
+            'сахар': ('г', 7, ['кг', 14]),
+            'соль': ('ч. л.', 3, ['ст. л.', 2000]),
+            'молоко': ('мл', 1, ['л', 2]),
+            'яйца': ('шт.', 1, ['шт.', 2000]),
+        }
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=unit)
+            for name, (unit, _, _) in units.items()
+        )
+        ingredients = Ingredient.objects.filter(name__in=units)
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=second_user, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10
+            ) for number in range(recipes_count)
+        )
+        recipes = list(Recipe.objects.filter(name__startswith='Рецепт '))
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe=recipe, ingredient=ingredient,
+                amount=units[ingredient.name][1]
+            )
+            for recipe in recipes for ingredient in ingredients
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(author=third_user, recipe=recipe)
+            for recipe in recipes
+        )
+        rebuild_shopping_lists([third_user.id])
+        assert RecipeIngredients.objects.count() == 10_000
+
+        with CaptureQueriesContext(connection) as context:
+            response = third_user_authorized_client.get(
+                URL_DOWNLOAD_SHOPPING_CART, {'format': 'json'}
+            )
+            content = response.getvalue()
+        assert response.status_code == HTTPStatus.OK
+        assert {
+            item['name']: [item['measurement_unit'], item['total_amount']]
+            for item in json.loads(content)
+        } == {name: total for name, (_, _, total) in units.items()}, (
+            'Убедитесь, что количество в списке покупок выводится в самых '
+            'крупных подходящих единицах.'
+        )
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if ShoppingListItem._meta.db_table in query['sql']
+        ]
+        assert len(queries) == 1, (
+            'Убедитесь, что список покупок с переводом единиц '
+            f'читается одним запросом. Выполнено: {len(queries)}.'
+        )
+        assert not any(
+            RecipeIngredients._meta.db_table in query['sql']
+            for query in context.captured_queries
+        ), (
+            'Убедитесь, что при скачивании список покупок читается готовым, '
+            'без суммирования ингредиентов корзины.'
+        )
+
     def test_delete_shopping_cart_unauthorized(
         self, api_client: APIClient, all_shopping_cart: list
     ):
@@ -131,3 +370,106 @@ class TestShoppingCart(BaseTest):
             model=ShoppingCart,
             item_id=cart.id
         )
+
+    def test_shopping_cart_updates_recipe_counter(
+        self, third_user_authorized_client: APIClient, first_recipe: Model
+    ):
+        url = URL_SHOPPING_CART.format(id=first_recipe.id)
+        third_user_authorized_client.post(url)
+        recipe = Recipe.objects.get(id=first_recipe.id)
+        assert recipe.shopping_cart_count == 1, (
+            'Убедитесь, что при добавлении в корзину увеличивается '
+            'счётчик `shopping_cart_count` рецепта.'
+        )
+        third_user_authorized_client.delete(url)
+        recipe.refresh_from_db()
+        assert recipe.shopping_cart_count == 0, (
+            'Убедитесь, что при удалении из корзины уменьшается '
+            'счётчик `shopping_cart_count` рецепта.'
+        )
+
+    def get_totals(self, user: Model) -> tuple[dict, dict]:
+        """Готовый список пользователя и суммы по его корзине."""
+
+        stored = dict(ShoppingListItem.objects.filter(user=user).values_list(
+            'ingredient_id', 'total_amount'
+        ))
+        live = dict(RecipeIngredients.objects.filter(
+            recipe__shopping_cart__author=user
+        ).values_list('ingredient_id').annotate(
+            total=Sum('amount')
+        ).order_by())
+        return stored, live
+
+    def test_shopping_list_follows_cart_and_recipes(
+        self, second_user_authorized_client: APIClient,
+        third_user_authorized_client: APIClient, third_user: Model,
+        first_recipe: Model, second_recipe: Model, ingredients: list,
+        tags: list
+    ):
+        for recipe in (first_recipe, second_recipe):
+            third_user_authorized_client.post(
+                URL_SHOPPING_CART.format(id=recipe.id)
+            )
+        stored, live = self.get_totals(third_user)
+        assert stored and stored == live, (
+            'Убедитесь, что при добавлении рецепта в корзину его '
+            'ингредиенты прибавляются к списку покупок.'
+        )
+
+        response = second_user_authorized_client.patch(
+            URL_GET_RECIPE.format(id=first_recipe.id),
+            {
+                'ingredients': [
+                    {'id': ingredients[1].id, 'amount': 25},
+                    {'id': ingredients[2].id, 'amount': 5},
+                ],
+                'tags': [tags[0].id],
+            }
+        )
+        assert response.status_code == HTTPStatus.OK
+        stored, live = self.get_totals(third_user)
+        assert stored == live, (
+            'Убедитесь, что изменение ингредиентов рецепта в корзине '
+            'применяется к списку покупок.'
+        )
+
+        third_user_authorized_client.delete(
+            URL_SHOPPING_CART.format(id=first_recipe.id)
+        )
+        stored, live = self.get_totals(third_user)
+        assert stored == live, (
+            'Убедитесь, что при удалении рецепта из корзины его '
+            'ингредиенты вычитаются из списка покупок.'
+        )
+
+        second_user_authorized_client.delete(
+            URL_GET_RECIPE.format(id=second_recipe.id)
+        )
+        assert self.get_totals(third_user) == ({}, {}), (
+            'Убедитесь, что удалённый рецепт пропадает из списков покупок.'
+        )
+
+    def test_check_and_rebuild_shopping_lists(
+        self, third_user: Model, all_shopping_cart: list
+    ):
+        call_command('check_shopping_lists', stdout=StringIO())
+
+        items = ShoppingListItem.objects.filter(user=third_user)
+        items.filter(id=items[0].id).update(total_amount=F('total_amount') + 1)
+        items.filter(id=items[1].id).delete()
+        with pytest.raises(CommandError):
+            call_command('check_shopping_lists', stdout=StringIO())
+
+        out = StringIO()
+        call_command('check_shopping_lists', '--rebuild', stdout=out)
+        assert 'Строк с расхождениями: 2, пользователей: 1' in out.getvalue()
+        call_command('check_shopping_lists', stdout=StringIO())
+
+        ShoppingListItem.objects.all().delete()
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        stored, live = self.get_totals(third_user)
+        assert stored and stored == live, (
+            'Убедитесь, что rebuild_shopping_lists пересобирает списки '
+            'покупок по корзинам.'
+        )
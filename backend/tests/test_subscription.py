@@ -1,9 +1,14 @@
+from http import HTTPStatus
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
 from django.db.models import Model
 from pytest_lazyfixture import lazy_fixture
 from rest_framework.response import Response
 from rest_framework.test import APIClient
 
+from recipes.models import ImageTask
 from recipes.models.recipe import Recipe
 from tests.base_test import BaseTest
 from tests.utils.general import NOT_EXISTING_ID
@@ -154,6 +159,57 @@ class TestSubscription(BaseTest):
             limit=recipes_limit
         )
 
+    @pytest.mark.usefixtures('third_user_subscribed_to_second', 'all_recipes')
+    def test_get_subscription_list_sparse_fields(
+        self, third_user_authorized_client: APIClient
+    ):
+        url = URL_GET_SUBSCRIPTIONS + '?fields=id,username'
+        response: Response = third_user_authorized_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Убедитесь, что запрос к `{url}` возвращает статус-код 200.'
+        )
+        for author in response.json()['results']:
+            assert set(author) == {'id', 'username'}, (
+                'Убедитесь, что в ответе есть только выбранные поля.'
+            )
+
+    @pytest.mark.parametrize('limit', [1, 2])
+    @pytest.mark.usefixtures('third_user_subscriptions', 'all_recipes')
+    def test_get_subscriptions_recipes_single_query(
+        self, third_user_authorized_client: APIClient, limit: int
+    ):
+        call_command(
+            'process_image_tasks', '--once', '--workers', '0',
+            stdout=StringIO(), stderr=StringIO()
+        )
+        url = URL_GET_SUBSCRIPTIONS + f'?limit={limit}&recipes_limit=2'
+        response, queries = self.url_captured_queries(
+            client=third_user_authorized_client, url=url
+        )
+        recipes_queries = [
+            query for query in queries
+            if query.startswith(f'SELECT "{Recipe._meta.db_table}"."id"')
+        ]
+        image_tasks_queries = [
+            query for query in queries
+            if ImageTask._meta.db_table in query
+        ]
+        assert len(recipes_queries) == len(image_tasks_queries) == 1, (
+            'Убедитесь, что рецепты авторов страницы подписок и готовность '
+            'их картинок проверяются одним запросом каждое.'
+        )
+        for author in response.json()['results']:
+            assert author['recipes']
+            for recipe in author['recipes']:
+                assert all(
+                    url.startswith('http://')
+                    for urls in recipe['images'].values()
+                    for url in urls.values()
+                ), (
+                    'Убедитесь, что ссылки на производные картинок рецептов '
+                    'в подписках абсолютные.'
+                )
+
     def test_delete_subscription_unauthorized(
         self, api_client: APIClient, first_user: Model
     ):
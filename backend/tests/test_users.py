@@ -15,6 +15,7 @@ from tests.utils.general import (
     RESPONSE_EXPECTED_STRUCTURE,
     URL_OK_ERROR
 )
+from tests.utils.models import subscription_model
 from tests.utils.user import (
     AVATAR,
     FIRST_VALID_USER,
@@ -30,6 +31,7 @@ from tests.utils.user import (
     URL_SET_PASSWORD
 )
 
+Subscription = subscription_model()
 User = get_user_model()
 
 
@@ -118,6 +120,57 @@ class TestUsers(BaseTest):
         )
         self.url_pagination_results(data=response.json(), limit=limit)
 
+    @pytest.mark.usefixtures('third_user_subscriptions')
+    def test_get_users_subscriptions_constant_queries(
+        self, third_user_authorized_client: APIClient, third_user: Model
+    ):
+        subscription_table = Subscription._meta.db_table
+        count_queries = {}
+        for limit in (1, 3):
+            url = URL_CREATE_USER + '?limit=' + str(limit)
+            response, queries = self.url_captured_queries(
+                client=third_user_authorized_client, url=url
+            )
+            count_queries[limit] = len([
+                query for query in queries if subscription_table in query
+            ])
+        assert count_queries[1] == count_queries[3] == 1, (
+            'Убедитесь, что подписки на пользователей страницы проверяются '
+            'одним запросом.'
+        )
+        subscribed = set(
+            Subscription.objects.filter(
+                user=third_user
+            ).values_list('author_recipe_id', flat=True)
+        )
+        for user in response.json()['results']:
+            assert user['is_subscribed'] == (user['id'] in subscribed), (
+                'Убедитесь, что флаг `is_subscribed` вычисляется верно.'
+            )
+
+    @pytest.mark.usefixtures('third_user_subscriptions')
+    def test_get_users_sparse_fields(
+        self, third_user_authorized_client: APIClient
+    ):
+        url = URL_CREATE_USER + '?omit=is_subscribed,avatar,images'
+        response, queries = self.url_captured_queries(
+            client=third_user_authorized_client, url=url
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Убедитесь, что запрос к `{url}` возвращает статус-код 200.'
+        )
+        for user in response.json()['results']:
+            assert set(user) == {
+                'id', 'email', 'username', 'first_name', 'last_name'
+            }, 'Убедитесь, что исключённые поля отсутствуют в ответе.'
+        assert not [
+            query for query in queries
+            if Subscription._meta.db_table in query
+        ], (
+            'Убедитесь, что подписки не запрашиваются, если поле '
+            '`is_subscribed` исключено.'
+        )
+
     def test_get_users_me(
         self, first_user_authorized_client: APIClient, first_user: Model
     ):
@@ -0,0 +1,42 @@
+import base64
+import os
+from io import BytesIO
+
+from PIL import Image
+
+MEGABYTE = 1024 * 1024
+
+# Схема поля images: {размер: {формат: ссылка}}
+RESPONSE_SCHEMA_IMAGES = {
+    'type': ['object', 'null'],
+    'additionalProperties': {
+        'type': 'object',
+        'properties': {
+            'webp': {'type': 'string'},
+            'jpeg': {'type': 'string'}
+        },
+        'required': ['webp', 'jpeg'],
+        'additionalProperties': False
+    }
+}
+
+
+def make_base64_png(width: int, height: int, noise: bool = True) -> str:
+    """
+    PNG в формате data URI.
+
+    Шум почти не сжимается: размер файла близок к width * height * 3.
+    Картинка без шума, наоборот, сжимается в сотни раз.
+    """
+
+    if noise:
+        image = Image.frombytes(
+            'RGB', (width, height), os.urandom(width * height * 3)
+        )
+    else:
+        image = Image.new('L', (width, height))
+    buffer = BytesIO()
+    image.save(buffer, format='PNG', compress_level=1)
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
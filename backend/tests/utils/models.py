@@ -1,6 +1,11 @@
 from django.db.models import Model
 
 
+def feed_entry_model() -> Model:
+    from recipes.models import FeedEntry
+    return FeedEntry
+
+
 def ingredient_model() -> Model:
     from recipes.models import Ingredient
     return Ingredient
@@ -31,6 +36,11 @@ def shopping_cart_model() -> Model:
     return ShoppingCart
 
 
+def shopping_list_item_model() -> Model:
+    from recipes.models import ShoppingListItem
+    return ShoppingListItem
+
+
 def subscription_model() -> Model:
     from users.models import Subscription
     return Subscription
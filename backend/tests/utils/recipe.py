@@ -1,3 +1,4 @@
+from tests.utils.image import RESPONSE_SCHEMA_IMAGES
 from tests.utils.tag import RESPONSE_SCHEMA_TAG
 from tests.utils.user import RESPONSE_SCHEMA_USER
 
@@ -10,6 +11,8 @@ IMAGE = (
 
 # Адреса страниц
 URL_RECIPES = '/api/recipes/'
+URL_FEED = '/api/recipes/feed/'
+URL_RECIPES_BATCH = '/api/recipes/batch/'
 URL_GET_RECIPE = '/api/recipes/{id}/'
 URL_GET_FRONT_RECIPE = '/recipes/{id}/'
 URL_GET_SHORT_LINK = '/api/recipes/{id}/get-link/'
@@ -201,9 +204,10 @@ RESPONSE_SCHEMA_SHORT_RECIPE = {
         'id': {'type': 'number'},
         'name': {'type': 'string'},
         'image': {'type': 'string'},
+        'images': RESPONSE_SCHEMA_IMAGES,
         'cooking_time': {'type': 'number'}
     },
-    'required': ['id', 'name', 'image', 'cooking_time'],
+    'required': ['id', 'name', 'image', 'images', 'cooking_time'],
     'additionalProperties': False
 }
 
@@ -243,12 +247,14 @@ RESPONSE_SCHEMA_RECIPE = {
         'is_in_shopping_cart': {'type': 'boolean'},
         'name': {'type': 'string'},
         'image': {'type': 'string'},
+        'images': RESPONSE_SCHEMA_IMAGES,
         'text': {'type': 'string'},
         'cooking_time': {'type': 'number'}
     },
     'required': [
         'id', 'tags', 'author', 'ingredients', 'is_favorited',
-        'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+        'is_in_shopping_cart', 'name', 'image', 'images', 'text',
+        'cooking_time'
     ],
     'additionalProperties': False
 }
@@ -267,3 +273,17 @@ RESPONSE_SCHEMA_RECIPES = {
         }
     }
 }
+
+RESPONSE_SCHEMA_RECIPES_CURSOR = {
+    'type': 'object',
+    'required': ['next', 'previous', 'results'],
+    'additionalProperties': False,
+    'properties': {
+        'next': {'type': ['string', 'null']},
+        'previous': {'type': ['string', 'null']},
+        'results': {
+            'type': 'array',
+            'items': RESPONSE_SCHEMA_RECIPE
+        }
+    }
+}
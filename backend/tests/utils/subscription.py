@@ -1,3 +1,4 @@
+from tests.utils.image import RESPONSE_SCHEMA_IMAGES
 from tests.utils.recipe import RESPONSE_SCHEMA_SHORT_RECIPE
 from tests.utils.user import URL_CREATE_USER, URL_GET_USER
 
@@ -16,6 +17,7 @@ RESPONSE_SCHEMA_SUBSCRIPTION = {
         'email': {'type': 'string'},
         'is_subscribed': {'type': 'boolean'},
         'avatar': {'type': ['string', 'null']},
+        'images': RESPONSE_SCHEMA_IMAGES,
         'recipes_count': {'type': 'number'},
         'recipes': {
             'type': 'array',
@@ -24,7 +26,7 @@ RESPONSE_SCHEMA_SUBSCRIPTION = {
     },
     'required': [
         'id', 'username', 'first_name', 'last_name', 'email',
-        'is_subscribed', 'recipes', 'recipes_count', 'avatar'
+        'is_subscribed', 'recipes', 'recipes_count', 'avatar', 'images'
     ],
     'additionalProperties': False
 }
@@ -1,3 +1,5 @@
+from tests.utils.image import RESPONSE_SCHEMA_IMAGES
+
 # Константы из postman
 USERNAME = 'vasya.ivanov'
 PASSWORD = 'MySecretPas$word'
@@ -185,11 +187,12 @@ RESPONSE_SCHEMA_USER = {
         'last_name': {'type': 'string'},
         'email': {'type': 'string'},
         'is_subscribed': {'type': 'boolean'},
-        'avatar': {'type': ['string', 'null']}
+        'avatar': {'type': ['string', 'null']},
+        'images': RESPONSE_SCHEMA_IMAGES
     },
     'required': [
         'id', 'username', 'first_name', 'last_name', 'email',
-        'is_subscribed', 'avatar'
+        'is_subscribed', 'avatar', 'images'
     ],
     'additionalProperties': False
 }